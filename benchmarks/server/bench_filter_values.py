@@ -0,0 +1,109 @@
+"""
+compares the query plan and the query time of the previous OR chain filters with the normalized IN / BETWEEN filters
+for a request of many counties and days on a synthetic covidcast table
+"""
+from time import perf_counter
+from typing import Any, Dict, List, Sequence
+
+from sqlalchemy import create_engine
+
+from delphi.epidata.server._params import GeoPair, SourceSignalPair, TimePair
+from delphi.epidata.server._query import bind_query, filter_geo_pairs, filter_source_signal_pairs, filter_time_pairs
+
+NUM_COUNTIES = 3200
+NUM_DAYS = 60
+# sqlite rejects expression trees deeper than 1000, i.e. the OR chain of 3000 counties doesn't even run
+REQUESTED_COUNTIES = 900
+REPEAT = 5
+
+
+def legacy_filter_values(field: str, values: Sequence[Any], param_key: str, params: Dict[str, Any]) -> str:
+    # the OR chain with one parameter per value as it was built before
+    conditions: List[str] = []
+    for i, v in enumerate(values):
+        key = f"{param_key}_{i}"
+        if isinstance(v, tuple):
+            params[key], params[f"{key}_2"] = v
+            conditions.append(f"{field} BETWEEN :{key} AND :{key}_2")
+        else:
+            params[key] = v
+            conditions.append(f"{field} = :{key}")
+    return f"({' OR '.join(conditions)})"
+
+
+def legacy_filter_pairs(type_field: str, value_field: str, pairs: Sequence[Any], param_key: str, params: Dict[str, Any]) -> str:
+    parts: List[str] = []
+    for i, (type_value, values) in enumerate(pairs):
+        type_param = f"{param_key}_{i}t"
+        params[type_param] = type_value
+        if values is True:
+            parts.append(f"{type_field} = :{type_param}")
+        else:
+            parts.append(f"({type_field} = :{type_param} AND {legacy_filter_values(value_field, values, type_param, params)})")
+    return f"({' OR '.join(parts)})"
+
+
+def create_engine_with_data():
+    engine = create_engine("sqlite://")
+    engine.execute(
+        """
+        CREATE TABLE covidcast (`source` TEXT, `signal` TEXT, time_type TEXT, geo_type TEXT, time_value INT, geo_value TEXT,
+            issue INT, `value` REAL)
+        """
+    )
+    engine.execute("CREATE UNIQUE INDEX `unique` ON covidcast (`source`, `signal`, time_type, geo_type, time_value, geo_value, issue)")
+    days = [20200101 + d for d in range(31)] + [20200201 + d for d in range(NUM_DAYS - 31)]
+    rows = [("src", sig, "day", "county", day, f"{c:05}", day, c / 7) for sig in ("sig", "other") for day in days for c in range(NUM_COUNTIES)]
+    engine.execute("INSERT INTO covidcast VALUES (?, ?, ?, ?, ?, ?, ?, ?)", rows)
+    engine.execute("ANALYZE")
+    return engine, days
+
+
+def build_queries(days: List[int]):
+    counties = [f"{c:05}" for c in range(0, NUM_COUNTIES, NUM_COUNTIES // REQUESTED_COUNTIES)][:REQUESTED_COUNTIES]
+    # every day of the first month listed individually, like a client would do
+    time_values = days[:31]
+    base = "SELECT COUNT(*) FROM covidcast t WHERE "
+
+    legacy_params: Dict[str, Any] = {}
+    legacy = base + " AND ".join(
+        [
+            legacy_filter_pairs("t.source", "t.signal", [("src", ["sig"])], "sig", legacy_params),
+            legacy_filter_pairs("t.geo_type", "t.geo_value", [("county", counties)], "geo", legacy_params),
+            legacy_filter_pairs("t.time_type", "t.time_value", [("day", time_values)], "time", legacy_params),
+        ]
+    )
+
+    params: Dict[str, Any] = {}
+    normalized = base + " AND ".join(
+        [
+            filter_source_signal_pairs("t.source", "t.signal", [SourceSignalPair("src", ["sig"])], "sig", params),
+            filter_geo_pairs("t.geo_type", "t.geo_value", [GeoPair("county", counties)], "geo", params),
+            filter_time_pairs("t.time_type", "t.time_value", [TimePair("day", time_values)], "time", params),
+        ]
+    )
+    return (legacy, legacy_params), (normalized, params)
+
+
+def measure(name: str, engine, query: str, params: Dict[str, Any]) -> float:
+    print(f"{name}: {len(query):,} chars, {len(params):,} parameters")
+    for row in engine.execute(bind_query(f"EXPLAIN QUERY PLAN {query}", params), **params):
+        print(f"  plan: {row[-1]}")
+    start = perf_counter()
+    for _ in range(REPEAT):
+        count = engine.execute(bind_query(query, params), **params).scalar()
+    elapsed = (perf_counter() - start) / REPEAT
+    print(f"  {count:,} rows in {elapsed * 1000:.1f} ms")
+    return elapsed
+
+
+def main():
+    engine, days = create_engine_with_data()
+    (legacy, legacy_params), (normalized, params) = build_queries(days)
+    before = measure("OR chain", engine, legacy, legacy_params)
+    after = measure("IN / BETWEEN", engine, normalized, params)
+    print(f"speedup: {before / after:.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,121 @@
+"""
+replays representative covidcast request shapes against a synthetic covidcast table and reports the latency of each
+index the query can use along with the one the planner in `covidcast_utils.planner` and the previous heuristic pick
+"""
+from datetime import date, timedelta
+from time import perf_counter
+from typing import Any, Dict, List, Optional, Tuple
+
+from sqlalchemy import create_engine
+
+from delphi.epidata.server._params import GeoPair, SourceSignalPair, TimePair
+from delphi.epidata.server._query import QueryBuilder, bind_query
+from delphi.epidata.server.endpoints.covidcast import guess_index_to_use
+from delphi.epidata.server.endpoints.covidcast_utils import CovidcastMeta
+
+NUM_COUNTIES = 1000
+NUM_STATES = 50
+NUM_DAYS = 120
+NUM_ISSUES = 2
+REPEAT = 3
+
+# name of the sqlite index for each MySQL hint, no hint = the unique key
+INDEXES = {None: "by_time", "by_issue": "by_issue", "by_lag": "by_lag"}
+
+DAYS = [int((date(2020, 3, 1) + timedelta(days=d)).strftime("%Y%m%d")) for d in range(NUM_DAYS)]
+COUNTIES = [f"{c:05}" for c in range(NUM_COUNTIES)]
+STATES = [f"s{s:02}" for s in range(NUM_STATES)]
+
+# (name, geo, time, issues, lag)
+SHAPES: List[Tuple[str, List[GeoPair], List[TimePair], Optional[List[int]], Optional[int]]] = [
+    ("time series of 2 counties", [GeoPair("county", COUNTIES[:2])], [TimePair("day", True)], None, None),
+    ("time series of 50 counties", [GeoPair("county", COUNTIES[:50])], [TimePair("day", True)], None, None),
+    ("300 counties, one week", [GeoPair("county", COUNTIES[:300])], [TimePair("day", [(DAYS[30], DAYS[36])])], None, None),
+    ("all counties, one day", [GeoPair("county", True)], [TimePair("day", [DAYS[30]])], None, None),
+    ("all counties, two weeks", [GeoPair("county", True)], [TimePair("day", [(DAYS[30], DAYS[43])])], None, None),
+    ("5 states, one month, lag 1", [GeoPair("state", STATES[:5])], [TimePair("day", [(DAYS[0], DAYS[29])])], None, 1),
+    ("all states, 3 days", [GeoPair("state", True)], [TimePair("day", DAYS[10:13])], None, None),
+    ("county time series of an issue", [GeoPair("county", COUNTIES[:3])], [TimePair("day", True)], [DAYS[-1] + 1], None),
+]
+
+
+def create_engine_with_data():
+    engine = create_engine("sqlite://")
+    engine.execute(
+        """
+        CREATE TABLE covidcast (`source` TEXT, `signal` TEXT, time_type TEXT, geo_type TEXT, time_value INT, geo_value TEXT,
+            issue INT, lag INT, is_latest_issue INT, `value` REAL)
+        """
+    )
+    engine.execute("CREATE UNIQUE INDEX by_time ON covidcast (`source`, `signal`, time_type, geo_type, time_value, geo_value, issue)")
+    engine.execute("CREATE INDEX by_issue ON covidcast (`source`, `signal`, time_type, geo_type, geo_value, time_value, issue)")
+    engine.execute("CREATE INDEX by_lag ON covidcast (`source`, `signal`, time_type, geo_type, geo_value, time_value, lag)")
+    rows = [
+        ("src", "sig", "day", geo_type, day, geo, day + lag, lag, int(lag == NUM_ISSUES), g / 7)
+        for geo_type, geos in (("county", COUNTIES), ("state", STATES))
+        for day in DAYS
+        for g, geo in enumerate(geos)
+        for lag in range(1, NUM_ISSUES + 1)
+    ]
+    engine.execute("INSERT INTO covidcast VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", rows)
+    engine.execute("ANALYZE")
+    return engine
+
+
+def load_meta(engine) -> CovidcastMeta:
+    # the statistics covidcast_meta_cache provides
+    rows = engine.execute(
+        """
+        SELECT `source` AS data_source, `signal`, time_type, geo_type, COUNT(DISTINCT geo_value) AS num_locations,
+            MIN(time_value) AS min_time, MAX(time_value) AS max_time
+        FROM covidcast GROUP BY `source`, `signal`, time_type, geo_type
+        """
+    )
+    return CovidcastMeta((0, 0), [dict(row) for row in rows])
+
+
+def build_query(geo: List[GeoPair], time: List[TimePair], issues: Optional[List[int]], lag: Optional[int], index: Optional[str]) -> Tuple[str, Dict[str, Any]]:
+    q = QueryBuilder("covidcast", "t")
+    q.set_fields(["geo_value", "time_value", "value"])
+    q.where_source_signal_pairs("source", "signal", [SourceSignalPair("src", ["sig"])])
+    q.where_geo_pairs("geo_type", "geo_value", geo)
+    q.where_time_pairs("time_type", "time_value", time)
+    if issues:
+        q.where_integers("issue", issues)
+    elif lag is not None:
+        q.where(lag=lag)
+    else:
+        q.conditions.append("(t.is_latest_issue = 1)")
+    q.table = f"{q.table} INDEXED BY {INDEXES[index]}"
+    return f"SELECT COUNT(*) FROM ({q}) x", q.params
+
+
+def measure(engine, query: str, params: Dict[str, Any]) -> Tuple[int, float]:
+    start = perf_counter()
+    for _ in range(REPEAT):
+        count = engine.execute(bind_query(query, params), **params).scalar()
+    return count, (perf_counter() - start) / REPEAT
+
+
+def main():
+    engine = create_engine_with_data()
+    meta = load_meta(engine)
+    signals = [SourceSignalPair("src", ["sig"])]
+    totals = dict(planner=0.0, heuristic=0.0, fastest=0.0)
+    for name, geo, time, issues, lag in SHAPES:
+        planned = guess_index_to_use(time, geo, issues, lag, None, signals, meta)
+        heuristic = guess_index_to_use(time, geo, issues, lag, None)
+        print(f"{name}: planner = {planned or 'no hint'}, heuristic = {heuristic or 'no hint'}")
+        latencies: Dict[Optional[str], float] = {}
+        for index in INDEXES:
+            count, latencies[index] = measure(engine, *build_query(geo, time, issues, lag, index))
+            marks = "".join([" <- planner" if index == planned else "", " <- heuristic" if index == heuristic else ""])
+            print(f"  {index or 'no hint'}: {count:,} rows in {latencies[index] * 1000:.1f} ms{marks}")
+        totals["planner"] += latencies[planned]
+        totals["heuristic"] += latencies[heuristic]
+        totals["fastest"] += min(latencies.values())
+    print("total latency of all shapes: " + ", ".join(f"{name} {seconds * 1000:.1f} ms" for name, seconds in totals.items()))
+
+
+if __name__ == "__main__":
+    main()
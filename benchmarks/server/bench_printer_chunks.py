@@ -0,0 +1,45 @@
+"""
+compares the throughput of the printers through the WSGI layer for different chunk sizes
+"""
+from time import perf_counter
+
+from flask import request
+
+from delphi.epidata.server._common import app
+from delphi.epidata.server._printer import create_printer
+
+NUM_ROWS = 200_000
+CHUNK_SIZES = [0, 4 * 1024, 16 * 1024, 64 * 1024, 256 * 1024]
+
+
+def rows():
+    for i in range(NUM_ROWS):
+        yield dict(geo_value=f"{i % 3000:05}", signal="sig", source="src", time_value=20200101 + i % 28, issue=20200201, lag=3, value=i / 7, stderr=0.5, sample_size=None)
+
+
+@app.route("/bench_printer_chunks")
+def bench_printer_chunks():
+    p = create_printer()
+    p.chunk_size = int(request.values["chunk_size"])
+    return p(rows())
+
+
+def main():
+    app.config["TESTING"] = True
+    client = app.test_client()
+    for format in ["classic", "json", "csv"]:
+        for chunk_size in CHUNK_SIZES:
+            start = perf_counter()
+            r = client.get("/bench_printer_chunks", query_string=dict(format=format, chunk_size=chunk_size), buffered=False)
+            num_chunks = 0
+            num_bytes = 0
+            for chunk in r.response:
+                num_chunks += 1
+                num_bytes += len(chunk)
+            r.close()
+            duration = perf_counter() - start
+            print(f"{format:<8} chunk_size={chunk_size:>7}: {NUM_ROWS / duration:>10,.0f} rows/sec {num_bytes / duration / 1e6:>7.1f} MB/sec {num_chunks:>8} chunks")
+
+
+if __name__ == "__main__":
+    main()
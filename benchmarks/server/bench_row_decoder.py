@@ -0,0 +1,54 @@
+"""
+compares the rows/sec of the per row `parse_row` with the compiled row decoder used by `execute_queries`
+"""
+from time import perf_counter
+from typing import Callable, Iterable
+
+from sqlalchemy import create_engine
+
+from delphi.epidata.server._query import compile_row_decoder, parse_row
+
+NUM_ROWS = 500_000
+
+fields_string = ["geo_value", "signal", "source", "geo_type", "time_type"]
+fields_int = ["time_value", "direction", "issue", "lag", "missing_value", "missing_stderr", "missing_sample_size"]
+fields_float = ["value", "stderr", "sample_size"]
+
+
+def create_rows():
+    engine = create_engine("sqlite://")
+    engine.execute(
+        """
+        CREATE TABLE covidcast (`source` TEXT, `signal` TEXT, time_type TEXT, geo_type TEXT, time_value INT, geo_value TEXT,
+            `value` REAL, stderr REAL, sample_size REAL, direction INT, issue INT, lag INT,
+            missing_value INT, missing_stderr INT, missing_sample_size INT)
+        """
+    )
+    rows = [("src", "sig", "day", "county", 20200101 + i % 28, f"{i % 3000:05}", i / 7, 0.5, None, None, 20200201, 3, 0, 0, 0) for i in range(NUM_ROWS)]
+    engine.execute(f"INSERT INTO covidcast VALUES ({', '.join(['?'] * 15)})", rows)
+    return engine.execute("SELECT * FROM covidcast").fetchall()
+
+
+def measure(name: str, rows: Iterable, fn: Callable) -> float:
+    start = perf_counter()
+    for row in rows:
+        fn(row)
+    rows_per_sec = NUM_ROWS / (perf_counter() - start)
+    print(f"{name:<24} {rows_per_sec:>12,.0f} rows/sec")
+    return rows_per_sec
+
+
+def main():
+    rows = create_rows()
+    decode = compile_row_decoder(rows[0].keys(), fields_string, fields_int, fields_float)
+    assert decode(rows[0]) == parse_row(rows[0], fields_string, fields_int, fields_float)
+
+    before = measure("parse_row", rows, lambda row: parse_row(row, fields_string, fields_int, fields_float))
+    after = measure("compiled (RowProxy)", rows, decode)
+    tuples = [tuple(row) for row in rows]
+    after_tuples = measure("compiled (tuple)", tuples, decode)
+    print(f"speedup: {after / before:.2f}x (RowProxy), {after_tuples / before:.2f}x (tuple)")
+
+
+if __name__ == "__main__":
+    main()
@@ -4,7 +4,9 @@ import json
 import multiprocessing
 import os
 
-workers_per_core_str = os.getenv("WORKERS_PER_CORE", "2")
+# wsgi = sync workers (see main.py), asgi = event loop workers (see asgi.py) started by start_wrapper.sh
+server_mode = os.getenv("SERVER_MODE", "wsgi")
+workers_per_core_str = os.getenv("WORKERS_PER_CORE", "1" if server_mode == "asgi" else "2")
 web_concurrency_str = os.getenv("WEB_CONCURRENCY", None)
 host = os.getenv("HOST", "0.0.0.0")
 port = os.getenv("PORT", "80")
@@ -46,6 +48,7 @@ log_data = {
     "workers": workers,
     "bind": bind,
     # Additional, non-gunicorn variables
+    "server_mode": server_mode,
     "workers_per_core": workers_per_core,
     "host": host,
     "port": port,
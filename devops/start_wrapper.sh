@@ -1,10 +1,18 @@
 #!/usr/bin/env sh
 set -e
 
+# SERVER_MODE=asgi serves the app through the ASGI adapter using uvicorn workers,
+# otherwise the default WSGI setup of the base image is started via start.sh.
+if [ "${SERVER_MODE}" = "asgi" ]; then
+  set -- gunicorn -k uvicorn.workers.UvicornWorker -c /app/gunicorn_conf.py app.asgi:application
+else
+  set -- sh /start.sh
+fi
+
 # If a New Relic license key is found then we start with custom New Relic
-# commands, otherwise we start via start.sh.
+# commands, otherwise we start directly.
 if [ -z "${NEW_RELIC_LICENSE_KEY}" ]; then
-  sh /start.sh
+  "$@"
 else
-  newrelic-admin run-program /start.sh
+  newrelic-admin run-program "$@"
 fi
@@ -0,0 +1,84 @@
+"""Integration tests for the maintenance of `covidcast_latest` by imports."""
+
+# standard library
+import unittest
+from unittest.mock import patch
+
+# third party
+import mysql.connector
+
+# first party
+from delphi_utils import Nans
+import delphi.operations.secrets as secrets
+from delphi.epidata.acquisition.covidcast.database import Database, CovidcastRow
+
+# py3tester coverage target (equivalent to `import *`)
+__test_target__ = 'delphi.epidata.acquisition.covidcast.database'
+
+
+class CovidcastLatestTests(unittest.TestCase):
+  """Tests imports into `covidcast_latest`."""
+
+  def setUp(self):
+    """Perform per-test setup."""
+
+    # connect to the `epidata` database and clear the covidcast tables
+    cnx = mysql.connector.connect(
+        user='user',
+        password='pass',
+        host='delphi_database_epidata',
+        database='epidata')
+    cur = cnx.cursor()
+    cur.execute('truncate table covidcast')
+    cur.execute('truncate table covidcast_latest')
+    cnx.commit()
+    cur.close()
+
+    # make connection and cursor available to test cases
+    self.cnx = cnx
+    self.cur = cnx.cursor()
+
+    # use the local instance of the epidata database
+    secrets.db.host = 'delphi_database_epidata'
+    secrets.db.epi = ('user', 'pass')
+
+  def tearDown(self):
+    """Perform per-test teardown."""
+    self.cur.close()
+    self.cnx.close()
+
+  def _insert(self, issue, value):
+    row = CovidcastRow('src', 'sig', 'day', 'state', 20200101, 'ca', value, 0, 0,
+      Nans.NOT_MISSING, Nans.NOT_MISSING, Nans.NOT_MISSING, issue, issue - 20200101, False)
+    database = Database()
+    database.connect()
+    try:
+      database.insert_or_update_batch([row])
+    finally:
+      database.disconnect(True)
+
+  def test_older_issue_into_empty_latest(self):
+    """Import an older issue of a key that is not in `covidcast_latest` yet."""
+
+    # the newer issue was imported before the table was maintained
+    self._insert(20200103, 3)
+    with patch('delphi.epidata.acquisition.covidcast.database.MAINTAIN_LATEST', True):
+      self._insert(20200102, 2)
+
+    self.cnx.commit()
+    self.cur.execute('select issue, value from covidcast_latest')
+    self.assertEqual(list(self.cur), [(20200103, 3.0)])
+    self.cur.execute('select issue, is_latest_issue from covidcast order by issue')
+    self.assertEqual(list(self.cur), [(20200102, bytearray(b'0')), (20200103, bytearray(b'1'))])
+
+  def test_latest_not_maintained_by_default(self):
+    """Import issues without touching `covidcast_latest`."""
+
+    self._insert(20200103, 3)
+    self._insert(20200102, 2)
+
+    self.cnx.commit()
+    self.cur.execute('select count(1) from covidcast_latest')
+    self.assertEqual(list(self.cur), [(0,)])
+    self.cur.execute('select issue, is_latest_issue from covidcast order by issue')
+    self.assertEqual(list(self.cur), [(20200102, bytearray(b'0')), (20200103, bytearray(b'1'))])
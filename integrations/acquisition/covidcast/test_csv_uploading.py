@@ -33,6 +33,7 @@ class CsvUploadingTests(unittest.TestCase):
         database='epidata')
     cur = cnx.cursor()
     cur.execute('truncate table covidcast')
+    cur.execute('truncate table covidcast_latest')
     cnx.commit()
     cur.close()
 
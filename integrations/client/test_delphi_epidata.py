@@ -13,6 +13,7 @@ import pytest
 # first party
 from delphi_utils import Nans
 from delphi.epidata.client.delphi_epidata import Epidata
+from delphi.epidata.acquisition.covidcast.database import Database
 from delphi.epidata.acquisition.covidcast.covidcast_meta_cache_updater import main as update_covidcast_meta_cache
 import delphi.operations.secrets as secrets
 
@@ -42,6 +43,7 @@ class DelphiEpidataPythonClientTests(unittest.TestCase):
         database='epidata')
     cur = cnx.cursor()
     cur.execute('truncate table covidcast')
+    cur.execute('truncate table covidcast_latest')
     cur.execute('truncate table covidcast_nowcast')
     cnx.commit()
     cur.close()
@@ -62,6 +64,19 @@ class DelphiEpidataPythonClientTests(unittest.TestCase):
     self.cur.close()
     self.cnx.close()
 
+  def _sync_issue_columns(self):
+    """Fill `next_issue` and `covidcast_latest` of the inserted rows through the acquisition."""
+    self.cnx.commit()
+    self.cur.execute('select distinct `source`, `signal` from `covidcast`')
+    database = Database()
+    database.connect()
+    try:
+      for source, signal in list(self.cur):
+        database.fill_next_issue(source, signal)
+        database.fill_latest(source, signal)
+    finally:
+      database.disconnect(True)
+
   def test_covidcast(self):
     """Test that the covidcast endpoint returns expected data."""
 
@@ -87,6 +102,7 @@ class DelphiEpidataPythonClientTests(unittest.TestCase):
           345, 6.5, 2.2, 11.5, 678, 0, 20200416, 2, 1, False,
           {Nans.NOT_MISSING}, {Nans.NOT_MISSING}, {Nans.NOT_MISSING})
     ''')
+    self._sync_issue_columns()
     self.cnx.commit()
 
     with self.subTest(name='request two signals'):
@@ -363,6 +379,7 @@ class DelphiEpidataPythonClientTests(unittest.TestCase):
           123, 60, 61, 62, 456, 634, 20200414, 0, 1, False,
           {Nans.NOT_MISSING}, {Nans.NOT_MISSING}, {Nans.NOT_MISSING})
     ''')
+    self._sync_issue_columns()
     self.cnx.commit()
 
     def fetch(geo_value):
@@ -461,6 +478,7 @@ class DelphiEpidataPythonClientTests(unittest.TestCase):
           345, 7.0, 2.0, 12.5, 678, 0, 20200416, 1, 1, False,
           {Nans.NOT_MISSING}, {Nans.NOT_MISSING}, {Nans.NOT_MISSING})
     ''')
+    self._sync_issue_columns()
     self.cnx.commit()
 
     # cache it
@@ -606,6 +624,7 @@ class DelphiEpidataPythonClientTests(unittest.TestCase):
           123, 60, 61, 62, 456, 634, 20200414, 0, 1, False,
           {Nans.NOT_MISSING}, {Nans.NOT_MISSING}, {Nans.NOT_MISSING})
     ''')
+    self._sync_issue_columns()
     self.cnx.commit()
     test_output = Epidata.async_epidata([
       {
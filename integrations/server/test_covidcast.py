@@ -9,6 +9,8 @@ import requests
 
 # first party
 from delphi_utils import Nans
+from delphi.epidata.acquisition.covidcast.database import Database
+import delphi.operations.secrets as secrets
 
 # use the local instance of the Epidata API
 BASE_URL = 'http://delphi_web_epidata/epidata/api.php'
@@ -28,6 +30,7 @@ class CovidcastTests(unittest.TestCase):
         database='epidata')
     cur = cnx.cursor()
     cur.execute('truncate table covidcast')
+    cur.execute('truncate table covidcast_latest')
     cnx.commit()
     cur.close()
 
@@ -35,11 +38,28 @@ class CovidcastTests(unittest.TestCase):
     self.cnx = cnx
     self.cur = cnx.cursor()
 
+    # use the local instance of the epidata database
+    secrets.db.host = 'delphi_database_epidata'
+    secrets.db.epi = ('user', 'pass')
+
   def tearDown(self):
     """Perform per-test teardown."""
     self.cur.close()
     self.cnx.close()
 
+  def _sync_issue_columns(self):
+    """Fill `next_issue` and `covidcast_latest` of the inserted rows through the acquisition."""
+    self.cnx.commit()
+    self.cur.execute('select distinct `source`, `signal` from `covidcast`')
+    database = Database()
+    database.connect()
+    try:
+      for source, signal in list(self.cur):
+        database.fill_next_issue(source, signal)
+        database.fill_latest(source, signal)
+    finally:
+      database.disconnect(True)
+
   def test_round_trip(self):
     """Make a simple round-trip with some sample data."""
 
@@ -56,6 +76,7 @@ class CovidcastTests(unittest.TestCase):
           123, 1.5, 2.5, 3.5, 456, 4, 20200414, 0, 1, False,
           {Nans.NOT_MISSING}, {Nans.NOT_MISSING}, {Nans.NOT_MISSING})
     ''')
+    self._sync_issue_columns()
     self.cnx.commit()
 
     # make the request
@@ -152,6 +173,7 @@ class CovidcastTests(unittest.TestCase):
           123, 1.5, 2.5, 3.5, 456, 4, 20200414, 0, 1, False,
           {Nans.NOT_MISSING}, {Nans.NOT_MISSING}, {Nans.NOT_MISSING})
     ''')
+    self._sync_issue_columns()
     self.cnx.commit()
 
     # make the request
@@ -192,6 +214,7 @@ class CovidcastTests(unittest.TestCase):
           123, 1.5, 2.5, 3.5, 456, 4, 20200414, 0, 1, False,
           {Nans.NOT_MISSING}, {Nans.NOT_MISSING}, {Nans.NOT_MISSING})
     ''')
+    self._sync_issue_columns()
     self.cnx.commit()
 
     # make the request
@@ -240,6 +263,7 @@ class CovidcastTests(unittest.TestCase):
           123, 1.5, 2.5, 3.5, 456, 4, 20200414, 0, 1, False,
           {Nans.NOT_MISSING}, {Nans.NOT_MISSING}, {Nans.NOT_MISSING})
     ''')
+    self._sync_issue_columns()
     self.cnx.commit()
 
     # make the request
@@ -382,6 +406,7 @@ class CovidcastTests(unittest.TestCase):
           123, 60, 61, 62, 456, 634, 20200414, 0, 1, False,
           {Nans.NOT_MISSING}, {Nans.NOT_MISSING}, {Nans.NOT_MISSING})
     ''')
+    self._sync_issue_columns()
     self.cnx.commit()
 
     # make the request
@@ -476,6 +501,7 @@ class CovidcastTests(unittest.TestCase):
           123, 60, 61, 62, 456, 634, 20200414, 0, 1, False,
           {Nans.NOT_MISSING}, {Nans.NOT_MISSING}, {Nans.NOT_MISSING})
     ''')
+    self._sync_issue_columns()
     self.cnx.commit()
 
     def fetch(geo_value):
@@ -598,6 +624,7 @@ class CovidcastTests(unittest.TestCase):
           123, 60, 61, 62, 456, 63, 20200413, 0, 1, False,
           {Nans.NOT_MISSING}, {Nans.NOT_MISSING}, {Nans.NOT_MISSING})
     ''')
+    self._sync_issue_columns()
     self.cnx.commit()
 
     # make the request
@@ -677,6 +704,7 @@ class CovidcastTests(unittest.TestCase):
           0, 0, 0, 0, 0, 0, 20200414, 0, 1, False,
           {Nans.NOT_MISSING}, {Nans.NOT_MISSING}, {Nans.NOT_MISSING})
     ''')
+    self._sync_issue_columns()
     self.cnx.commit()
 
     # fail to insert different dummy data under the same key
@@ -724,6 +752,7 @@ class CovidcastTests(unittest.TestCase):
           123, 0.123, NULL, NULL, 456, NULL, 20200414, 0, 1, False,
           {Nans.NOT_MISSING}, {Nans.OTHER}, {Nans.OTHER})
     ''')
+    self._sync_issue_columns()
     self.cnx.commit()
 
     # make the request
@@ -788,6 +817,7 @@ class CovidcastTests(unittest.TestCase):
           123, 50, 51, 52, 456, 53, 2020, 0, 1, False,
           {Nans.NOT_MISSING}, {Nans.NOT_MISSING}, {Nans.NOT_MISSING})
     ''')
+    self._sync_issue_columns()
     self.cnx.commit()
 
     # make the request
@@ -854,6 +884,7 @@ class CovidcastTests(unittest.TestCase):
           123, 60, 61, 62, 456, 63, 20200413, 0, 1, False,
           {Nans.NOT_MISSING}, {Nans.NOT_MISSING}, {Nans.NOT_MISSING})
     ''')
+    self._sync_issue_columns()
     self.cnx.commit()
 
     # make the request
@@ -15,6 +15,8 @@ import pandas as pd
 from delphi_utils import Nans
 
 from delphi.epidata.acquisition.covidcast.covidcast_meta_cache_updater import main as update_cache
+from delphi.epidata.acquisition.covidcast.database import Database
+import delphi.operations.secrets as secrets
 
 
 # use the local instance of the Epidata API
@@ -110,6 +112,8 @@ class CovidcastEndpointTests(unittest.TestCase):
         cnx = mysql.connector.connect(user="user", password="pass", host="delphi_database_epidata", database="epidata")
         cur = cnx.cursor()
         cur.execute("truncate table covidcast")
+        cur.execute("truncate table covidcast_revision_profile")
+        cur.execute("truncate table covidcast_latest")
         cur.execute('update covidcast_meta_cache set timestamp = 0, epidata = ""')
         cnx.commit()
         cur.close()
@@ -118,6 +122,10 @@ class CovidcastEndpointTests(unittest.TestCase):
         self.cnx = cnx
         self.cur = cnx.cursor()
 
+        # use the local instance of the epidata database
+        secrets.db.host = "delphi_database_epidata"
+        secrets.db.epi = ("user", "pass")
+
     def tearDown(self):
         """Perform per-test teardown."""
         self.cur.close()
@@ -138,6 +146,15 @@ class CovidcastEndpointTests(unittest.TestCase):
             """
         )
         self.cnx.commit()
+        # fill `next_issue` and `covidcast_latest` through the acquisition
+        database = Database()
+        database.connect()
+        try:
+            for source, signal in {(r.source, r.signal) for r in rows}:
+                database.fill_next_issue(source, signal)
+                database.fill_latest(source, signal)
+        finally:
+            database.disconnect(True)
         return rows
 
     def _fetch(self, endpoint="/", **params):
@@ -164,6 +181,36 @@ class CovidcastEndpointTests(unittest.TestCase):
             out = self._fetch("/", signal=first.signal_pair, geo=first.geo_pair, time="day:*")
             self.assertEqual(len(out["epidata"]), len(rows))
 
+    def test_cursor_order(self):
+        """The keyset condition of a cursor (see QueryBuilder.where_after) selects the rows after it in the sort order."""
+
+        rows = [CovidcastRow(geo_value=f"0100{g}", time_value=20200401 + i, value=i) for g in range(3) for i in range(30)]
+        self._insert_rows(rows)
+
+        fields = ["source", "signal", "time_type", "time_value", "geo_type", "geo_value", "issue"]
+        after = ["src", "sig", "day", 20200410, "county", "01001", 20200202]
+        terms = " OR ".join("(" + " AND ".join([f"t.`{f}` = %s" for f in fields[:i]] + [f"t.`{fields[i]}` > %s"]) + ")" for i in range(len(fields)))
+        params = [v for i in range(len(fields)) for v in after[: i + 1]]
+        query = f"SELECT t.`time_value`, t.`geo_value` FROM `covidcast` t WHERE t.`source` = 'src' AND t.`signal` = 'sig' AND ({terms}) ORDER BY {', '.join(f't.`{f}`' for f in fields)}"
+
+        self.cur.execute(query, params)
+        expected = sorted((r.time_value, r.geo_value) for r in rows if (r.time_value, r.geo_value) > (20200410, "01001"))
+        self.assertEqual(self.cur.fetchall(), expected)
+
+    def test_as_of(self):
+        """Request the issues of a signal current as of a date."""
+
+        num_rows = 10
+        issue_0 = [CovidcastRow(time_value=20200401 + i, value=i, lag=0, issue=20200401 + i, is_latest_issue=False) for i in range(num_rows)]
+        last_issue = [CovidcastRow(time_value=20200401 + i, value=i + 2, lag=2, issue=20200401 + i + 2, is_latest_issue=True) for i in range(num_rows)]
+        self._insert_rows([*issue_0, *last_issue])
+        first = issue_0[0]
+
+        out = self._fetch("/", signal=first.signal_pair, geo=first.geo_pair, time="day:*", as_of=20200405)
+        self.assertEqual(out["result"], 1)
+        # the last issue of the first three days, the first issue of the next two
+        self.assertEqual([r["issue"] for r in out["epidata"]], [r.issue for r in last_issue[:3]] + [r.issue for r in issue_0[3:5]])
+
     def test_trend(self):
         """Request a signal the /trend endpoint."""
 
@@ -335,6 +382,37 @@ class CovidcastEndpointTests(unittest.TestCase):
         self.assertEqual(df_t0["value_completeness"].tolist(), [0 / 2, 1 / 2, 2 / 2])  # total 2, given 0,1,2
         self.assertEqual(df_t0["sample_size_completeness"].tolist(), [1 / 3, 2 / 3, 3 / 3])  # total 2, given 0,1,2
 
+    def test_backfill_profile(self):
+        """Request a signal the /backfill endpoint with a precomputed revision profile."""
+
+        num_rows = 10
+        issue_0 = [CovidcastRow(time_value=20200401 + i, value=i, sample_size=1, lag=0, issue=20200401 + i, is_latest_issue=False) for i in range(num_rows)]
+        last_issue = [CovidcastRow(time_value=20200401 + i, value=i + 2, sample_size=3, lag=2, issue=20200401 + i + 2, is_latest_issue=True) for i in range(num_rows)]
+        self._insert_rows([*issue_0, *last_issue])
+        # the issue at lag 0 is the latest one of the profile lag 0 and 1, the one at lag 2 of the later ones
+        self.cur.execute(
+            """
+            INSERT INTO `covidcast_revision_profile`
+                (`source`, `signal`, `time_type`, `geo_type`, `geo_value`, `time_value`, `lag`, `issue`, `value`, `sample_size`)
+            SELECT `source`, `signal`, `time_type`, `geo_type`, `geo_value`, `time_value`, l.`lag`, `issue`, `value`, `sample_size`
+            FROM `covidcast` c
+            JOIN (SELECT 0 AS `lag` UNION ALL SELECT 1 UNION ALL SELECT 2 UNION ALL SELECT 3) l
+            ON (c.`lag` = 0 AND l.`lag` < 2) OR (c.`lag` = 2 AND l.`lag` >= 2)
+            """
+        )
+        self.cnx.commit()
+        first = issue_0[0]
+
+        out = self._fetch("/backfill", signal=first.signal_pair, geo=first.geo_pair, time="day:20200401-20201212", anchor_lag=3)
+        self.assertEqual(out["result"], 1)
+        df = pd.DataFrame(out["epidata"])
+        self.assertEqual(len(df), 2 * num_rows)  # num issues
+
+        df_t0 = df[df["time_value"] == first.time_value]
+        self.assertEqual(df_t0["issue"].tolist(), [issue_0[0].issue, last_issue[0].issue])
+        self.assertEqual(df_t0["is_anchor"].tolist(), [False, True])
+        self.assertEqual(df_t0["value_completeness"].tolist(), [0 / 2, 2 / 2])
+
     def test_meta(self):
         """Request a signal the /meta endpoint."""
 
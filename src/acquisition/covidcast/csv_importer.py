@@ -13,7 +13,7 @@ import epiweeks as epi
 
 # first party
 from delphi_utils import Nans
-from delphi.utils.epiweek import delta_epiweeks
+from delphi.epidata.server.utils.calendar import delta_weeks
 from delphi.epidata.acquisition.covidcast.logger import get_structured_logger
 
 class CsvImporter:
@@ -149,7 +149,13 @@ class CsvImporter:
           yield (path, None)
           continue
         issue_value=issue_epiweek_value
-        lag_value=delta_epiweeks(time_value_week, issue_epiweek_value)
+        try:
+          lag_value=delta_weeks(time_value_week, issue_epiweek_value)
+        except ValueError:
+          # e.g. week 53 of a year with 52 weeks
+          logger.warning(event='invalid filename week', detail=time_value, file=path)
+          yield (path, None)
+          continue
 
       # # extract and validate geographic resolution
       geo_type = match.group(3).lower()
@@ -3,6 +3,9 @@
 See src/ddl/covidcast.sql for an explanation of each field.
 """
 
+# standard library
+import os
+
 # third party
 import json
 import mysql.connector
@@ -18,6 +21,31 @@ import delphi.operations.secrets as secrets
 
 from delphi.epidata.acquisition.covidcast.logger import get_structured_logger
 
+# lags (in time_type units) of the revision profile stored in `covidcast_revision_profile`, the server reads the
+# profile for these anchor lags (see REVISION_PROFILE_LAGS in src/server/_config.py)
+REVISION_PROFILE_LAGS = (0, 1, 2, 3, 4, 5, 6, 7, 14, 21, 28, 35, 42, 49, 56, 60, 90)
+
+# the derived tables that the server can read instead of the full issue history are maintained by the imports only once
+# enabled here, in this order per deployment: apply the table's migration in src/ddl/migrations/, enable it here, run
+# its fill script for the existing signals, then enable it in the server (see src/server/_config.py)
+# 1 = keep the latest issue of each key in `covidcast_latest`, see fill_latest.py and COVIDCAST_LATEST_TABLE
+MAINTAIN_LATEST = os.environ.get('COVIDCAST_MAINTAIN_LATEST', '0') == '1'
+# 1 = keep the `next_issue` of the inserted rows and of the rows before them, see fill_next_issue.py and
+# COVIDCAST_AS_OF_NEXT_ISSUE
+MAINTAIN_NEXT_ISSUE = os.environ.get('COVIDCAST_MAINTAIN_NEXT_ISSUE', '0') == '1'
+# 1 = keep the `covidcast_revision_profile` of the inserted time units, see fill_revision_profile.py and
+# REVISION_PROFILE_LAGS in src/server/_config.py
+MAINTAIN_REVISION_PROFILE = os.environ.get('COVIDCAST_MAINTAIN_REVISION_PROFILE', '0') == '1'
+
+# columns of `covidcast_latest` and the ones that an upsert of a newer issue updates
+LATEST_COLUMNS = (
+  '`source`, `signal`, `time_type`, `geo_type`, `time_value`, `geo_value`, `value_updated_timestamp`, `value`, '
+  '`stderr`, `sample_size`, `direction_updated_timestamp`, `direction`, `issue`, `lag`, `is_wip`, `missing_value`, '
+  '`missing_stderr`, `missing_sample_size`')
+LATEST_UPDATED_COLUMNS = (
+  'value_updated_timestamp', 'value', 'stderr', 'sample_size', 'direction_updated_timestamp', 'direction', 'lag',
+  'is_wip', 'missing_value', 'missing_stderr', 'missing_sample_size', 'issue')
+
 class CovidcastRow():
   """A container for all the values of a single covidcast row."""
 
@@ -111,7 +139,10 @@ class Database:
     """
     Insert new rows (or update existing) into the table `covidcast`.
 
-    This has the intentional side effect of updating the primary timestamp.
+    This has the intentional side effect of updating the primary timestamp. With MAINTAIN_NEXT_ISSUE, the `next_issue`
+    of the inserted rows and of the rows they follow is updated. With MAINTAIN_LATEST, the latest issue of each inserted key is upserted into
+    `covidcast_latest`, which is then also the source of the `is_latest_issue` flags of these keys. With
+    MAINTAIN_REVISION_PROFILE, the `covidcast_revision_profile` of the inserted time units is recomputed.
     """
 
     tmp_table_name = 'tmp_insert_update_table'
@@ -193,6 +224,72 @@ class Database:
       SET `is_latest_issue`=1        
     '''
 
+    # the latest issue of the inserted keys comes from `covidcast`, as `covidcast_latest` is missing the ones of
+    # signals that were not filled yet
+    latest_of_inserted_sql = f'''
+      SELECT {LATEST_COLUMNS}
+      FROM
+      (
+        SELECT `source`, `signal`, `time_type`, `geo_type`, `time_value`, `geo_value`, MAX(`issue`) AS `issue`
+        FROM
+        (
+          SELECT DISTINCT `source`, `signal`, `time_type`, `geo_type`, `time_value`, `geo_value`
+          FROM `{tmp_table_name}`
+        ) AS TMP
+        JOIN `covidcast`
+        USING (`source`, `signal`, `time_type`, `geo_type`, `time_value`, `geo_value`)
+        GROUP BY `source`, `signal`, `time_type`, `geo_type`, `time_value`, `geo_value`
+      ) AS TMP
+      JOIN `covidcast`
+      USING (`source`, `signal`, `time_type`, `geo_type`, `time_value`, `geo_value`, `issue`)
+    '''
+    # ... which then replaces zeroing and setting the flags of these keys
+    set_is_latest_issue_from_latest_sql = f'''
+      UPDATE
+      (
+        SELECT DISTINCT `source`, `signal`, `time_type`, `geo_type`, `time_value`, `geo_value`
+        FROM `{tmp_table_name}`
+      ) AS TMP
+      JOIN `covidcast_latest` AS L
+      USING (`source`, `signal`, `time_type`, `geo_type`, `time_value`, `geo_value`)
+      JOIN `covidcast` AS C
+      ON C.`source` = L.`source` AND C.`signal` = L.`signal` AND C.`time_type` = L.`time_type` AND
+        C.`geo_type` = L.`geo_type` AND C.`time_value` = L.`time_value` AND C.`geo_value` = L.`geo_value`
+      SET C.`is_latest_issue` = (C.`issue` = L.`issue`)
+    '''
+
+    # the next issue of the inserted rows is the first later one of their key
+    set_next_issue_of_inserted_sql = f'''
+      UPDATE
+      (
+        SELECT C.`id`, MIN(N.`issue`) AS `next_issue`
+        FROM `{tmp_table_name}` AS TMP
+        JOIN `covidcast` AS C
+        USING (`source`, `signal`, `time_type`, `geo_type`, `time_value`, `geo_value`, `issue`)
+        JOIN `covidcast` AS N
+        ON N.`source` = C.`source` AND N.`signal` = C.`signal` AND N.`time_type` = C.`time_type` AND
+          N.`geo_type` = C.`geo_type` AND N.`time_value` = C.`time_value` AND N.`geo_value` = C.`geo_value` AND
+          N.`issue` > C.`issue`
+        GROUP BY C.`id`
+      ) AS TMP
+      JOIN `covidcast` USING (`id`)
+      SET `covidcast`.`next_issue` = TMP.`next_issue`
+    '''
+    # the rows whose issue range contains an inserted issue end at the first of them
+    set_next_issue_of_previous_sql = f'''
+      UPDATE
+      (
+        SELECT C.`id`, MIN(TMP.`issue`) AS `next_issue`
+        FROM `{tmp_table_name}` AS TMP
+        JOIN `covidcast` AS C
+        ON C.`source` = TMP.`source` AND C.`signal` = TMP.`signal` AND C.`time_type` = TMP.`time_type` AND
+          C.`geo_type` = TMP.`geo_type` AND C.`time_value` = TMP.`time_value` AND C.`geo_value` = TMP.`geo_value` AND
+          C.`issue` < TMP.`issue` AND (C.`next_issue` IS NULL OR C.`next_issue` > TMP.`issue`)
+        GROUP BY C.`id`
+      ) AS TMP
+      JOIN `covidcast` USING (`id`)
+      SET `covidcast`.`next_issue` = TMP.`next_issue`
+    '''
 
     # TODO: consider handling cc_rows as a generator instead of a list
     self._cursor.execute(create_tmp_table_sql)
@@ -230,8 +327,20 @@ class Database:
         self._cursor.executemany(insert_into_tmp_sql, args)
         self._cursor.execute(insert_or_update_sql)
         modified_row_count = self._cursor.rowcount
-        self._cursor.execute(zero_is_latest_issue_sql)
-        self._cursor.execute(set_is_latest_issue_sql)
+        if MAINTAIN_NEXT_ISSUE:
+          self._cursor.execute(set_next_issue_of_inserted_sql)
+          self._cursor.execute(set_next_issue_of_previous_sql)
+        if MAINTAIN_LATEST:
+          self._insert_or_update_latest(latest_of_inserted_sql)
+          self._cursor.execute(set_is_latest_issue_from_latest_sql)
+        else:
+          self._cursor.execute(zero_is_latest_issue_sql)
+          self._cursor.execute(set_is_latest_issue_sql)
+        if MAINTAIN_REVISION_PROFILE:
+          self._update_revision_profile(f'''
+            SELECT DISTINCT `source`, `signal`, `time_type`, `geo_type`, `time_value`, `geo_value`
+            FROM `{tmp_table_name}`
+          ''')
         self._cursor.execute(truncate_tmp_table_sql)
 
         if modified_row_count is None or modified_row_count == -1:
@@ -247,6 +356,102 @@ class Database:
       self._cursor.execute(drop_tmp_table_sql)
     return total
 
+  def _insert_or_update_latest(self, rows_sql, args=()):
+    """Upsert the rows selected by `rows_sql` into `covidcast_latest`, keeping the newest issue of each key."""
+
+    # the `issue` has to be assigned last since the other columns compare to the current one
+    updates = ',\n        '.join(
+      f'`{c}` = IF(VALUES(`issue`) >= `covidcast_latest`.`issue`, VALUES(`{c}`), `covidcast_latest`.`{c}`)'
+      for c in LATEST_UPDATED_COLUMNS)
+    insert_or_update_latest_sql = f'''
+      INSERT INTO `covidcast_latest` ({LATEST_COLUMNS})
+      {rows_sql}
+      ON DUPLICATE KEY UPDATE
+        {updates}
+    '''
+    self._cursor.execute(insert_or_update_latest_sql, args)
+
+  def fill_latest(self, source, signal):
+    """Copy the latest issues of the given signal to `covidcast_latest`, e.g. for existing data."""
+
+    self._insert_or_update_latest(f'''
+      SELECT {LATEST_COLUMNS}
+      FROM `covidcast`
+      WHERE `source` = %s AND `signal` = %s AND `is_latest_issue` = 1
+    ''', (source, signal))
+
+  def _update_revision_profile(self, keys_sql, args=()):
+    """Recompute the `covidcast_revision_profile` rows of the time units selected by `keys_sql`."""
+
+    # all profile lags at once, each time unit is joined with the issues up to each lag
+    lags_sql = ' UNION ALL '.join(f'SELECT {int(lag)} AS `profile_lag`' for lag in REVISION_PROFILE_LAGS)
+    update_revision_profile_sql = f'''
+      INSERT INTO `covidcast_revision_profile`
+        (`source`, `signal`, `time_type`, `geo_type`, `geo_value`, `time_value`, `lag`, `issue`, `value`, `sample_size`)
+      SELECT `source`, `signal`, `time_type`, `geo_type`, `geo_value`, `time_value`, TMP.`profile_lag`, `issue`, `value`, `sample_size`
+      FROM
+      (
+        SELECT `source`, `signal`, `time_type`, `geo_type`, `time_value`, `geo_value`, LAGS.`profile_lag`, MAX(`issue`) AS `issue`
+        FROM
+        (
+          {keys_sql}
+        ) AS TMP
+        CROSS JOIN ({lags_sql}) AS LAGS
+        JOIN `covidcast`
+        USING (`source`, `signal`, `time_type`, `geo_type`, `time_value`, `geo_value`)
+        WHERE `lag` <= LAGS.`profile_lag`
+        GROUP BY `source`, `signal`, `time_type`, `geo_type`, `time_value`, `geo_value`, LAGS.`profile_lag`
+      ) AS TMP
+      JOIN `covidcast`
+      USING (`source`, `signal`, `time_type`, `geo_type`, `time_value`, `geo_value`, `issue`)
+      ON DUPLICATE KEY UPDATE
+        `issue` = VALUES(`issue`),
+        `value` = VALUES(`value`),
+        `sample_size` = VALUES(`sample_size`)
+    '''
+
+    self._cursor.execute(update_revision_profile_sql, args)
+
+  def fill_revision_profile(self, source, signal):
+    """Compute the `covidcast_revision_profile` of all time series of the given signal, e.g. for existing data."""
+
+    self._update_revision_profile('''
+      SELECT DISTINCT `source`, `signal`, `time_type`, `geo_type`, `time_value`, `geo_value`
+      FROM `covidcast`
+      WHERE `source` = %s AND `signal` = %s
+    ''', (source, signal))
+
+  def fill_next_issue(self, source, signal):
+    """Compute the `next_issue` of all rows of the given signal, e.g. for existing data."""
+
+    self._cursor.execute('''
+      SELECT DISTINCT `time_type`, `geo_type`, `geo_value`
+      FROM `covidcast`
+      WHERE `source` = %s AND `signal` = %s
+    ''', (source, signal))
+    locations = list(self._cursor)
+
+    num_updated = 0
+    for time_type, geo_type, geo_value in locations:
+      # the rows of each time series are ordered by issue in the `by_issue` index, which also holds the `id`
+      self._cursor.execute('''
+        SELECT `id`, `time_value`, `issue`, `next_issue`
+        FROM `covidcast` USE INDEX (`by_issue`)
+        WHERE `source` = %s AND `signal` = %s AND `time_type` = %s AND `geo_type` = %s AND `geo_value` = %s
+        ORDER BY `time_value`, `issue`
+      ''', (source, signal, time_type, geo_type, geo_value))
+      rows = self._cursor.fetchall()
+
+      updates = []
+      for row, following in zip(rows, rows[1:] + [None]):
+        next_issue = following[2] if following is not None and following[1] == row[1] else None
+        if next_issue != row[3]:
+          updates.append((next_issue, row[0]))
+      if updates:
+        self._cursor.executemany('UPDATE `covidcast` SET `next_issue` = %s WHERE `id` = %s', updates)
+        num_updated += len(updates)
+    return num_updated
+
   def compute_covidcast_meta(self, table_name='covidcast', use_index=True):
     """Compute and return metadata on all non-WIP COVIDcast signals."""
     logger = get_structured_logger("compute_covidcast_meta")
@@ -0,0 +1,56 @@
+"""Computes the `covidcast_revision_profile` of signals that were imported before it existed.
+
+Imports maintain the profile themselves once COVIDCAST_MAINTAIN_REVISION_PROFILE is set, so this is only needed to be
+run once per signal after that and before the server reads it (see src/ddl/migrations/covidcast_revision_profile.sql).
+"""
+
+# standard library
+import argparse
+import time
+
+# first party
+from delphi.epidata.acquisition.covidcast.database import Database
+from delphi.epidata.acquisition.covidcast.logger import get_structured_logger
+
+
+def get_argument_parser():
+  """Define command line arguments."""
+
+  parser = argparse.ArgumentParser()
+  parser.add_argument(
+    'signals',
+    nargs='+',
+    help='the signals to fill as source:signal')
+  parser.add_argument("--log_file", help="filename for log output")
+  return parser
+
+
+def main(args, database_impl=Database):
+  """Fill the revision profile of the given signals, committing after each one.
+
+  `args`: parsed command-line arguments
+  """
+
+  logger = get_structured_logger("fill_revision_profile", filename=args.log_file)
+  database = database_impl()
+  database.connect()
+
+  commit = False
+  try:
+    for source_signal in args.signals:
+      source, signal = source_signal.split(':', 1)
+      start_time = time.time()
+      database.fill_revision_profile(source, signal)
+      database.commit()
+      logger.info(
+          "Filled revision profile",
+          source=source,
+          signal=signal,
+          total_runtime_in_seconds=round(time.time() - start_time, 2))
+    commit = True
+  finally:
+    database.disconnect(commit)
+
+
+if __name__ == '__main__':
+  main(get_argument_parser().parse_args())
@@ -129,7 +129,8 @@ import mysql.connector
 from . import fluview
 from . import fluview_locations
 import delphi.operations.secrets as secrets
-from delphi.utils.epiweek import delta_epiweeks, join_epiweek
+from delphi.utils.epiweek import join_epiweek
+from delphi.epidata.server.utils.calendar import delta_weeks
 
 # sheet names
 ILINET_SHEET = 'ILINet.csv'
@@ -337,7 +338,7 @@ def update_from_file_clinical(issue, date, filename, test_mode=False):
   # insert each row
   insert = cnx.cursor()
   for row in entries:
-    lag = delta_epiweeks(row['epiweek'], issue)
+    lag = delta_weeks(row['epiweek'], issue)
     args = [
       row['total_specimens'], row['total_a'], row['total_b'],
       row['percent_positive'], row['percent_a'], row['percent_b']
@@ -399,7 +400,7 @@ def update_from_file_public(issue, date, filename, test_mode=False):
   # insert each row
   insert = cnx.cursor()
   for row in entries:
-    lag = delta_epiweeks(row['epiweek'], issue)
+    lag = delta_weeks(row['epiweek'], issue)
     args = [
       row['total_specimens'], row['total_a_h1n1'], row['total_a_h3'],
       row['total_a_h3n2v'], row['total_a_no_sub'], row['total_b'], 
@@ -465,7 +466,7 @@ def update_from_file(issue, date, filename, test_mode=False):
   # insert each row
   insert = cnx.cursor()
   for row in entries:
-    lag = delta_epiweeks(row['epiweek'], issue)
+    lag = delta_weeks(row['epiweek'], issue)
     args = [
       row['n_ili'], row['n_patients'], row['n_providers'], row['wili'],
       row['ili'], row['age0'], row['age1'], row['age2'], row['age3'],
@@ -28,6 +28,7 @@ Data is public.
 | issue                        | int(11)     | NO   |     | NULL    |                |
 | lag                          | int(11)     | NO   |     | NULL    |                |
 | is_latest_issue              | binary(1)   | NO   |     | NULL    |                |
+| next_issue                   | int(11)     | YES  |     | NULL    |                |
 | is_wip                       | binary(1)   | YES  |     | NULL    |                |
 | missing_value                | int(1)      | YES  |     | NULL    |                |
 | missing_stderr               | int(1)      | YES  |     | NULL    |                |
@@ -72,6 +73,9 @@ Data is public.
   the number of time_type units between `time_value` and `issue`
 - `is_latest_issue`
   flag which indicates whether or not the row corresponds to the latest issue for its key
+- `next_issue` (NULL for the latest issue)
+  the next issue of the same key, i.e. the row is the version of its key as of the issues from `issue` until before
+  `next_issue`; only maintained once enabled (see src/ddl/migrations/covidcast_next_issue.sql)
 - `is_wip`
   flag indicating that the signal is a 'work in progress'.  this should be True iff `signal` has a 'wip_' prefix.
 - `missing_value`
@@ -100,6 +104,7 @@ CREATE TABLE `covidcast` (
   `issue` int(11) NOT NULL,
   `lag` int(11) NOT NULL,
   `is_latest_issue` binary(1) NOT NULL,
+  `next_issue` int(11) DEFAULT NULL,
   `is_wip` binary(1) DEFAULT NULL,
   `missing_value` int(1) DEFAULT 0,
   `missing_stderr` int(1) DEFAULT 0,
@@ -109,12 +114,98 @@ CREATE TABLE `covidcast` (
   UNIQUE KEY (`source`, `signal`, `time_type`, `geo_type`, `time_value`, `geo_value`, `issue`),
   -- for fast lookup of a time-series for a given location
   KEY `by_issue` (`source`, `signal`, `time_type`, `geo_type`, `geo_value`, `time_value`, `issue`),
-  KEY `by_lag` (`source`, `signal`, `time_type`, `geo_type`, `geo_value`, `time_value`, `lag`)
+  KEY `by_lag` (`source`, `signal`, `time_type`, `geo_type`, `geo_value`, `time_value`, `lag`),
+  -- for fast lookup of the version of a time-series as of an issue, both issue bounds are checked within the index
+  KEY `by_as_of` (`source`, `signal`, `time_type`, `geo_type`, `geo_value`, `time_value`, `next_issue`, `issue`)
 ) ENGINE=InnoDB DEFAULT CHARSET=utf8;
 
 -- important index for computing metadata efficiently (dont forget to use a hint in your query!)
 CREATE INDEX `for_metadata` ON `covidcast` (`source`, `signal`, `is_latest_issue`);
 
+/*
+`covidcast_latest` stores the latest issue of each `covidcast` key, i.e. the rows of `covidcast` with
+`is_latest_issue` set. Once enabled (see src/ddl/migrations/covidcast_latest.sql), it is maintained by the acquisition
+in the same transaction as `covidcast` and read by the server for all requests without `issues`, `lag`, or `as_of`.
+
+Data is public.
+
+The fields are the ones of `covidcast` without `id` and `is_latest_issue`. Existing data is copied once per signal by
+src/acquisition/covidcast/fill_latest.py.
+*/
+
+CREATE TABLE `covidcast_latest` (
+  `source` varchar(32) NOT NULL,
+  `signal` varchar(64) NOT NULL,
+  `time_type` varchar(12) NOT NULL,
+  `geo_type` varchar(12) NOT NULL,
+  `time_value` int(11) NOT NULL,
+  `geo_value` varchar(12) NOT NULL,
+  `value_updated_timestamp` int(11) NOT NULL,
+  `value` double,
+  `stderr` double,
+  `sample_size` double,
+  `direction_updated_timestamp` int(11) NOT NULL,
+  `direction` int(11),
+  `issue` int(11) NOT NULL,
+  `lag` int(11) NOT NULL,
+  `is_wip` binary(1) DEFAULT NULL,
+  `missing_value` int(1) DEFAULT 0,
+  `missing_stderr` int(1) DEFAULT 0,
+  `missing_sample_size` int(1) DEFAULT 0,
+  -- for uniqueness, and also fast lookup of all locations on a given date
+  PRIMARY KEY (`source`, `signal`, `time_type`, `geo_type`, `time_value`, `geo_value`),
+  -- for fast lookup of a time-series for a given location, named like the one of `covidcast` for the same index hints
+  KEY `by_issue` (`source`, `signal`, `time_type`, `geo_type`, `geo_value`, `time_value`)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8;
+
+/*
+`covidcast_revision_profile` stores the revision profile of each `covidcast` time series, i.e. for a fixed set of lags
+(see `REVISION_PROFILE_LAGS` in src/acquisition/covidcast/database.py) the value that was known that many time units
+after `time_value`. Once enabled (see src/ddl/migrations/covidcast_revision_profile.sql), it is maintained by the
+acquisition and read by the `covidcast/backfill` endpoint instead of the full issue history.
+
+Data is public.
+
++-------------+-------------+------+-----+---------+-------+
+| Field       | Type        | Null | Key | Default | Extra |
++-------------+-------------+------+-----+---------+-------+
+| source      | varchar(32) | NO   | PRI | NULL    |       |
+| signal      | varchar(64) | NO   | PRI | NULL    |       |
+| time_type   | varchar(12) | NO   | PRI | NULL    |       |
+| geo_type    | varchar(12) | NO   | PRI | NULL    |       |
+| geo_value   | varchar(12) | NO   | PRI | NULL    |       |
+| time_value  | int(11)     | NO   | PRI | NULL    |       |
+| lag         | int(11)     | NO   | PRI | NULL    |       |
+| issue       | int(11)     | NO   |     | NULL    |       |
+| value       | double      | YES  |     | NULL    |       |
+| sample_size | double      | YES  |     | NULL    |       |
++-------------+-------------+------+-----+---------+-------+
+
+- `source`, `signal`, `time_type`, `geo_type`, `geo_value`, `time_value`
+  the time series and time unit like in `covidcast`
+- `lag`
+  one of the profile lags in time_type units
+- `issue`
+  the latest issue of the time unit with a `covidcast` lag of at most `lag`
+- `value`, `sample_size`
+  the values of this issue
+*/
+
+CREATE TABLE `covidcast_revision_profile` (
+  `source` varchar(32) NOT NULL,
+  `signal` varchar(64) NOT NULL,
+  `time_type` varchar(12) NOT NULL,
+  `geo_type` varchar(12) NOT NULL,
+  `geo_value` varchar(12) NOT NULL,
+  `time_value` int(11) NOT NULL,
+  `lag` int(11) NOT NULL,
+  `issue` int(11) NOT NULL,
+  `value` double,
+  `sample_size` double,
+  -- for fast lookup of the profile of a time-series for a given location
+  PRIMARY KEY (`source`, `signal`, `time_type`, `geo_type`, `geo_value`, `time_value`, `lag`)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8;
+
 /*
 `covidcast_meta_cache` stores a cache of the `covidcast_meta` endpoint
 response, e.g. for faster visualization load times.
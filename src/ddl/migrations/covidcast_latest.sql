@@ -0,0 +1,33 @@
+/*
+Adds `covidcast_latest` to an existing `epidata` database (see src/ddl/covidcast.sql), the first step of enabling it:
+
+1. apply this migration
+2. set COVIDCAST_MAINTAIN_LATEST=1 for the imports (see src/acquisition/covidcast/database.py)
+3. run src/acquisition/covidcast/fill_latest.py for all existing signals
+4. set COVIDCAST_LATEST_TABLE=covidcast_latest for the server (see src/server/_config.py)
+*/
+
+CREATE TABLE `covidcast_latest` (
+  `source` varchar(32) NOT NULL,
+  `signal` varchar(64) NOT NULL,
+  `time_type` varchar(12) NOT NULL,
+  `geo_type` varchar(12) NOT NULL,
+  `time_value` int(11) NOT NULL,
+  `geo_value` varchar(12) NOT NULL,
+  `value_updated_timestamp` int(11) NOT NULL,
+  `value` double,
+  `stderr` double,
+  `sample_size` double,
+  `direction_updated_timestamp` int(11) NOT NULL,
+  `direction` int(11),
+  `issue` int(11) NOT NULL,
+  `lag` int(11) NOT NULL,
+  `is_wip` binary(1) DEFAULT NULL,
+  `missing_value` int(1) DEFAULT 0,
+  `missing_stderr` int(1) DEFAULT 0,
+  `missing_sample_size` int(1) DEFAULT 0,
+  -- for uniqueness, and also fast lookup of all locations on a given date
+  PRIMARY KEY (`source`, `signal`, `time_type`, `geo_type`, `time_value`, `geo_value`),
+  -- for fast lookup of a time-series for a given location, named like the one of `covidcast` for the same index hints
+  KEY `by_issue` (`source`, `signal`, `time_type`, `geo_type`, `geo_value`, `time_value`)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8;
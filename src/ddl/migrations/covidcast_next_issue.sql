@@ -0,0 +1,13 @@
+/*
+Adds `next_issue` and the `by_as_of` key to `covidcast` of an existing `epidata` database (see src/ddl/covidcast.sql),
+the first step of enabling it:
+
+1. apply this migration
+2. set COVIDCAST_MAINTAIN_NEXT_ISSUE=1 for the imports (see src/acquisition/covidcast/database.py)
+3. run src/acquisition/covidcast/fill_next_issue.py for all existing signals
+4. set COVIDCAST_AS_OF_NEXT_ISSUE=1 for the server (see src/server/_config.py)
+*/
+
+ALTER TABLE `covidcast`
+  ADD COLUMN `next_issue` int(11) DEFAULT NULL AFTER `is_latest_issue`,
+  ADD KEY `by_as_of` (`source`, `signal`, `time_type`, `geo_type`, `geo_value`, `time_value`, `next_issue`, `issue`);
@@ -0,0 +1,24 @@
+/*
+Adds `covidcast_revision_profile` to an existing `epidata` database (see src/ddl/covidcast.sql), the first step of
+enabling it:
+
+1. apply this migration
+2. set COVIDCAST_MAINTAIN_REVISION_PROFILE=1 for the imports (see src/acquisition/covidcast/database.py)
+3. run src/acquisition/covidcast/fill_revision_profile.py for all existing signals
+4. set REVISION_PROFILE_LAGS for the server (see src/server/_config.py)
+*/
+
+CREATE TABLE `covidcast_revision_profile` (
+  `source` varchar(32) NOT NULL,
+  `signal` varchar(64) NOT NULL,
+  `time_type` varchar(12) NOT NULL,
+  `geo_type` varchar(12) NOT NULL,
+  `geo_value` varchar(12) NOT NULL,
+  `time_value` int(11) NOT NULL,
+  `lag` int(11) NOT NULL,
+  `issue` int(11) NOT NULL,
+  `value` double,
+  `sample_size` double,
+  -- for fast lookup of the profile of a time-series for a given location
+  PRIMARY KEY (`source`, `signal`, `time_type`, `geo_type`, `geo_value`, `time_value`, `lag`)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8;
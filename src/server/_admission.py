@@ -0,0 +1,83 @@
+from threading import BoundedSemaphore, Lock
+from typing import Callable, Dict, Optional
+
+from flask import Response
+
+from ._config import ADMISSION_HEAVY_CONCURRENCY, ADMISSION_HEAVY_ROWS, ADMISSION_MAX_ROWS, ADMISSION_QUEUE_TIMEOUT
+from ._exceptions import RequestTooLargeException, ServiceBusyException
+
+
+class AdmissionPool:
+    """
+    a bounded number of slots for concurrently running large requests of this worker process
+    """
+
+    def __init__(self, max_concurrent: int, timeout: float):
+        self.max_concurrent = max_concurrent
+        self.timeout = timeout
+        self.active = 0
+        self.admitted = 0
+        self.rejected = 0
+        self._slots = BoundedSemaphore(max(max_concurrent, 1))
+        self._lock = Lock()
+
+    def acquire(self) -> Callable[[], None]:
+        """
+        waits for a free slot and returns the function to release it again, which can be called multiple times
+        """
+        if not self._slots.acquire(timeout=self.timeout):
+            with self._lock:
+                self.rejected += 1
+            raise ServiceBusyException()
+        with self._lock:
+            self.active += 1
+            self.admitted += 1
+        released = False
+
+        def release():
+            nonlocal released
+            with self._lock:
+                if released:
+                    return
+                released = True
+                self.active -= 1
+            self._slots.release()
+
+        return release
+
+    def as_dict(self) -> Dict[str, int]:
+        with self._lock:
+            return dict(max_concurrent=self.max_concurrent, active=self.active, admitted=self.admitted, rejected=self.rejected)
+
+
+heavy_requests = AdmissionPool(ADMISSION_HEAVY_CONCURRENCY, ADMISSION_QUEUE_TIMEOUT)
+
+
+def admit(estimated_rows: Optional[float]) -> Optional[Callable[[], None]]:
+    """
+    rejects requests over the row limit and waits for a slot for large ones, returns the function to free the slot
+    """
+    if estimated_rows is None:
+        # unknown
+        return None
+    if ADMISSION_MAX_ROWS > 0 and estimated_rows > ADMISSION_MAX_ROWS:
+        raise RequestTooLargeException(estimated_rows, ADMISSION_MAX_ROWS)
+    if estimated_rows >= ADMISSION_HEAVY_ROWS:
+        return heavy_requests.acquire()
+    return None
+
+
+def run_admitted(estimated_rows: Optional[float], respond: Callable[[], Response]) -> Response:
+    """
+    creates the response after admitting the request, a large request keeps its slot till the response is sent
+    """
+    release = admit(estimated_rows)
+    if release is None:
+        return respond()
+    try:
+        r = respond()
+    except BaseException:
+        release()
+        raise
+    r.call_on_close(release)
+    return r
@@ -0,0 +1,195 @@
+from collections import OrderedDict
+from dataclasses import dataclass
+from functools import wraps
+from hashlib import sha256
+from threading import Lock
+from time import monotonic
+from typing import Any, Callable, Dict, Hashable, Iterable, Iterator, List, Optional, Tuple
+
+from flask import Response, make_response, request
+from sqlalchemy import text
+
+from ._common import app, db, is_compatibility_mode
+from ._compression import negotiate_encoding
+from ._config import RESPONSE_CACHE_MAX_AGE, RESPONSE_CACHE_MAX_BYTES, RESPONSE_CACHE_MAX_ENTRY_BYTES, RESPONSE_CACHE_PROBE_INTERVAL
+from ._validate import resolve_auth_token
+
+DataVersionProbe = Callable[[], Optional[Hashable]]
+
+
+@dataclass
+class CachedResponse:
+    version: Hashable
+    created: float
+    status: int
+    headers: List[Tuple[str, str]]
+    body: bytes
+
+
+class ResponseCache:
+    """
+    a size bounded LRU cache of complete response bodies, each tagged with the data version it was computed for
+    """
+
+    def __init__(self, max_bytes: int, max_entry_bytes: int, max_age: float):
+        self.max_bytes = max_bytes
+        self.max_entry_bytes = max_entry_bytes
+        self.max_age = max_age
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self._entries: "OrderedDict[Hashable, CachedResponse]" = OrderedDict()
+        self._lock = Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: Hashable, version: Hashable) -> Optional[CachedResponse]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry.version != version or monotonic() - entry.created > self.max_age:
+                if entry is not None:
+                    # outdated
+                    self._remove(key)
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry
+
+    def put(self, key: Hashable, entry: CachedResponse) -> bool:
+        if len(entry.body) > self.max_entry_bytes or len(entry.body) > self.max_bytes:
+            return False
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = entry
+            self.size += len(entry.body)
+            while self.size > self.max_bytes:
+                # evict the least recently used ones
+                self._remove(next(iter(self._entries)))
+        return True
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.size = 0
+
+    def _remove(self, key: Hashable):
+        entry = self._entries.pop(key)
+        self.size -= len(entry.body)
+
+
+response_cache = ResponseCache(RESPONSE_CACHE_MAX_BYTES, RESPONSE_CACHE_MAX_ENTRY_BYTES, RESPONSE_CACHE_MAX_AGE)
+
+_probed_versions: Dict[DataVersionProbe, Tuple[float, Optional[Hashable]]] = {}
+
+
+def _probe_version(probe: DataVersionProbe) -> Optional[Hashable]:
+    # reuse the last probed data version for a short time
+    now = monotonic()
+    last = _probed_versions.get(probe)
+    if last is not None and now - last[0] < RESPONSE_CACHE_PROBE_INTERVAL:
+        return last[1]
+    try:
+        version = probe()
+    except Exception:
+        app.logger.warning("cannot probe the data version", exc_info=True)
+        version = None
+    _probed_versions[probe] = (now, version)
+    return version
+
+
+def covidcast_version() -> Optional[Hashable]:
+    """
+    the data version of the covidcast tables, it changes whenever an import adds rows to `covidcast` and whenever the
+    metadata cache is updated after an acquisition, which also covers values updated in place
+    """
+    # the max id is read from the end of the primary key, the timestamp has just a resolution of seconds, thus include
+    # the size too
+    row = db.execute(
+        text("SELECT (SELECT MAX(`id`) FROM `covidcast`) AS `max_id`, `timestamp`, LENGTH(`epidata`) AS `size` FROM `covidcast_meta_cache` LIMIT 1")
+    ).fetchone()
+    return (row["max_id"], row["timestamp"], row["size"]) if row else None
+
+
+def max_issue_version(*tables: str) -> DataVersionProbe:
+    """
+    creates a data version probe using the max issue of the given tables, which have to be indexed by `issue`
+    """
+
+    def probe() -> Optional[Hashable]:
+        selects = ", ".join(f"(SELECT MAX(`issue`) FROM `{table}`)" for table in tables)
+        return tuple(db.execute(text(f"SELECT {selects}")).fetchone())
+
+    return probe
+
+
+def _request_key(handler: Callable) -> Hashable:
+    params = sorted((k, v.strip()) for k, v in request.values.items(multi=True))
+    auth = resolve_auth_token()
+    return (
+        handler.__module__,
+        handler.__name__,
+        is_compatibility_mode(),
+        tuple(params),
+        sha256(auth.encode("utf-8")).hexdigest() if auth else None,
+        negotiate_encoding(),
+    )
+
+
+def _record(response: Response, key: Hashable, version: Hashable) -> Response:
+    if response.status_code != 200 or not response.is_sequence and not response.is_streamed:
+        return response
+
+    created = monotonic()
+    chunks: Iterable[bytes] = response.response
+    headers = [(k, v) for k, v in response.headers.items() if k.lower() != "content-length"]
+
+    def tee() -> Iterator[bytes]:
+        body: Optional[List[bytes]] = []
+        size = 0
+        try:
+            for chunk in chunks:
+                if isinstance(chunk, str):
+                    chunk = chunk.encode(response.charset)
+                if body is not None:
+                    body.append(chunk)
+                    size += len(chunk)
+                    if size > response_cache.max_entry_bytes:
+                        # too big, just stream it
+                        body = None
+                yield chunk
+        finally:
+            getattr(chunks, "close", lambda: None)()
+        printer = getattr(response, "printer", None)
+        if body is not None and (printer is None or printer.result != -1):
+            response_cache.put(key, CachedResponse(version, created, response.status_code, headers, b"".join(body)))
+
+    response.response = tee()
+    return response
+
+
+def cached(probe: DataVersionProbe):
+    """
+    caches the complete responses of the decorated handler until the data version returned by the probe changes
+    """
+
+    def decorator(handler: Callable[..., Any]) -> Callable[..., Any]:
+        @wraps(handler)
+        def wrapper(*args, **kwargs):
+            if response_cache.max_bytes <= 0:
+                return handler(*args, **kwargs)
+            version = _probe_version(probe)
+            if version is None:
+                # unknown data version
+                return handler(*args, **kwargs)
+            key = _request_key(handler)
+            entry = response_cache.get(key, version)
+            if entry is not None:
+                return Response(entry.body, status=entry.status, headers=entry.headers)
+            return _record(make_response(handler(*args, **kwargs)), key, version)
+
+        return wrapper
+
+    return decorator
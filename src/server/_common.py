@@ -1,11 +1,12 @@
+from time import perf_counter
 from typing import cast
 
-from flask import Flask, g, request
+from flask import Flask, g
 from sqlalchemy.engine import Connection
 from werkzeug.local import LocalProxy
 
 from ._config import SECRET
-from ._db import engine
+from ._db import engine, pool_stats
 from ._exceptions import DatabaseErrorException
 
 app = Flask("EpiData", static_url_path="")
@@ -13,8 +14,16 @@ app.config["SECRET"] = SECRET
 
 
 def _get_db() -> Connection:
+    # check out a connection from the pool on first use only
     if "db" not in g:
-        conn = engine.connect()
+        start = perf_counter()
+        try:
+            conn = engine.connect()
+        except Exception:
+            pool_stats.record_checkout(perf_counter() - start, failed=True)
+            app.logger.error("database connection error", exc_info=True)
+            raise DatabaseErrorException()
+        pool_stats.record_checkout(perf_counter() - start)
         g.db = conn
     return g.db
 
@@ -25,25 +34,19 @@ access to the SQL Alchemy connection for this request
 db: Connection = cast(Connection, LocalProxy(_get_db))
 
 
-@app.before_request
-def connect_db():
-    if request.path.startswith('/lib'):
-        return
-    # try to get the db
-    try:
-        _get_db()
-    except:
-        app.logger.error('database connection error', exc_info=True)
-        raise DatabaseErrorException()
+def release_db():
+    """
+    returns the connection of this request to the pool, e.g. once all rows have been sent. a later access checks out a new one
+    """
+    conn = g.pop("db", None)
+    if conn is not None:
+        conn.close()
 
 
 @app.teardown_appcontext
 def teardown_db(exception=None):
     # close the db connection
-    db = g.pop("db", None)
-
-    if db is not None:
-        db.close()
+    release_db()
 
 
 def is_compatibility_mode() -> bool:
@@ -0,0 +1,81 @@
+import zlib
+from typing import Callable, Dict, Iterable, Iterator, List, Optional
+
+from flask import Response, request
+
+from ._config import COMPRESSION_ENCODINGS, GZIP_LEVEL, ZSTD_LEVEL
+
+
+def _zstandard():
+    # zstandard is optional, without it just gzip is offered
+    try:
+        import zstandard
+    except ImportError:
+        return None
+    return zstandard
+
+
+def _gzip_stream(chunks: Iterable[bytes]) -> Iterator[bytes]:
+    compressor = zlib.compressobj(GZIP_LEVEL, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    for chunk in chunks:
+        # sync flush such that the client can decode every chunk as soon as it arrives
+        yield compressor.compress(chunk) + compressor.flush(zlib.Z_SYNC_FLUSH)
+    yield compressor.flush()
+
+
+def _zstd_stream(chunks: Iterable[bytes]) -> Iterator[bytes]:
+    zstandard = _zstandard()
+    compressor = zstandard.ZstdCompressor(level=ZSTD_LEVEL).compressobj()
+    for chunk in chunks:
+        yield compressor.compress(chunk) + compressor.flush(zstandard.COMPRESSOBJ_FLUSH_BLOCK)
+    yield compressor.flush()
+
+
+_COMPRESSORS: Dict[str, Callable[[Iterable[bytes]], Iterator[bytes]]] = {
+    "zstd": _zstd_stream,
+    "gzip": _gzip_stream,
+}
+
+
+def supported_encodings() -> List[str]:
+    """
+    returns the enabled content encodings, in the order of preference
+    """
+    return [e for e in _COMPRESSORS if e in COMPRESSION_ENCODINGS and (e != "zstd" or _zstandard() is not None)]
+
+
+def negotiate_encoding() -> Optional[str]:
+    """
+    returns the content encoding to use for this request based on its Accept-Encoding header
+    """
+    encodings = supported_encodings()
+    if not encodings:
+        return None
+    return request.accept_encodings.best_match(encodings)
+
+
+def compress_stream(chunks: Iterable[bytes], encoding: str) -> Iterator[bytes]:
+    """
+    compresses the given stream incrementally, chunk by chunk
+    """
+    try:
+        for compressed in _COMPRESSORS[encoding](chunks):
+            if compressed:
+                yield compressed
+    finally:
+        # stop the producer in case the client went away
+        getattr(chunks, "close", lambda: None)()
+
+
+def compress_response(response: Response) -> Response:
+    """
+    wraps the body of the given streamed response with the negotiated compression
+    """
+    response.vary.add("Accept-Encoding")
+    encoding = negotiate_encoding()
+    if encoding is None:
+        return response
+    response.response = compress_stream(response.response, encoding)
+    response.headers["Content-Encoding"] = encoding
+    response.headers.pop("Content-Length", None)
+    return response
@@ -10,6 +10,69 @@ VERSION = "0.1.2"
 MAX_RESULTS = int(10e6)
 MAX_COMPATIBILITY_RESULTS = int(3650)
 
+# size in bytes of the chunks a streamed response is sent in and the max seconds to wait before sending a smaller one
+STREAM_CHUNK_SIZE = int(os.environ.get("STREAM_CHUNK_SIZE", 64 * 1024))
+STREAM_CHUNK_MAX_DELAY = float(os.environ.get("STREAM_CHUNK_MAX_DELAY", 1.0))
+
+# content encodings offered for streamed responses (zstd requires the zstandard package) and their compression levels
+COMPRESSION_ENCODINGS = [e.strip() for e in os.environ.get("COMPRESSION_ENCODINGS", "zstd,gzip").split(",") if e.strip()]
+GZIP_LEVEL = int(os.environ.get("GZIP_LEVEL", 6))
+ZSTD_LEVEL = int(os.environ.get("ZSTD_LEVEL", 3))
+
+# max number of queries of a multi query request (see `execute_queries`) that run concurrently on their own pooled
+# connections (<= 1 = one after another on the request connection), the max rows buffered per query while it waits
+# for the previous ones to be sent, and the number of rows fetched at once
+CONCURRENT_QUERIES = int(os.environ.get("CONCURRENT_QUERIES", 1))
+CONCURRENT_QUERY_BUFFER_ROWS = int(os.environ.get("CONCURRENT_QUERY_BUFFER_ROWS", 10_000))
+CONCURRENT_QUERY_BATCH_ROWS = int(os.environ.get("CONCURRENT_QUERY_BATCH_ROWS", 500))
+
+# ASGI mode (see asgi.py): number of chunks buffered per response till the client catches up and the max number of
+# requests served concurrently by one process, each on its own thread
+ASGI_STREAM_BUFFER_CHUNKS = int(os.environ.get("ASGI_STREAM_BUFFER_CHUNKS", 16))
+ASGI_MAX_CONCURRENT_REQUESTS = int(os.environ.get("ASGI_MAX_CONCURRENT_REQUESTS", 2000))
+
+# per worker cache of complete responses: total size in bytes (0 = disabled), max size of a single response,
+# max age in seconds of an entry and how long (seconds) a probed data version is reused
+RESPONSE_CACHE_MAX_BYTES = int(os.environ.get("RESPONSE_CACHE_MAX_BYTES", 64 * 1024 * 1024))
+RESPONSE_CACHE_MAX_ENTRY_BYTES = int(os.environ.get("RESPONSE_CACHE_MAX_ENTRY_BYTES", 4 * 1024 * 1024))
+RESPONSE_CACHE_MAX_AGE = float(os.environ.get("RESPONSE_CACHE_MAX_AGE", 10 * 60))
+RESPONSE_CACHE_PROBE_INTERVAL = float(os.environ.get("RESPONSE_CACHE_PROBE_INTERVAL", 10))
+
+# slow query log (see _slow_query.py): queries taking at least the threshold in seconds (0 = disabled) are logged
+# together with their EXPLAIN output, each query shape is explained at most once per interval (seconds). Entries are
+# written to the given rotating log file or else the regular log. The number of tracked query shapes and of recent
+# slow queries kept for the /slow_queries endpoint is bounded
+SLOW_QUERY_THRESHOLD = float(os.environ.get("SLOW_QUERY_THRESHOLD", 5.0))
+SLOW_QUERY_EXPLAIN_INTERVAL = float(os.environ.get("SLOW_QUERY_EXPLAIN_INTERVAL", 10 * 60))
+SLOW_QUERY_LOG_FILE = os.environ.get("SLOW_QUERY_LOG_FILE", "")
+SLOW_QUERY_LOG_MAX_BYTES = int(os.environ.get("SLOW_QUERY_LOG_MAX_BYTES", 16 * 1024 * 1024))
+SLOW_QUERY_LOG_BACKUPS = int(os.environ.get("SLOW_QUERY_LOG_BACKUPS", 4))
+SLOW_QUERY_MAX_FINGERPRINTS = int(os.environ.get("SLOW_QUERY_MAX_FINGERPRINTS", 1000))
+SLOW_QUERY_RECENT = int(os.environ.get("SLOW_QUERY_RECENT", 100))
+
+# admission control of large requests (see _admission.py): requests estimated to match at least the given number of
+# rows share a per worker pool of that many concurrent slots and wait at most the given seconds for one, requests
+# above the max rows are rejected (0 = no limit)
+ADMISSION_HEAVY_ROWS = int(os.environ.get("ADMISSION_HEAVY_ROWS", 1_000_000))
+ADMISSION_HEAVY_CONCURRENCY = int(os.environ.get("ADMISSION_HEAVY_CONCURRENCY", 2))
+ADMISSION_QUEUE_TIMEOUT = float(os.environ.get("ADMISSION_QUEUE_TIMEOUT", 30))
+ADMISSION_MAX_ROWS = int(os.environ.get("ADMISSION_MAX_ROWS", 100_000_000))
+
+# endpoint modules are imported on their first request (see endpoints/manifest.py), the comma separated modules given
+# here are imported when the app starts instead ("*" = all), e.g. to avoid a slow first covidcast request
+ENDPOINT_WARMUP = [m.strip() for m in os.environ.get("ENDPOINT_WARMUP", "").split(",") if m.strip()]
+
+# number of rows per record batch / row group of the arrow and parquet formats
+ARROW_BATCH_SIZE = int(os.environ.get("ARROW_BATCH_SIZE", 64 * 1024))
+
+# number of rows the csv format formats at once
+CSV_BATCH_SIZE = int(os.environ.get("CSV_BATCH_SIZE", 1000))
+
+# the tree formats keep the serialized rows of groups that cannot be streamed in memory up to this many bytes and spill
+# them to a temporary file (in the given directory, default = system temp directory) beyond
+TREE_SPILL_BYTES = int(os.environ.get("TREE_SPILL_BYTES", 16 * 1024 * 1024))
+TREE_SPILL_DIR = os.environ.get("TREE_SPILL_DIR") or None
+
 SQLALCHEMY_DATABASE_URI = os.environ.get("SQLALCHEMY_DATABASE_URI", "sqlite:///test.db")
 SQLALCHEMY_ENGINE_OPTIONS = json.loads(os.environ.get("SQLALCHEMY_ENGINE_OPTIONS", "{}"))
 SECRET = os.environ.get("FLASK_SECRET", "secret")
@@ -24,6 +87,8 @@ AUTH = {
     "quidel": os.environ.get("SECRET_QUIDEL"),
     "norostat": os.environ.get("SECRET_NOROSTAT"),
     "afhsb": os.environ.get("SECRET_AFHSB"),
+    # operational endpoints like /pool_stats
+    "admin": os.environ.get("SECRET_ADMIN"),
 }
 
 # begin sensor query authentication configuration
@@ -67,3 +132,20 @@ REGION_TO_STATE = {
     "cen9": ["AK", "CA", "HI", "OR", "WA"],
 }
 NATION_REGION = "nat"
+
+# lags (in days) of the revision profiles in the covidcast_revision_profile table, which have to match the ones of the
+# acquisition (see src/acquisition/covidcast/database.py). /covidcast/backfill requests for one of these anchor lags read
+# the profile instead of the full issue history (empty = never). Set it to 0,1,2,3,4,5,6,7,14,21,28,35,42,49,56,60,90
+# only after the steps in src/ddl/migrations/covidcast_revision_profile.sql. The profile leaves out the issues that
+# were superseded between two of its lags (see docs/api/covidcast.md)
+REVISION_PROFILE_LAGS = [int(v) for v in os.environ.get("REVISION_PROFILE_LAGS", "").split(",") if v.strip()]
+
+# table with just the latest issue of each covidcast key (see src/ddl/covidcast.sql) that covidcast requests without
+# issues, lag, or as_of read instead of filtering the full issue history by is_latest_issue (empty = never). Set it to
+# covidcast_latest only after the steps in src/ddl/migrations/covidcast_latest.sql
+COVIDCAST_LATEST_TABLE = os.environ.get("COVIDCAST_LATEST_TABLE", "")
+
+# 1 = covidcast requests with as_of read the rows whose issue range (issue until before next_issue) contains it with
+# the by_as_of index instead of grouping all issues up to as_of by key. Enable it only after the steps in
+# src/ddl/migrations/covidcast_next_issue.sql
+COVIDCAST_AS_OF_NEXT_ISSUE = os.environ.get("COVIDCAST_AS_OF_NEXT_ISSUE", "0") == "1"
@@ -1,13 +1,68 @@
-from typing import Dict, List
-from sqlalchemy import MetaData, create_engine, inspect
+from threading import Lock
+from typing import Any, Dict, List
+from sqlalchemy import MetaData, create_engine, event, inspect
 from sqlalchemy.engine import Engine
 from sqlalchemy.engine.reflection import Inspector
+from sqlalchemy.pool import QueuePool
 
 from ._config import SQLALCHEMY_DATABASE_URI, SQLALCHEMY_ENGINE_OPTIONS
 
 engine: Engine = create_engine(SQLALCHEMY_DATABASE_URI, **SQLALCHEMY_ENGINE_OPTIONS)
 metadata = MetaData(bind=engine)
 
+
+class PoolStats:
+    """
+    connection pool usage statistics of this worker process
+    """
+
+    def __init__(self):
+        self.connects = 0
+        self.checkouts = 0
+        self.checkins = 0
+        self.invalidations = 0
+        self.checkout_errors = 0
+        # seconds spent waiting for a connection to be checked out
+        self.wait_time = 0.0
+        self.max_wait_time = 0.0
+        self._lock = Lock()
+
+    def record_checkout(self, wait_time: float, failed: bool = False):
+        with self._lock:
+            self.wait_time += wait_time
+            self.max_wait_time = max(self.max_wait_time, wait_time)
+            if failed:
+                self.checkout_errors += 1
+
+    def _count(self, field: str):
+        with self._lock:
+            setattr(self, field, getattr(self, field) + 1)
+
+    def as_dict(self) -> Dict[str, Any]:
+        pool = engine.pool
+        r: Dict[str, Any] = dict(
+            connects=self.connects,
+            checkouts=self.checkouts,
+            checkins=self.checkins,
+            invalidations=self.invalidations,
+            checkout_errors=self.checkout_errors,
+            wait_time=self.wait_time,
+            max_wait_time=self.max_wait_time,
+            mean_wait_time=self.wait_time / self.checkouts if self.checkouts else 0.0,
+        )
+        if isinstance(pool, QueuePool):
+            r.update(size=pool.size(), checked_in=pool.checkedin(), checked_out=pool.checkedout(), overflow=max(pool.overflow(), 0))
+        return r
+
+
+pool_stats = PoolStats()
+
+event.listen(engine, "connect", lambda *_: pool_stats._count("connects"))
+event.listen(engine, "checkout", lambda *_: pool_stats._count("checkouts"))
+event.listen(engine, "checkin", lambda *_: pool_stats._count("checkins"))
+event.listen(engine, "invalidate", lambda *_: pool_stats._count("invalidations"))
+event.listen(engine, "soft_invalidate", lambda *_: pool_stats._count("invalidations"))
+
 TABLE_OPTIONS = dict(
     mysql_engine="InnoDB",
     # mariadb_engine="InnoDB",
@@ -41,3 +41,16 @@ class DatabaseErrorException(EpiDataException):
         if details:
             msg = f"{msg}: {details}"
         super(DatabaseErrorException, self).__init__(msg, 500)
+
+
+class RequestTooLargeException(EpiDataException):
+    def __init__(self, estimated_rows: float, max_rows: int):
+        super(RequestTooLargeException, self).__init__(
+            f"request too large: it matches about {estimated_rows:,.0f} rows, at most {max_rows:,} are allowed. Please split it into multiple requests, e.g. by time range or locations",
+            413,
+        )
+
+
+class ServiceBusyException(EpiDataException):
+    def __init__(self):
+        super(ServiceBusyException, self).__init__("too many large requests in progress, please try again later", 503)
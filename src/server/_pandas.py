@@ -1,26 +1,36 @@
+from time import perf_counter
 from typing import Dict, Any, Optional
 import pandas as pd
 
-from sqlalchemy import text
-
 from ._common import engine
 from ._printer import create_printer, APrinter
-from ._query import filter_fields
+from ._query import bind_query, requested_fields
 from ._exceptions import DatabaseErrorException
+from ._slow_query import request_path, slow_queries
+from ._telemetry import span
 
 
 def as_pandas(query: str, params: Dict[str, Any], parse_dates: Optional[Dict[str, str]] = None) -> pd.DataFrame:
     try:
-        return pd.read_sql_query(text(str(query)), engine, params=params, parse_dates=parse_dates)
+        start = perf_counter()
+        with span("sql"):
+            df = pd.read_sql_query(bind_query(str(query), params), engine, params=params, parse_dates=parse_dates)
     except Exception as e:
         raise DatabaseErrorException(str(e))
+    slow_queries.observe(str(query), params, perf_counter() - start, len(df), request_path())
+    return df
 
 
 def print_pandas(df: pd.DataFrame):
     p = create_printer()
 
+    # drop the columns that are not requested before converting the rows
+    columns = requested_fields([str(c) for c in df.columns])
+    if columns is not None:
+        df = df[columns]
+
     def gen():
         for row in df.to_dict(orient="records"):
             yield row
 
-    return p(filter_fields(gen()))
+    return p(gen())
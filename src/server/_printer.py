@@ -1,13 +1,22 @@
-from csv import DictWriter
-from io import StringIO
-from typing import Any, Dict, Iterable, List, Optional, Union
+from csv import writer
+from io import RawIOBase, StringIO
+from itertools import islice
+from operator import itemgetter
+import re
+from tempfile import TemporaryFile
+from time import monotonic, perf_counter
+import unicodedata
+from typing import IO, Any, Callable, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple, Union, cast
 
 from flask import Response, jsonify, request, stream_with_context
 from flask.json import dumps
 import orjson
 
-from ._config import MAX_RESULTS, MAX_COMPATIBILITY_RESULTS
-from ._common import app, is_compatibility_mode
+from ._config import MAX_RESULTS, MAX_COMPATIBILITY_RESULTS, ARROW_BATCH_SIZE, CSV_BATCH_SIZE, TREE_SPILL_BYTES, TREE_SPILL_DIR, STREAM_CHUNK_SIZE, STREAM_CHUNK_MAX_DELAY
+from ._common import app, is_compatibility_mode, release_db
+from ._compression import compress_response
+from ._exceptions import ValidationFailedException
+from ._telemetry import TIMED_BATCH_SIZE, RequestTelemetry, current_telemetry
 
 
 def print_non_standard(data):
@@ -23,10 +32,19 @@ def print_non_standard(data):
 
 
 class APrinter:
+    # whether the response should be compressed if the client accepts it
+    compressible: bool = True
+
     def __init__(self):
         self.count: int = 0
         self.result: int = -1
         self._max_results: int = MAX_COMPATIBILITY_RESULTS if is_compatibility_mode() else MAX_RESULTS
+        # buffer the formatted rows and send them in chunks of this size (in bytes), 0 = one chunk per row
+        self.chunk_size: int = STREAM_CHUNK_SIZE
+        # send a chunk latest after this many seconds, even if it is smaller than the chunk size
+        self.chunk_max_delay: float = STREAM_CHUNK_MAX_DELAY
+        # continuation token to fetch the rows after the last one sent in case the result was truncated
+        self.next_cursor: Optional[str] = None
 
     def make_response(self, gen):
         return Response(
@@ -34,26 +52,84 @@ class APrinter:
             mimetype="application/json",
         )
 
+    def _chunked(self, parts: Iterable[Optional[Union[str, bytes]]], telemetry: Optional[RequestTelemetry] = None) -> Iterator[bytes]:
+        """
+        collects the given parts and yields them in chunks of about `chunk_size` bytes
+        """
+        chunk: List[bytes] = []
+        chunk_length = 0
+        last_sent = monotonic()
+        try:
+            for part in parts:
+                if not part:
+                    continue
+                if isinstance(part, str):
+                    part = part.encode("utf-8")
+                chunk.append(part)
+                chunk_length += len(part)
+                if telemetry is not None:
+                    telemetry.bytes += len(part)
+                if chunk_length >= self.chunk_size or monotonic() - last_sent >= self.chunk_max_delay:
+                    yield b"".join(chunk)
+                    chunk = []
+                    chunk_length = 0
+                    last_sent = monotonic()
+            if chunk:
+                yield b"".join(chunk)
+        finally:
+            # stop the producer in case the client went away
+            getattr(parts, "close", lambda: None)()
+
     def __call__(self, generator: Iterable[Dict[str, Any]]) -> Response:
+        telemetry = current_telemetry() or RequestTelemetry()
+
         def gen():
             self.result = -2  # no result, default response
             began = False
             try:
-                for row in generator:
-                    if not began:
-                        # do it here to catch an error before we send the begin
-                        r = self._begin()
-                        began = True
-                        if r is not None:
-                            yield r
-                    r = self._print_row(row)
-                    if r is not None:
-                        yield r
+                it = iter(generator)
+                while True:
+                    # the generator checks the remaining rows, thus don't fetch beyond them before they are printed
+                    batch: List[Dict[str, Any]] = []
+                    error: Optional[Exception] = None
+                    start = perf_counter()
+                    try:
+                        for row in islice(it, min(TIMED_BATCH_SIZE, self.remaining_rows) if self.remaining_rows > 0 else TIMED_BATCH_SIZE):
+                            batch.append(row)
+                    except Exception as e:
+                        # send the rows before the failed one first
+                        error = e
+                    telemetry.add("fetch", perf_counter() - start)
+                    if batch:
+                        if not began:
+                            # do it here to catch an error before we send the begin
+                            r = self._begin()
+                            began = True
+                            if r is not None:
+                                yield r
+                        parts: List[Optional[Union[str, bytes]]] = []
+                        start = perf_counter()
+                        try:
+                            for row in batch:
+                                parts.append(self._print_row(row))
+                        except Exception as e:
+                            error = e
+                        telemetry.add("serialize", perf_counter() - start)
+                        for r in parts:
+                            if r is not None:
+                                yield r
+                    if error is not None:
+                        raise error
+                    if not batch:
+                        break
             except Exception as e:
                 app.logger.exception(f"error executing: {str(e)}")
                 self.result = -1
                 yield self._error(e)
 
+            # all rows are fetched, give the connection back before the remaining bytes are sent
+            release_db()
+
             if not began:
                 # do it manually to catch an error before we send the begin
                 r = self._begin()
@@ -61,11 +137,20 @@ class APrinter:
                 if r is not None:
                     yield r
 
+            start = perf_counter()
             r = self._end()
-            if r is not None:
+            telemetry.add("serialize", perf_counter() - start)
+            telemetry.rows += self.count
+            if isinstance(r, (str, bytes)):
                 yield r
+            elif r is not None:
+                # the remaining output is produced while being sent
+                yield from r
 
-        return self.make_response(stream_with_context(gen()))
+        r = self.make_response(stream_with_context(self._chunked(gen(), telemetry)))
+        # allow to check the result after the response has been streamed
+        r.printer = self
+        return compress_response(r) if self.compressible else r
 
     @property
     def remaining_rows(self) -> int:
@@ -94,7 +179,7 @@ class APrinter:
         # hook
         return None
 
-    def _end(self) -> Optional[Union[str, bytes]]:
+    def _end(self) -> Optional[Union[str, bytes, Iterable[Union[str, bytes]]]]:
         # hook
         return None
 
@@ -123,62 +208,220 @@ class ClassicPrinter(APrinter):
             # no array to end
             prefix = ""
 
+        cursor = ""
         if self.count == 0:
             message = "no results"
         elif self.result == 2:
             message = "too many results, data truncated"
-        return f'{prefix}"result": {self.result}, "message": {dumps(message)} }}'.encode("utf-8")
+            if self.next_cursor:
+                cursor = f', "cursor": {dumps(self.next_cursor)}'
+        return f'{prefix}"result": {self.result}, "message": {dumps(message)}{cursor} }}'.encode("utf-8")
+
+
+def _tree_key(group: Any) -> bytes:
+    # object keys have to be strings
+    return orjson.dumps(group if isinstance(group, str) else orjson.dumps(group).decode("utf-8"))
+
+
+def _tree_run(group: Any) -> Any:
+    """
+    the run of rows a database orders next to each other along with the group, which is coarser for strings since a case
+    and accent insensitive collation orders e.g. "CA" and "ca" as equal and thus may mix them
+    """
+    if not isinstance(group, str):
+        return group
+    return "".join(c for c in unicodedata.normalize("NFKD", group) if not unicodedata.combining(c)).casefold().rstrip(" ")
+
+
+class _SpilledGroups:
+    """
+    the comma separated serialized rows of each group, which are written to a temporary file once they exceed
+    `max_bytes` in memory
+    """
+
+    def __init__(self, max_bytes: int, spill_dir: Optional[str] = TREE_SPILL_DIR):
+        self.max_bytes = max_bytes
+        self.spill_dir = spill_dir
+        # group key -> rows in memory, (offset, length) of the parts in the spill file
+        # (a bytearray, since the serialized rows of orjson allocate much more than their length)
+        self._groups: Dict[Any, Tuple[bytearray, List[Tuple[int, int]]]] = {}
+        self._bytes = 0
+        self._file: Optional[IO[bytes]] = None
+        self.spilled_bytes = 0
+
+    def append(self, group: Any, row: bytes):
+        entry = self._groups.get(group)
+        if entry is None:
+            entry = self._groups[group] = (bytearray(), [])
+        rows = entry[0]
+        if rows:
+            rows += b","
+        rows += row
+        self._bytes += len(row) + 1
+        if self._bytes > self.max_bytes:
+            self._spill()
+
+    def _spill(self):
+        if self._file is None:
+            self._file = TemporaryFile(dir=self.spill_dir)
+        for rows, parts in self._groups.values():
+            if rows:
+                parts.append((self._file.tell(), len(rows)))
+                self._file.write(rows)
+                self.spilled_bytes += len(rows)
+                # release the memory
+                rows[:] = b""
+        self._bytes = 0
+
+    def __iter__(self) -> Iterator[Tuple[Any, Iterator[bytes]]]:
+        """
+        yields each group in the order of their first row along with its comma separated serialized rows
+        """
+
+        def read(rows: bytearray, parts: List[Tuple[int, int]]) -> Iterator[bytes]:
+            # there are parts only once the file exists
+            file = cast(IO[bytes], self._file)
+            for i, (offset, length) in enumerate(parts):
+                file.seek(offset)
+                yield file.read(length) if i == 0 else b"," + file.read(length)
+            if rows:
+                yield bytes(rows) if not parts else b"," + rows
+
+        for group, (rows, parts) in self._groups.items():
+            yield group, read(rows, parts)
+
+    def close(self):
+        self._groups = {}
+        self._bytes = 0
+        if self._file is not None:
+            self._file.close()
+            self._file = None
 
 
 class ClassicTreePrinter(ClassicPrinter):
     """
     a printer class writing a tree by the given grouping criteria as the first element in the epidata array
+
+    If the rows arrive `grouped`, i.e. ordered by the grouping criteria, each row is sent right away. Rows of another
+    spelling of the current group (see `_tree_run`) are collected until the run ends. Otherwise, the serialized rows are
+    collected per group (see `_SpilledGroups`) and the tree is sent at the end.
     """
 
     group: str
-    _tree: Dict[str, List[Dict]] = dict()
 
-    def __init__(self, group: str):
+    def __init__(self, group: str, grouped: bool = False):
         super(ClassicTreePrinter, self).__init__()
         self.group = group
+        self.grouped = grouped
+        # bytes of collected rows kept in memory before they are spilled to disk
+        self.spill_bytes: int = TREE_SPILL_BYTES
+        self._groups: Optional[_SpilledGroups] = None
+        self._current: Any = None
+        self._run: Any = None
+        self._run_groups: Optional[_SpilledGroups] = None
+        self._closed_groups: set = set()
 
     def _begin(self):
-        self._tree = dict()
+        self._groups = None if self.grouped else _SpilledGroups(self.spill_bytes)
         return super(ClassicTreePrinter, self)._begin()
 
     def _format_row(self, first: bool, row: Dict):
+        # the rows may be shared, e.g. the cached covidcast_meta ones, thus leave them as they are
         group = row.get(self.group, "")
-        del row[self.group]
-        if group in self._tree:
-            self._tree[group].append(row)
+        row = {k: v for k, v in row.items() if k != self.group}
+        prefix = b'"epidata": [' if first and is_compatibility_mode() else b""
+        if self._groups is not None:
+            self._groups.append(group, orjson.dumps(row))
+            return prefix or None
+        if group in self._closed_groups:
+            # the group was sent already, which would repeat its key
+            raise ValueError(f"tree group {group!r} is not contiguous")
+        run = _tree_run(group)
+        if first:
+            prefix += b"{" + _tree_key(group) + b":["
+        elif group == self._current:
+            prefix += b","
+        elif run == self._run:
+            if self._run_groups is None:
+                self._run_groups = _SpilledGroups(self.spill_bytes)
+            self._run_groups.append(group, orjson.dumps(row))
+            return prefix or None
         else:
-            self._tree[group] = [row]
-        if first and is_compatibility_mode():
-            return b'"epidata": ['
-        return None
+            prefix += b"]" + self._end_run() + b"," + _tree_key(group) + b":["
+        self._current = group
+        self._run = run
+        return prefix + orjson.dumps(row)
+
+    def _end_run(self) -> bytes:
+        # close the current group and send the other ones of its run
+        self._closed_groups.add(self._current)
+        if self._run_groups is None:
+            return b""
+        parts = []
+        for group, rows in self._run_groups:
+            parts.append(b"," + _tree_key(group) + b":[" + b"".join(rows) + b"]")
+            self._closed_groups.add(group)
+        self._run_groups.close()
+        self._run_groups = None
+        return b"".join(parts)
 
     def _end(self):
         if self.count == 0:
+            self._close()
             return super(ClassicTreePrinter, self)._end()
-
-        tree = orjson.dumps(self._tree)
-        self._tree = dict()
-        r = super(ClassicTreePrinter, self)._end()
-        return tree + r
+        if self._groups is None:
+            end = b"]" + self._end_run() + b"}"
+            self._close()
+            return end + super(ClassicTreePrinter, self)._end()
+        return self._end_spilled(self._groups, super(ClassicTreePrinter, self)._end())
+
+    def _end_spilled(self, groups: _SpilledGroups, end: bytes) -> Iterator[bytes]:
+        try:
+            sep = b"{"
+            for group, rows in groups:
+                yield sep + _tree_key(group) + b":["
+                yield from rows
+                yield b"]"
+                sep = b","
+            yield b"}" + end
+        finally:
+            self._close()
+
+    def _close(self):
+        if self._groups is not None:
+            self._groups.close()
+            self._groups = None
+        if self._run_groups is not None:
+            self._run_groups.close()
+            self._run_groups = None
+        self._current = None
+        self._run = None
+        self._closed_groups = set()
+
+
+# characters that require a CSV field to be quoted besides the delimiter
+_CSV_SPECIAL = re.compile(r'["\r\n]')
 
 
 class CSVPrinter(APrinter):
     """
-    a printer class writing in a CSV file
+    a printer class writing in a CSV file, formatting the rows in batches of `batch_size`
+
+    The output equals the one of `csv.DictWriter` with newline as line terminator: the values are joined directly and
+    just lines that may need quoting go through the csv writer.
     """
 
-    _stream = StringIO()
-    _writer: DictWriter
     _filename: Optional[str]
 
-    def __init__(self, filename: Optional[str] = "epidata"):
+    def __init__(self, filename: Optional[str] = "epidata", batch_size: int = CSV_BATCH_SIZE):
         super(CSVPrinter, self).__init__()
         self._filename = filename
+        self._batch_size = batch_size
+        self._lines: List[str] = []
+        self._fields: List[str] = []
+        self._values: Callable[[Dict], Sequence[Any]] = tuple
+        self._buffer = StringIO()
+        self._writer = writer(self._buffer, lineterminator="\n")
 
     def make_response(self, gen):
         headers = {"Content-Disposition": f"attachment; filename={self._filename}.csv"} if self._filename else {}
@@ -188,25 +431,49 @@ class CSVPrinter(APrinter):
         return None
 
     def _error(self, error: Exception) -> str:
-        # send an generic error
-        return f"unknown error occurred:\n{error}"
+        # send the formatted rows and a generic error
+        return f"{self._drain()}unknown error occurred:\n{error}"
+
+    def _format_line(self, values: Sequence[Any]) -> str:
+        # int and float values never need quoting, so convert everything and check the line as a whole
+        # str subclasses like the trend enums are written as their value like csv.writer does
+        line = ",".join(["" if v is None else v if isinstance(v, str) else str(v) for v in values])
+        if line.count(",") == len(self._fields) - 1 and line and not _CSV_SPECIAL.search(line):
+            return line
+        self._writer.writerow(values)
+        line = self._buffer.getvalue()[:-1]
+        self._buffer.seek(0)
+        self._buffer.truncate(0)
+        return line
+
+    def _row_values(self, row: Dict) -> Sequence[Any]:
+        try:
+            return self._values(row)
+        except KeyError:
+            # missing fields are empty like in DictWriter
+            return [row.get(field) for field in self._fields]
+
+    def _drain(self) -> str:
+        if not self._lines:
+            return ""
+        self._lines.append("")
+        r = "\n".join(self._lines)
+        self._lines = []
+        return r
 
     def _format_row(self, first: bool, row: Dict):
         if first:
-            self._writer = DictWriter(self._stream, list(row.keys()), lineterminator="\n")
-            self._writer.writeheader()
-        self._writer.writerow(row)
-
-        # remove the stream content to print just one line at a time
-        self._stream.flush()
-        v = self._stream.getvalue()
-        self._stream.seek(0)
-        self._stream.truncate(0)
-        return v
+            self._fields = list(row.keys())
+            getter = itemgetter(*self._fields)
+            self._values = getter if len(self._fields) > 1 else lambda row: (getter(row),)
+            self._lines.append(self._format_line(self._fields))
+        self._lines.append(self._format_line(self._row_values(row)))
+        if len(self._lines) >= self._batch_size:
+            return self._drain()
+        return None
 
     def _end(self):
-        self._writer = None
-        return ""
+        return self._drain()
 
 
 class JSONPrinter(APrinter):
@@ -241,6 +508,166 @@ class JSONLPrinter(APrinter):
         return b""
 
 
+def _import_pyarrow():
+    # pyarrow is only needed for the arrow and parquet formats, so import it on demand
+    try:
+        import pyarrow
+        import pyarrow.parquet
+    except ImportError:
+        raise ValidationFailedException("the arrow and parquet formats are not supported by this server")
+    return pyarrow
+
+
+class _DrainableSink(RawIOBase):
+    """
+    a write only file like object, whose content can be drained while keeping track of the total position
+    """
+
+    def __init__(self):
+        super(_DrainableSink, self).__init__()
+        self._chunks: List[bytes] = []
+        self._position = 0
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, b) -> int:
+        self._chunks.append(bytes(b))
+        self._position += len(b)
+        return len(b)
+
+    def tell(self) -> int:
+        return self._position
+
+    def drain(self) -> bytes:
+        r = b"".join(self._chunks)
+        self._chunks = []
+        return r
+
+
+# data types of well known columns of the covidcast endpoint family, others are taken from the declared fields (see
+# ArrowPrinter.declare_fields) or inferred from the first batch
+_ARROW_TYPES = {
+    "time_value": lambda pa: pa.int32(),
+    "issue": lambda pa: pa.int32(),
+    "lag": lambda pa: pa.int32(),
+    "value": lambda pa: pa.float64(),
+    "stderr": lambda pa: pa.float64(),
+    "sample_size": lambda pa: pa.float64(),
+    "source": lambda pa: pa.dictionary(pa.int32(), pa.string()),
+    "signal": lambda pa: pa.dictionary(pa.int32(), pa.string()),
+    "geo_type": lambda pa: pa.dictionary(pa.int32(), pa.string()),
+    "geo_value": lambda pa: pa.dictionary(pa.int32(), pa.string()),
+    "time_type": lambda pa: pa.dictionary(pa.int32(), pa.string()),
+}
+
+
+class ArrowPrinter(APrinter):
+    """
+    a printer class writing an Apache Arrow IPC stream, buffering the rows in columnar batches
+    """
+
+    _mimetype = "application/vnd.apache.arrow.stream"
+    _filename: Optional[str]
+
+    def __init__(self, filename: Optional[str] = None, batch_size: int = ARROW_BATCH_SIZE):
+        super(ArrowPrinter, self).__init__()
+        self._pa = _import_pyarrow()
+        self._filename = filename
+        self._batch_size = batch_size
+        self._columns: Dict[str, List[Any]] = {}
+        self._declared_types: Dict[str, Any] = {}
+        self._schema = None
+        self._sink = _DrainableSink()
+        self._writer = None
+
+    def make_response(self, gen):
+        headers = {"Content-Disposition": f"attachment; filename={self._filename}"} if self._filename else {}
+        return Response(gen, mimetype=self._mimetype, headers=headers)
+
+    def _error(self, error: Exception) -> str:
+        # the stream cannot contain an error, so break it with a message
+        return f"unknown error occurred:\n{error}"
+
+    def _open_writer(self, sink: _DrainableSink, schema):
+        return self._pa.ipc.new_stream(sink, schema)
+
+    def _write_batch(self, batch):
+        self._writer.write_batch(batch)
+
+    def declare_fields(self, fields_string: Optional[Sequence[str]], fields_int: Optional[Sequence[str]], fields_float: Optional[Sequence[str]]):
+        """
+        declares the data types of the selected fields, such that a column which is NULL throughout the first batch
+        still gets its type and not the null one
+        """
+        pa = self._pa
+        for fields, data_type in ((fields_string, pa.string()), (fields_int, pa.int64()), (fields_float, pa.float64())):
+            for name in fields or ():
+                self._declared_types[name] = data_type
+
+    def _to_array(self, name: str, values: List[Any]):
+        pa = self._pa
+        if self._schema is not None:
+            data_type = self._schema.field(name).type
+        elif name in _ARROW_TYPES:
+            data_type = _ARROW_TYPES[name](pa)
+        else:
+            data_type = self._declared_types.get(name)
+        if data_type is not None and pa.types.is_dictionary(data_type):
+            return pa.array(values, type=data_type.value_type).dictionary_encode()
+        return pa.array(values, type=data_type)
+
+    def _flush(self):
+        arrays = [self._to_array(name, values) for name, values in self._columns.items()]
+        if self._schema is None:
+            self._schema = self._pa.schema([self._pa.field(name, array.type) for name, array in zip(self._columns.keys(), arrays)])
+            self._writer = self._open_writer(self._sink, self._schema)
+        self._write_batch(self._pa.RecordBatch.from_arrays(arrays, schema=self._schema))
+        self._columns = {name: [] for name in self._columns}
+
+    def _format_row(self, first: bool, row: Dict):
+        if first:
+            self._columns = {name: [] for name in row.keys()}
+        for name, values in self._columns.items():
+            values.append(row.get(name))
+        if self.count % self._batch_size == 0:
+            self._flush()
+            return self._sink.drain()
+        return None
+
+    def _end(self):
+        if self.result == -1:
+            # the stream is already broken by the error message
+            return None
+        if self._columns and self.count % self._batch_size != 0:
+            self._flush()
+        if self._writer is None:
+            # no rows, write a stream with an empty schema
+            self._schema = self._pa.schema([])
+            self._writer = self._open_writer(self._sink, self._schema)
+        self._writer.close()
+        return self._sink.drain()
+
+
+class ParquetPrinter(ArrowPrinter):
+    """
+    a printer class writing a Parquet file, with one row group per batch
+    """
+
+    _mimetype = "application/vnd.apache.parquet"
+    # parquet compresses the column chunks itself
+    compressible = False
+
+    def __init__(self, filename: Optional[str] = "epidata", batch_size: int = ARROW_BATCH_SIZE):
+        super(ParquetPrinter, self).__init__(f"{filename}.parquet" if filename else None, batch_size)
+
+    def _open_writer(self, sink: _DrainableSink, schema):
+        return self._pa.parquet.ParquetWriter(sink, schema)
+
+    def _write_batch(self, batch):
+        self._writer.write_table(self._pa.Table.from_batches([batch]))
+
+
 def create_printer() -> APrinter:
     format: str = request.values.get("format", "classic")
     if format == "tree":
@@ -254,4 +681,8 @@ def create_printer() -> APrinter:
         return CSVPrinter()
     if format == "jsonl":
         return JSONLPrinter()
+    if format == "arrow":
+        return ArrowPrinter()
+    if format == "parquet":
+        return ParquetPrinter()
     return ClassicPrinter()
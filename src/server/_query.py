@@ -1,9 +1,16 @@
+from base64 import urlsafe_b64decode, urlsafe_b64encode
 from datetime import date, datetime
+from itertools import islice
+from queue import Full, Queue
+import re
+from threading import Event, Thread
+from time import perf_counter
 from typing import (
     Any,
     Callable,
     Dict,
     Iterable,
+    Iterator,
     List,
     Optional,
     Sequence,
@@ -13,15 +20,20 @@ from typing import (
     Mapping,
 )
 
-from sqlalchemy import text
-from sqlalchemy.engine import RowProxy
+import orjson
+from sqlalchemy import bindparam, text
+from sqlalchemy.sql.elements import TextClause
+from sqlalchemy.engine import ResultProxy, RowProxy
 
 from ._common import db, app
-from ._db import metadata
-from ._printer import create_printer, APrinter
-from ._exceptions import DatabaseErrorException
+from ._config import CONCURRENT_QUERIES, CONCURRENT_QUERY_BATCH_ROWS, CONCURRENT_QUERY_BUFFER_ROWS
+from ._db import engine, metadata
+from ._printer import create_printer, APrinter, ArrowPrinter, ClassicTreePrinter
+from ._exceptions import DatabaseErrorException, ValidationFailedException
 from ._validate import DateRange, extract_strings
 from ._params import GeoPair, SourceSignalPair, TimePair
+from ._slow_query import TimedRows, request_path, slow_queries
+from ._telemetry import TIMED_BATCH_SIZE, current_telemetry, span
 
 
 def date_string(value: int) -> str:
@@ -49,6 +61,34 @@ def to_condition(
     return f"{field} = :{param_key}"
 
 
+def _is_int(v: Any) -> bool:
+    return isinstance(v, int) and not isinstance(v, bool)
+
+
+def normalize_values(
+    values: Sequence[Union[Tuple[str, str], str, Tuple[int, int], int]]
+) -> Tuple[List[Union[str, int]], List[Union[Tuple[str, str], Tuple[int, int]]]]:
+    """
+    splits the given values into a list of unique scalars and a list of unique ranges.
+    if all values are integers, overlapping and adjacent ranges and scalars are merged into ranges
+    and the remaining scalars are the ones that are not covered by any range
+    """
+    ranges: List[Tuple[Any, Any]] = [(v[0], v[1]) for v in values if isinstance(v, (list, tuple))]
+    scalars: List[Any] = [v for v in values if not isinstance(v, (list, tuple))]
+
+    if not all(_is_int(v) for v in scalars) or not all(_is_int(a) and _is_int(b) for a, b in ranges):
+        # just dedupe
+        return list(dict.fromkeys(scalars)), list(dict.fromkeys(ranges))
+
+    merged: List[List[int]] = []
+    for start, end in sorted([(v, v) for v in scalars] + [(min(a, b), max(a, b)) for a, b in ranges]):
+        if merged and start <= merged[-1][1] + 1:
+            merged[-1][1] = max(merged[-1][1], end)
+        else:
+            merged.append([start, end])
+    return [start for start, end in merged if start == end], [(start, end) for start, end in merged if start != end]
+
+
 def filter_values(
     field: str,
     values: Optional[Sequence[Union[Tuple[str, str], str, Tuple[int, int], int]]],
@@ -61,7 +101,16 @@ def filter_values(
     # builds a SQL expression to filter strings (ex: locations)
     #   $field: name of the field to filter
     #   $values: array of values
-    conditions = [to_condition(field, v, f"{param_key}_{i}", params, formatter) for i, v in enumerate(values)]
+    # multiple scalars are combined to a single IN condition using an expanding parameter (see `bind_query`)
+    scalars, ranges = normalize_values(values)
+    conditions: List[str] = []
+    if len(scalars) == 1:
+        conditions.append(to_condition(field, scalars[0], f"{param_key}_0", params, formatter))
+    elif scalars:
+        params[f"{param_key}_0"] = [formatter(v) for v in scalars]
+        conditions.append(f"{field} IN :{param_key}_0")
+    offset = len(conditions)
+    conditions.extend(to_condition(field, v, f"{param_key}_{i + offset}", params, formatter) for i, v in enumerate(ranges))
     return f"({' OR '.join(conditions)})"
 
 
@@ -92,6 +141,76 @@ def filter_dates(
     return filter_values(field, values, param_key, params, date_string)
 
 
+def requested_fields(fields: Sequence[str]) -> Optional[List[str]]:
+    """
+    returns the given fields restricted to the ones requested by the `fields` parameter (None = all of them) in the
+    order `filter_fields` sends them, such that just these need to be fetched or computed
+    """
+    param = extract_strings("fields")
+    if not param:
+        return None
+    exclude_fields = {f[1:] for f in param if f.startswith("-")}
+    include_fields = [f for f in param if not f.startswith("-") and f not in exclude_fields]
+    if include_fields:
+        available = set(fields)
+        return list(dict.fromkeys(f for f in include_fields if f in available))
+    return [f for f in fields if f not in exclude_fields]
+
+
+def select_fields(*field_lists: Sequence[str], required: Sequence[str] = ()) -> Tuple[List[str], ...]:
+    """
+    restricts each of the given field lists to the requested fields and the `required` ones (e.g. the fields to
+    order by or build a cursor from), keeping their order
+    """
+    requested = requested_fields([f for fields in field_lists for f in fields])
+    if requested is None:
+        return tuple(list(fields) for fields in field_lists)
+    keep = set(requested).union(required)
+    return tuple([f for f in fields if f in keep] for fields in field_lists)
+
+
+_SELECT_ALIAS = re.compile(r"`?(\w+)`?\s*$")
+
+
+def _split_select(select: str) -> List[str]:
+    # split at the commas outside of parentheses and quotes
+    parts: List[str] = []
+    depth = 0
+    quote: Optional[str] = None
+    start = 0
+    for i, c in enumerate(select):
+        if quote:
+            if c == quote:
+                quote = None
+        elif c in "'\"`":
+            quote = c
+        elif c == "(":
+            depth += 1
+        elif c == ")":
+            depth -= 1
+        elif c == "," and depth == 0:
+            parts.append(select[start:i].strip())
+            start = i + 1
+    parts.append(select[start:].strip())
+    return parts
+
+
+def select_expressions(select: str, required: Sequence[str] = ()) -> str:
+    """
+    restricts a SELECT list like "t.`a`, sum(t.`b`) `b`" to the expressions whose column name is requested by the
+    `fields` parameter or `required`
+    """
+    expressions = _split_select(select)
+    names = [m.group(1) if m else "" for m in (_SELECT_ALIAS.search(e) for e in expressions)]
+    requested = requested_fields(names)
+    if requested is None:
+        return select
+    keep = set(requested).union(required)
+    selected = [e for e, name in zip(expressions, names) if name in keep]
+    # the SELECT list must not be empty
+    return ", ".join(selected or expressions[:1])
+
+
 def filter_fields(generator: Iterable[Dict[str, Any]]):
     fields = extract_strings("fields")
     if not fields:
@@ -115,25 +234,43 @@ def filter_fields(generator: Iterable[Dict[str, Any]]):
             yield filtered
 
 
-def filter_geo_pairs(
+def _filter_pairs(
     type_field: str,
     value_field: str,
-    values: Sequence[GeoPair],
+    values: Sequence[Tuple[str, Union[bool, Sequence[Any]]]],
     param_key: str,
     params: Dict[str, Any],
+    filter_type_values: Callable[[str, Sequence[Any], str, Dict[str, Any]], str],
 ) -> str:
-    """
-    returns the SQL sub query to filter by the given geo pairs
-    """
-
-    def filter_pair(pair: GeoPair, i) -> str:
-        type_param = f"{param_key}_{i}t"
-        params[type_param] = pair.geo_type
-        if isinstance(pair.geo_values, bool) and pair.geo_values:
-            return f"{type_field} = :{type_param}"
-        return f"({type_field} = :{type_param} AND {filter_strings(value_field, cast(Sequence[str], pair.geo_values), type_param, params)})"
-
-    parts = [filter_pair(p, i) for i, p in enumerate(values)]
+    # merge the pairs by type, all values (True) wins over specific ones
+    by_type: Dict[str, Union[bool, List[Any]]] = {}
+    for type_value, type_values in values:
+        if isinstance(type_values, bool):
+            if type_values:
+                by_type[type_value] = True
+            else:
+                by_type.setdefault(type_value, [])
+        else:
+            existing = by_type.setdefault(type_value, [])
+            if not isinstance(existing, bool):
+                existing.extend(type_values)
+
+    parts: List[str] = []
+    all_types = [t for t, v in by_type.items() if isinstance(v, bool)]
+    if all_types:
+        type_param = f"{param_key}_0t"
+        if len(all_types) == 1:
+            params[type_param] = all_types[0]
+            parts.append(f"{type_field} = :{type_param}")
+        else:
+            params[type_param] = all_types
+            parts.append(f"{type_field} IN :{type_param}")
+    for type_value, type_values in by_type.items():
+        if isinstance(type_values, bool) or not type_values:
+            continue
+        type_param = f"{param_key}_{len(parts)}t"
+        params[type_param] = type_value
+        parts.append(f"({type_field} = :{type_param} AND {filter_type_values(value_field, type_values, type_param, params)})")
 
     if not parts:
         # something has to be selected
@@ -142,6 +279,19 @@ def filter_geo_pairs(
     return f"({' OR '.join(parts)})"
 
 
+def filter_geo_pairs(
+    type_field: str,
+    value_field: str,
+    values: Sequence[GeoPair],
+    param_key: str,
+    params: Dict[str, Any],
+) -> str:
+    """
+    returns the SQL sub query to filter by the given geo pairs
+    """
+    return _filter_pairs(type_field, value_field, [(p.geo_type, p.geo_values) for p in values], param_key, params, filter_strings)
+
+
 def filter_source_signal_pairs(
     source_field: str,
     signal_field: str,
@@ -152,21 +302,7 @@ def filter_source_signal_pairs(
     """
     returns the SQL sub query to filter by the given source signal pairs
     """
-
-    def filter_pair(pair: SourceSignalPair, i) -> str:
-        source_param = f"{param_key}_{i}t"
-        params[source_param] = pair.source
-        if isinstance(pair.signal, bool) and pair.signal:
-            return f"{source_field} = :{source_param}"
-        return f"({source_field} = :{source_param} AND {filter_strings(signal_field, cast(Sequence[str], pair.signal), source_param, params)})"
-
-    parts = [filter_pair(p, i) for i, p in enumerate(values)]
-
-    if not parts:
-        # something has to be selected
-        return "FALSE"
-
-    return f"({' OR '.join(parts)})"
+    return _filter_pairs(source_field, signal_field, [(p.source, p.signal) for p in values], param_key, params, filter_strings)
 
 
 def filter_time_pairs(
@@ -179,21 +315,40 @@ def filter_time_pairs(
     """
     returns the SQL sub query to filter by the given time pairs
     """
+    return _filter_pairs(type_field, time_field, [(p.time_type, p.time_values) for p in values], param_key, params, filter_integers)
 
-    def filter_pair(pair: TimePair, i) -> str:
-        type_param = f"{param_key}_{i}t"
-        params[type_param] = pair.time_type
-        if isinstance(pair.time_values, bool) and pair.time_values:
-            return f"{type_field} = :{type_param}"
-        return f"({type_field} = :{type_param} AND {filter_integers(time_field, cast(Sequence[Union[int, Tuple[int,int]]], pair.time_values), type_param, params)})"
 
-    parts = [filter_pair(p, i) for i, p in enumerate(values)]
+_bind_param_pattern = re.compile(r"(?<![:\w\\]):(\w+)(?!:)")
 
-    if not parts:
-        # something has to be selected
-        return "FALSE"
 
-    return f"({' OR '.join(parts)})"
+def bind_query(query: str, params: Mapping[str, Any]) -> TextClause:
+    """
+    creates the text clause of the given query, list parameters (see `filter_values`) are bound as expanding parameters
+    """
+    names = set(_bind_param_pattern.findall(query))
+    expanding: List[Any] = [bindparam(k, expanding=True) for k, v in params.items() if isinstance(v, (list, tuple)) and k in names]
+    clause = text(query)
+    return clause.bindparams(*expanding) if expanding else clause
+
+
+def encode_cursor(key: Sequence[Any]) -> str:
+    """
+    encodes the sort key of the last sent row as an opaque continuation token
+    """
+    return urlsafe_b64encode(orjson.dumps(list(key))).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str, types: Sequence[type]) -> List[Any]:
+    """
+    decodes a continuation token created by `encode_cursor` and checks it against the expected types of the sort key
+    """
+    try:
+        key = orjson.loads(urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+    except ValueError:
+        raise ValidationFailedException("invalid cursor")
+    if not isinstance(key, list) or len(key) != len(types) or not all(isinstance(v, t) and not isinstance(v, bool) for v, t in zip(key, types)):
+        raise ValidationFailedException("invalid cursor")
+    return key
 
 
 def parse_row(
@@ -219,6 +374,60 @@ def parse_row(
     return parsed
 
 
+def _parse_string(v: Any) -> Any:
+    if isinstance(v, (date, datetime)):
+        return v.strftime("%Y-%m-%d")  # format to iso date
+    return v
+
+
+def _parse_int(v: Any) -> Optional[int]:
+    return int(v) if v is not None else None
+
+
+def _parse_float(v: Any) -> Optional[float]:
+    return float(v) if v is not None else None
+
+
+RowDecoder = Callable[[Union[RowProxy, Sequence[Any]]], Dict[str, Any]]
+
+
+def compile_row_decoder(
+    columns: Sequence[str],
+    fields_string: Optional[Sequence[str]] = None,
+    fields_int: Optional[Sequence[str]] = None,
+    fields_float: Optional[Sequence[str]] = None,
+) -> RowDecoder:
+    """
+    compiles a decoder for rows with the given column names that produces the same output as `parse_row`.
+    the column lookup and the choice of the converter are done once, the resulting function just
+    accesses the row by position, so it can be applied to both RowProxy and plain tuple rows
+    """
+    positions: Dict[str, int] = {}
+    for i, column in enumerate(columns):
+        positions.setdefault(column, i)
+
+    converters = {"_s": _parse_string, "_i": _parse_int, "_f": _parse_float}
+    entries: List[str] = []
+    for fields, converter in ((fields_string, "_s"), (fields_int, "_i"), (fields_float, "_f")):
+        for f in fields or []:
+            position = positions.get(f)
+            entries.append(f"{f!r}: {converter}(r[{position}])" if position is not None else f"{f!r}: None")
+
+    return cast(RowDecoder, eval(f"lambda r: {{{', '.join(entries)}}}", converters))
+
+
+def parse_rows(
+    rows: ResultProxy,
+    fields_string: Optional[Sequence[str]] = None,
+    fields_int: Optional[Sequence[str]] = None,
+    fields_float: Optional[Sequence[str]] = None,
+) -> Iterator[Dict[str, Any]]:
+    """
+    parses all rows of the given result using a decoder compiled once for the whole result set
+    """
+    return map(compile_row_decoder(rows.keys(), fields_string, fields_int, fields_float), rows)
+
+
 def parse_result(
     query: str,
     params: Dict[str, Any],
@@ -229,15 +438,121 @@ def parse_result(
     """
     execute the given query and return the result as a list of dictionaries
     """
-    return [parse_row(row, fields_string, fields_int, fields_float) for row in db.execute(text(query), **params)]
+    _mark_params()
+    start = perf_counter()
+    with span("sql"):
+        rows = db.execute(bind_query(query, params), **params)
+    result = list(parse_rows(rows, fields_string, fields_int, fields_float))
+    slow_queries.observe(query, params, perf_counter() - start, len(result), request_path())
+    return result
+
+
+_LEADING_ORDER_FIELD = re.compile(r"ORDER BY\s+(?:\w+\.)?`?(\w+)`?[^()]*$", re.IGNORECASE)
+
+
+def leading_order_field(query: str) -> Optional[str]:
+    """
+    returns the first field the query result is ordered by
+    """
+    m = _LEADING_ORDER_FIELD.search(query)
+    return m.group(1) if m else None
+
+
+def _mark_params():
+    # the time till the first query is executed is spent on parsing the parameters and building the query
+    telemetry = current_telemetry()
+    if telemetry is not None:
+        telemetry.mark("params")
 
 
 def run_query(p: APrinter, query_tuple: Tuple[str, Dict[str, Any]]):
     query, params = query_tuple
     # limit rows + 1 for detecting whether we would have more
-    full_query = text(f"{query} LIMIT {p.remaining_rows + 1}")
+    full_query = bind_query(f"{query} LIMIT {p.remaining_rows + 1}", params)
     app.logger.info("full_query: %s, params: %s", full_query, params)
-    return db.execution_options(stream_results=True).execute(full_query, **params)
+    _mark_params()
+    with span("sql"):
+        return db.execution_options(stream_results=True).execute(full_query, **params)
+
+
+_END_OF_ROWS = object()
+
+
+class QueryProducer(Thread):
+    """
+    executes a query on its own pooled connection and feeds the resulting rows in batches into a bounded queue,
+    such that multiple queries can run at the same time while their rows are consumed in order
+    """
+
+    def __init__(self, query_tuple: Tuple[str, Dict[str, Any]], max_rows: int, stop: Event):
+        super(QueryProducer, self).__init__(daemon=True)
+        self.query, self.params = query_tuple
+        self.max_rows = max_rows
+        self.stop = stop
+        self.batch_size = max(CONCURRENT_QUERY_BATCH_ROWS, 1)
+        self.queue: Queue = Queue(max(CONCURRENT_QUERY_BUFFER_ROWS // self.batch_size, 1))
+        self._keys: Optional[List[str]] = None
+        self.path = request_path()
+
+    def _put(self, item: Any) -> bool:
+        # waits for free space unless the consumer stopped
+        while not self.stop.is_set():
+            try:
+                self.queue.put(item, timeout=0.1)
+                return True
+            except Full:
+                continue
+        return False
+
+    def run(self):
+        try:
+            full_query = bind_query(f"{self.query} LIMIT {self.max_rows}", self.params)
+            app.logger.info("full_query: %s, params: %s", full_query, self.params)
+            with engine.connect() as conn:
+                # the time spent executing the query and fetching the rows, but not waiting for the consumer
+                start = perf_counter()
+                r = conn.execution_options(stream_results=True).execute(full_query, **self.params)
+                seconds = perf_counter() - start
+                count = 0
+                try:
+                    if not self._put(r.keys()):
+                        return
+                    while True:
+                        start = perf_counter()
+                        rows = r.fetchmany(self.batch_size)
+                        seconds += perf_counter() - start
+                        count += len(rows)
+                        if not rows or not self._put(rows):
+                            break
+                finally:
+                    r.close()
+                    slow_queries.observe(self.query, self.params, seconds, count, self.path)
+        except Exception as e:
+            self._put(e)
+            return
+        self._put(_END_OF_ROWS)
+
+    def _get(self) -> Any:
+        item = self.queue.get()
+        if isinstance(item, Exception):
+            raise item
+        return item
+
+    def keys(self) -> List[str]:
+        """
+        waits for the query to be executed and returns the column names, raises the error in case the query failed
+        """
+        if self._keys is None:
+            self._keys = self._get()
+        return self._keys
+
+    def __iter__(self) -> Iterator[RowProxy]:
+        self.keys()
+        while True:
+            rows = self._get()
+            if rows is _END_OF_ROWS:
+                return
+            yield from rows
 
 
 def _identity_transform(row: Dict[str, Any], _: RowProxy) -> Dict[str, Any]:
@@ -253,29 +568,26 @@ def execute_queries(
     fields_int: Sequence[str],
     fields_float: Sequence[str],
     transform: Callable[[Dict[str, Any], RowProxy], Dict[str, Any]] = _identity_transform,
+    cursor_fields: Optional[Sequence[str]] = None,
 ):
     """
-    execute the given queries and return the response to send them
+    execute the given queries and return the response to send them.
+    if `cursor_fields` are given, the printer gets a continuation token built from these columns of the last sent row
     """
 
     p = create_printer()
 
-    fields_to_send = set(extract_strings("fields") or [])
-    if fields_to_send:
-        exclude_fields = {f[1:] for f in fields_to_send if f.startswith("-")}
-        include_fields = {f for f in fields_to_send if not f.startswith("-") and f not in exclude_fields}
-
-        if include_fields:
-            fields_string = [v for v in fields_string if v in include_fields]
-            fields_int = [v for v in fields_int if v in include_fields]
-            fields_float = [v for v in fields_float if v in include_fields]
-        if exclude_fields:
-            fields_string = [v for v in fields_string if v not in exclude_fields]
-            fields_int = [v for v in fields_int if v not in exclude_fields]
-            fields_float = [v for v in fields_float if v not in exclude_fields]
+    fields_string, fields_int, fields_float = select_fields(fields_string, fields_int, fields_float)
 
     query_list = list(queries)
 
+    if isinstance(p, ClassicTreePrinter) and len(query_list) == 1:
+        # the rows can be streamed group by group if the query is ordered by the tree's grouping criteria
+        p.grouped = leading_order_field(query_list[0][0]) == p.group
+    if isinstance(p, ArrowPrinter):
+        # the stream schema is fixed by the first batch, thus use the declared types rather than the inferred ones
+        p.declare_fields(fields_string, fields_int, fields_float)
+
     def dummy_gen():
         if 3 > 4:
             yield {}
@@ -284,21 +596,81 @@ def execute_queries(
     if not query_list or p.remaining_rows <= 0:
         return p(dummy_gen)
 
+    last_key: Optional[Tuple[Any, ...]] = None
+
+    telemetry = current_telemetry()
+
+    def timed_query(query_params: Tuple[str, Dict[str, Any]]) -> TimedRows:
+        start = perf_counter()
+        rows = run_query(p, query_params)
+        return TimedRows(rows, query_params[0], query_params[1], perf_counter() - start)
+
+    def emit(rows: Union[TimedRows, QueryProducer]):
+        nonlocal last_key
+        # each query might have a different column order
+        decode = compile_row_decoder(rows.keys(), fields_string, fields_int, fields_float)
+        it = iter(rows)
+        while True:
+            batch = list(islice(it, TIMED_BATCH_SIZE))
+            if not batch:
+                return
+            start = perf_counter()
+            decoded = [decode(row) for row in batch]
+            if telemetry is not None:
+                telemetry.add("decode", perf_counter() - start)
+            for row, values in zip(batch, decoded):
+                if cursor_fields and p.remaining_rows > 0:
+                    # this row will be sent
+                    last_key = tuple(row[f] for f in cursor_fields)
+                yield transform(values, row)
+
     def gen(first_rows):
-        for row in first_rows:
-            yield transform(parse_row(row, fields_string, fields_int, fields_float), row)
+        yield from emit(first_rows)
 
         for query_params in query_list:
             if p.remaining_rows <= 0:
                 # no more rows
                 break
-            r = run_query(p, query_params)
-            for row in r:
-                yield transform(parse_row(row, fields_string, fields_int, fields_float), row)
+            yield from emit(timed_query(query_params))
+
+        if last_key is not None:
+            p.next_cursor = encode_cursor(last_key)
+
+    def gen_concurrent(producers: List[QueryProducer], stop: Event):
+        try:
+            for i, producer in enumerate(producers):
+                if p.remaining_rows <= 0:
+                    # no more rows
+                    break
+                yield from emit(producer)
+                if i + CONCURRENT_QUERIES < len(producers):
+                    # keep the window of running queries filled
+                    producers[i + CONCURRENT_QUERIES].start()
+
+            if last_key is not None:
+                p.next_cursor = encode_cursor(last_key)
+        finally:
+            stop.set()
+
+    if CONCURRENT_QUERIES > 1 and len(query_list) > 1:
+        # start the first queries at once, each buffers its rows till the previous ones are sent
+        stop = Event()
+        producers = [QueryProducer(q, p.remaining_rows + 1, stop) for q in query_list]
+        for producer in producers[:CONCURRENT_QUERIES]:
+            producer.start()
+        try:
+            producers[0].keys()
+        except Exception as e:
+            stop.set()
+            raise DatabaseErrorException(str(e))
+        r = p(gen_concurrent(producers, stop))
+        # also stop the producers if the response is closed without being sent
+        r.call_on_close(stop.set)
+        return r
 
     # execute first query
     try:
-        r = run_query(p, query_list.pop(0))
+        r = timed_query(query_list.pop(0))
     except Exception as e:
         raise DatabaseErrorException(str(e))
 
@@ -313,11 +685,12 @@ def execute_query(
     fields_int: Sequence[str],
     fields_float: Sequence[str],
     transform: Callable[[Dict[str, Any], RowProxy], Dict[str, Any]] = _identity_transform,
+    cursor_fields: Optional[Sequence[str]] = None,
 ):
     """
     execute the given query and return the response to send it
     """
-    return execute_queries([(query, params)], fields_string, fields_int, fields_float, transform)
+    return execute_queries([(query, params)], fields_string, fields_int, fields_float, transform, cursor_fields)
 
 
 def _join_l(value: Union[str, List[str]]):
@@ -466,6 +839,19 @@ class QueryBuilder:
         )
         return self
 
+    def where_after(self, fields: Sequence[str], values: Sequence[Any], param_key: str = "cursor") -> "QueryBuilder":
+        """
+        keyset condition selecting the rows whose (ascending) sort key of the given fields is greater than the given values.
+        the comparison is expanded to `a > x OR (a = x AND b > y) OR ...` since MySQL does not use an index range for a
+        row constructor comparison
+        """
+        fq_fields = [self._fq_field(f) for f in fields]
+        keys = [f"{param_key}_{i}" for i in range(len(fields))]
+        terms = [" AND ".join([f"{f} = :{k}" for f, k in zip(fq_fields[:i], keys)] + [f"{fq_fields[i]} > :{keys[i]}"]) for i in range(len(fields))]
+        self.conditions.append(f"({' OR '.join(f'({t})' for t in terms)})")
+        self.params.update(zip(keys, values))
+        return self
+
     def set_fields(self, *fields: Iterable[str]) -> "QueryBuilder":
         self.fields = [f"{self.alias}.{field}" for field_list in fields for field in field_list]
         return self
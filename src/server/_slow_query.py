@@ -0,0 +1,289 @@
+from collections import OrderedDict, deque
+from datetime import datetime
+from hashlib import sha1
+from itertools import islice
+import logging
+from logging.handlers import RotatingFileHandler
+import re
+from threading import Lock, Thread
+from time import monotonic, perf_counter
+from typing import Any, Deque, Dict, Iterator, List, Mapping, Optional, Tuple
+
+from flask import has_request_context, request
+import orjson
+from sqlalchemy.engine import Engine
+
+from ._config import (
+    SLOW_QUERY_EXPLAIN_INTERVAL,
+    SLOW_QUERY_LOG_BACKUPS,
+    SLOW_QUERY_LOG_FILE,
+    SLOW_QUERY_LOG_MAX_BYTES,
+    SLOW_QUERY_MAX_FINGERPRINTS,
+    SLOW_QUERY_RECENT,
+    SLOW_QUERY_THRESHOLD,
+)
+from ._db import engine
+from ._telemetry import TIMED_BATCH_SIZE
+
+_RE_STRING = re.compile(r"'(?:[^']|'')*'")
+_RE_PARAM = re.compile(r"(?<![:\w]):\w+")
+_RE_NUMBER = re.compile(r"(?<![\w.])-?\d+(?:\.\d+)?\b")
+_RE_SPACE = re.compile(r"\s+")
+_RE_REPEATED_TERM = re.compile(r"(\([^()]*\))(?: OR \1)+")
+_RE_INDEX_HINT = re.compile(r"\b(?:USE|FORCE) INDEX \((\w+)\)", re.IGNORECASE)
+_RE_SQLITE_INDEX = re.compile(r"USING (?:COVERING )?INDEX (\w+)")
+
+
+def fingerprint(query: str) -> str:
+    """
+    normalizes the given query to its shape: literals and bind parameters are replaced by `?` and
+    repeated identical OR terms (e.g. one per requested geo type) are collapsed
+    """
+    shape = _RE_STRING.sub("?", query)
+    shape = _RE_PARAM.sub("?", shape)
+    shape = _RE_NUMBER.sub("?", shape)
+    shape = _RE_SPACE.sub(" ", shape).strip()
+    while True:
+        collapsed = _RE_REPEATED_TERM.sub(r"\1 OR ...", shape)
+        if collapsed == shape:
+            return shape
+        shape = collapsed
+
+
+def fingerprint_id(shape: str) -> str:
+    return sha1(shape.encode("utf-8")).hexdigest()[:16]
+
+
+def index_hint(query: str) -> Optional[str]:
+    """
+    the index the query is hinted to use, see `QueryBuilder.index`
+    """
+    m = _RE_INDEX_HINT.search(query)
+    return m.group(1) if m else None
+
+
+def chosen_indexes(plan: Any) -> List[Dict[str, Any]]:
+    """
+    extracts the access path per table from a MySQL `EXPLAIN FORMAT=JSON` plan
+    """
+    found: List[Dict[str, Any]] = []
+
+    def walk(node: Any):
+        if isinstance(node, dict):
+            if "table_name" in node:
+                found.append(
+                    dict(
+                        table=node.get("table_name"),
+                        access_type=node.get("access_type"),
+                        key=node.get("key"),
+                        possible_keys=node.get("possible_keys"),
+                        rows_examined_per_scan=node.get("rows_examined_per_scan"),
+                    )
+                )
+            for value in node.values():
+                walk(value)
+        elif isinstance(node, list):
+            for value in node:
+                walk(value)
+
+    walk(plan)
+    return found
+
+
+def explain(conn_engine: Engine, query: str, params: Mapping[str, Any]) -> Tuple[Any, List[Dict[str, Any]]]:
+    """
+    explains the given query on a separate connection and returns the plan and the used indexes
+    """
+    # imported lazily since the query module reports to this one
+    from ._query import bind_query
+
+    with conn_engine.connect() as conn:
+        if conn_engine.dialect.name == "mysql":
+            row = conn.execute(bind_query(f"EXPLAIN FORMAT=JSON {query}", params), **params).fetchone()
+            plan = orjson.loads(row[0])
+            return plan, chosen_indexes(plan)
+        # e.g. sqlite in the tests
+        rows = conn.execute(bind_query(f"EXPLAIN QUERY PLAN {query}", params), **params).fetchall()
+        plan = [str(row[-1]) for row in rows]
+        indexes = [dict(table=None, access_type=None, key=m.group(1)) for detail in plan for m in [_RE_SQLITE_INDEX.search(detail)] if m]
+        return plan, indexes
+
+
+class FingerprintStats:
+    def __init__(self, shape: str):
+        self.shape = shape
+        self.count = 0
+        self.total_seconds = 0.0
+        self.max_seconds = 0.0
+        self.rows = 0
+        self.slow_count = 0
+        self.last_explained: Optional[float] = None
+
+    def as_dict(self) -> Dict[str, Any]:
+        return dict(
+            fingerprint=self.shape,
+            count=self.count,
+            total_seconds=self.total_seconds,
+            mean_seconds=self.total_seconds / self.count if self.count else 0.0,
+            max_seconds=self.max_seconds,
+            rows=self.rows,
+            slow_count=self.slow_count,
+        )
+
+
+class SlowQueryLog:
+    """
+    tracks the execution time per query fingerprint of this worker process. Queries slower than the threshold are
+    explained in the background and written as JSON lines to the slow query log
+    """
+
+    def __init__(
+        self,
+        threshold: float,
+        explain_interval: float,
+        max_fingerprints: int,
+        max_recent: int,
+        logger: logging.Logger,
+        conn_engine: Engine,
+    ):
+        self.threshold = threshold
+        self.explain_interval = explain_interval
+        self.max_fingerprints = max_fingerprints
+        self.logger = logger
+        self.engine = conn_engine
+        self.recent: Deque[Dict[str, Any]] = deque(maxlen=max_recent)
+        self._stats: "OrderedDict[str, FingerprintStats]" = OrderedDict()
+        self._lock = Lock()
+
+    def observe(self, query: str, params: Mapping[str, Any], seconds: float, rows: int = 0, path: Optional[str] = None) -> Optional[Thread]:
+        """
+        records an executed query and returns the thread explaining it if it was a slow one
+        """
+        shape = fingerprint(query)
+        key = fingerprint_id(shape)
+        slow = self.threshold > 0 and seconds >= self.threshold
+        explain_it = False
+        with self._lock:
+            stats = self._stats.get(key)
+            if stats is None:
+                stats = self._stats[key] = FingerprintStats(shape)
+                while len(self._stats) > self.max_fingerprints:
+                    # forget the least recently executed shape
+                    self._stats.popitem(last=False)
+            else:
+                self._stats.move_to_end(key)
+            stats.count += 1
+            stats.total_seconds += seconds
+            stats.max_seconds = max(stats.max_seconds, seconds)
+            stats.rows += rows
+            if not slow:
+                return None
+            stats.slow_count += 1
+            now = monotonic()
+            if stats.last_explained is None or now - stats.last_explained >= self.explain_interval:
+                # explain each shape once per interval only
+                stats.last_explained = now
+                explain_it = True
+
+        entry: Dict[str, Any] = dict(
+            time=datetime.now().isoformat(timespec="seconds"),
+            fingerprint_id=key,
+            fingerprint=shape,
+            seconds=round(seconds, 6),
+            rows=rows,
+            path=path,
+            index_hint=index_hint(query),
+            query=query,
+            params=dict(params),
+        )
+        if not explain_it:
+            self._write(entry)
+            return None
+
+        def run():
+            try:
+                entry["plan"], entry["chosen_indexes"] = explain(self.engine, query, params)
+            except Exception as e:
+                entry["explain_error"] = str(e)
+            self._write(entry)
+
+        thread = Thread(target=run, daemon=True)
+        thread.start()
+        return thread
+
+    def _write(self, entry: Dict[str, Any]):
+        with self._lock:
+            self.recent.append(entry)
+        self.logger.warning(orjson.dumps(entry, default=str).decode("utf-8"))
+
+    def stats(self) -> List[Dict[str, Any]]:
+        """
+        statistics per fingerprint, most time consuming first
+        """
+        with self._lock:
+            stats = [dict(fingerprint_id=key, **s.as_dict()) for key, s in self._stats.items()]
+        return sorted(stats, key=lambda s: s["total_seconds"], reverse=True)
+
+    def as_dict(self) -> Dict[str, Any]:
+        with self._lock:
+            recent = list(reversed(self.recent))
+        return dict(threshold=self.threshold, fingerprints=self.stats(), recent=recent)
+
+
+class TimedRows:
+    """
+    wraps the result of a query and reports its execution time including fetching the rows to the slow query log
+    """
+
+    def __init__(self, rows: Any, query: str, params: Mapping[str, Any], seconds: float):
+        self.rows = rows
+        self.query = query
+        self.params = params
+        self.seconds = seconds
+        self.count = 0
+        self.path = request_path()
+
+    def keys(self) -> List[str]:
+        return self.rows.keys()
+
+    def __iter__(self) -> Iterator[Any]:
+        it = iter(self.rows)
+        try:
+            while True:
+                start = perf_counter()
+                try:
+                    batch = list(islice(it, TIMED_BATCH_SIZE))
+                finally:
+                    self.seconds += perf_counter() - start
+                if not batch:
+                    return
+                self.count += len(batch)
+                yield from batch
+        finally:
+            slow_queries.observe(self.query, self.params, self.seconds, self.count, self.path)
+
+
+def request_path() -> Optional[str]:
+    return request.path if has_request_context() else None
+
+
+def _create_logger() -> logging.Logger:
+    # without a log file, the entries go to the regular log (see main.py)
+    logger = logging.getLogger("delphi.epidata.slow_query")
+    if SLOW_QUERY_LOG_FILE:
+        handler = RotatingFileHandler(SLOW_QUERY_LOG_FILE, maxBytes=SLOW_QUERY_LOG_MAX_BYTES, backupCount=SLOW_QUERY_LOG_BACKUPS)
+        handler.setFormatter(logging.Formatter("%(message)s"))
+        logger.addHandler(handler)
+        logger.setLevel(logging.INFO)
+        logger.propagate = False
+    return logger
+
+
+slow_queries = SlowQueryLog(
+    SLOW_QUERY_THRESHOLD,
+    SLOW_QUERY_EXPLAIN_INTERVAL,
+    SLOW_QUERY_MAX_FINGERPRINTS,
+    SLOW_QUERY_RECENT,
+    _create_logger(),
+    engine,
+)
@@ -0,0 +1,203 @@
+from contextlib import contextmanager
+from threading import Lock
+from time import perf_counter
+from typing import Dict, List, Optional, Tuple
+
+from flask import Response, g, has_app_context, request
+
+from ._common import app
+
+# upper bounds in seconds of the latency histogram buckets
+BUCKETS: Tuple[float, ...] = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 300.0)
+
+# reported spans in this order
+SPANS = ("params", "sql", "fetch", "decode", "serialize", "total")
+
+# rows are timed in batches of this size, timing each row costs about as much as decoding it
+TIMED_BATCH_SIZE = 100
+
+
+class RequestTelemetry:
+    """
+    time spent in the different phases of a request plus the amount of data sent
+    """
+
+    def __init__(self):
+        self.start = perf_counter()
+        self.endpoint: Optional[str] = None
+        self._spans: Dict[str, float] = {}
+        self.rows = 0
+        self.bytes = 0
+
+    def add(self, name: str, seconds: float):
+        self._spans[name] = self._spans.get(name, 0.0) + seconds
+
+    def mark(self, name: str):
+        """
+        records the time since the start of the request, the first time only
+        """
+        if name not in self._spans:
+            self._spans[name] = perf_counter() - self.start
+
+    def finish(self):
+        self.mark("total")
+
+    def spans(self) -> Dict[str, float]:
+        """
+        the spans in seconds, fetching the rows is reported without decoding them
+        """
+        spans = dict(self._spans)
+        if "fetch" in spans:
+            spans["fetch"] = max(spans["fetch"] - spans.get("decode", 0.0), 0.0)
+        return {name: spans[name] for name in SPANS if name in spans}
+
+    def server_timing(self) -> str:
+        parts = [f"{name};dur={seconds * 1000:.1f}" for name, seconds in self.spans().items()]
+        parts.append(f'rows;desc="{self.rows}"')
+        parts.append(f'bytes;desc="{self.bytes}"')
+        return ", ".join(parts)
+
+
+def current_telemetry() -> Optional[RequestTelemetry]:
+    """
+    the telemetry of the current request, None outside of a request e.g. in a background thread
+    """
+    if not has_app_context():
+        return None
+    telemetry = g.get("telemetry")
+    if telemetry is None:
+        telemetry = g.telemetry = RequestTelemetry()
+    return telemetry
+
+
+@contextmanager
+def span(name: str):
+    """
+    adds the time spent in the block to the given span of the current request
+    """
+    telemetry = current_telemetry()
+    start = perf_counter()
+    try:
+        yield
+    finally:
+        if telemetry is not None:
+            telemetry.add(name, perf_counter() - start)
+
+
+def set_endpoint_label(name: str):
+    """
+    overrides the endpoint name the current request is reported under
+    """
+    telemetry = current_telemetry()
+    if telemetry is not None:
+        telemetry.endpoint = name
+
+
+class Histogram:
+    def __init__(self, buckets: Tuple[float, ...] = BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        i = 0
+        while i < len(self.buckets) and value > self.buckets[i]:
+            i += 1
+        self.counts[i] += 1
+        self.sum += value
+        self.count += 1
+
+
+class Metrics:
+    """
+    request metrics of this worker process aggregated per endpoint
+    """
+
+    def __init__(self):
+        self.durations: Dict[Tuple[str, str], Histogram] = {}
+        self.requests: Dict[Tuple[str, str], int] = {}
+        self.rows: Dict[str, int] = {}
+        self.bytes: Dict[str, int] = {}
+        self._lock = Lock()
+
+    def record(self, endpoint: str, status: int, telemetry: RequestTelemetry):
+        with self._lock:
+            for name, seconds in telemetry.spans().items():
+                histogram = self.durations.get((endpoint, name))
+                if histogram is None:
+                    histogram = self.durations[(endpoint, name)] = Histogram()
+                histogram.observe(seconds)
+            key = (endpoint, str(status))
+            self.requests[key] = self.requests.get(key, 0) + 1
+            self.rows[endpoint] = self.rows.get(endpoint, 0) + telemetry.rows
+            self.bytes[endpoint] = self.bytes.get(endpoint, 0) + telemetry.bytes
+
+    def render(self, gauges: Optional[Dict[str, float]] = None) -> str:
+        """
+        renders the metrics in the Prometheus text exposition format
+        """
+        lines: List[str] = []
+        with self._lock:
+            lines.append("# HELP epidata_request_duration_seconds time spent per request phase")
+            lines.append("# TYPE epidata_request_duration_seconds histogram")
+            for (endpoint, name), histogram in sorted(self.durations.items()):
+                labels = f'endpoint="{endpoint}",span="{name}"'
+                cumulative = 0
+                for bound, count in zip(histogram.buckets + (float("inf"),), histogram.counts):
+                    cumulative += count
+                    le = "+Inf" if bound == float("inf") else repr(bound)
+                    lines.append(f'epidata_request_duration_seconds_bucket{{{labels},le="{le}"}} {cumulative}')
+                lines.append(f"epidata_request_duration_seconds_sum{{{labels}}} {histogram.sum}")
+                lines.append(f"epidata_request_duration_seconds_count{{{labels}}} {histogram.count}")
+            lines.append("# HELP epidata_requests_total number of requests")
+            lines.append("# TYPE epidata_requests_total counter")
+            for (endpoint, status), count in sorted(self.requests.items()):
+                lines.append(f'epidata_requests_total{{endpoint="{endpoint}",status="{status}"}} {count}')
+            lines.append("# HELP epidata_response_rows_total number of rows sent")
+            lines.append("# TYPE epidata_response_rows_total counter")
+            for endpoint, count in sorted(self.rows.items()):
+                lines.append(f'epidata_response_rows_total{{endpoint="{endpoint}"}} {count}')
+            lines.append("# HELP epidata_response_bytes_total number of (uncompressed) bytes sent")
+            lines.append("# TYPE epidata_response_bytes_total counter")
+            for endpoint, count in sorted(self.bytes.items()):
+                lines.append(f'epidata_response_bytes_total{{endpoint="{endpoint}"}} {count}')
+        for name, value in (gauges or {}).items():
+            lines.append(f"# TYPE {name} gauge")
+            lines.append(f"{name} {value}")
+        return "\n".join(lines) + "\n"
+
+
+metrics = Metrics()
+
+
+@app.before_request
+def start_telemetry():
+    g.telemetry = RequestTelemetry()
+
+
+@app.after_request
+def finish_telemetry(response: Response) -> Response:
+    telemetry = current_telemetry()
+    if telemetry is None:
+        return response
+    endpoint = telemetry.endpoint or request.blueprint or request.endpoint or "unknown"
+    status = response.status_code
+
+    if not response.is_streamed:
+        telemetry.finish()
+        if response.direct_passthrough:
+            telemetry.bytes = response.content_length or 0
+        else:
+            telemetry.bytes = len(response.get_data())
+        response.headers["Server-Timing"] = telemetry.server_timing()
+        metrics.record(endpoint, status, telemetry)
+        return response
+
+    # the work happens while streaming, i.e. it is just known once the response is closed
+    def on_close():
+        telemetry.finish()
+        metrics.record(endpoint, status, telemetry)
+
+    response.call_on_close(on_close)
+    return response
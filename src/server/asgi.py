@@ -0,0 +1,193 @@
+"""
+ASGI entry point of the API server, e.g. `gunicorn -k uvicorn.workers.UvicornWorker app.asgi:application`
+
+The endpoint handlers are synchronous Flask views that stream their rows from a synchronous SQLAlchemy connection.
+Each request is executed by the adapter on a dedicated thread, since the Flask request context and the database
+connection are bound to the thread that created them. The produced chunks are handed over to the event loop through
+a bounded queue, i.e. a slow client just blocks its own lightweight thread instead of a whole worker process.
+"""
+import asyncio
+import sys
+from concurrent.futures import CancelledError, TimeoutError as FutureTimeoutError
+from io import BytesIO
+from threading import Event, Thread
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Optional, Tuple
+
+from ._config import ASGI_MAX_CONCURRENT_REQUESTS, ASGI_STREAM_BUFFER_CHUNKS
+from .main import app
+
+Scope = Dict[str, Any]
+Message = Dict[str, Any]
+Receive = Callable[[], Awaitable[Message]]
+Send = Callable[[Message], Awaitable[None]]
+
+__all__ = ["application", "WSGIAdapter"]
+
+
+class _Disconnected(Exception):
+    pass
+
+
+def build_environ(scope: Scope, body: bytes) -> Dict[str, Any]:
+    """
+    builds the WSGI environ of the given ASGI HTTP scope
+    """
+    server = scope.get("server") or ("localhost", 80)
+    client = scope.get("client") or ("", 0)
+    environ: Dict[str, Any] = {
+        "REQUEST_METHOD": scope["method"],
+        "SCRIPT_NAME": scope.get("root_path", "").encode("utf8").decode("latin1"),
+        "PATH_INFO": scope["path"].encode("utf8").decode("latin1"),
+        "QUERY_STRING": scope.get("query_string", b"").decode("latin1"),
+        "SERVER_NAME": server[0],
+        "SERVER_PORT": str(server[1]),
+        "SERVER_PROTOCOL": f"HTTP/{scope.get('http_version', '1.1')}",
+        "REMOTE_ADDR": client[0],
+        "REMOTE_PORT": str(client[1]),
+        "CONTENT_LENGTH": str(len(body)),
+        "wsgi.version": (1, 0),
+        "wsgi.url_scheme": scope.get("scheme", "http"),
+        "wsgi.input": BytesIO(body),
+        "wsgi.errors": sys.stderr,
+        "wsgi.multithread": True,
+        "wsgi.multiprocess": True,
+        "wsgi.run_once": False,
+    }
+    for name, value in scope.get("headers", []):
+        key = name.decode("latin1").upper().replace("-", "_")
+        if key == "CONTENT_LENGTH":
+            continue
+        if key != "CONTENT_TYPE":
+            key = f"HTTP_{key}"
+        value = value.decode("latin1")
+        environ[key] = f"{environ[key]},{value}" if key in environ else value
+    return environ
+
+
+class WSGIAdapter:
+    """
+    ASGI application running a WSGI application on a dedicated thread per request
+    """
+
+    def __init__(self, wsgi_app: Callable, buffer_chunks: int = ASGI_STREAM_BUFFER_CHUNKS, max_concurrent_requests: int = ASGI_MAX_CONCURRENT_REQUESTS):
+        self.wsgi_app = wsgi_app
+        self.buffer_chunks = buffer_chunks
+        self.max_concurrent_requests = max_concurrent_requests
+        self._slots: Optional[asyncio.Semaphore] = None
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] == "lifespan":
+            await self._lifespan(receive, send)
+        elif scope["type"] == "http":
+            if self._slots is None:
+                self._slots = asyncio.Semaphore(self.max_concurrent_requests)
+            async with self._slots:
+                await self._http(scope, receive, send)
+        else:
+            raise ValueError(f"unsupported scope type: {scope['type']}")
+
+    async def _lifespan(self, receive: Receive, send: Send):
+        while True:
+            message = await receive()
+            if message["type"] == "lifespan.startup":
+                await send({"type": "lifespan.startup.complete"})
+            elif message["type"] == "lifespan.shutdown":
+                await send({"type": "lifespan.shutdown.complete"})
+                return
+
+    async def _http(self, scope: Scope, receive: Receive, send: Send):
+        body: List[bytes] = []
+        while True:
+            message = await receive()
+            if message["type"] == "http.disconnect":
+                return
+            body.append(message.get("body", b""))
+            if not message.get("more_body", False):
+                break
+
+        loop = asyncio.get_running_loop()
+        queue: asyncio.Queue = asyncio.Queue(self.buffer_chunks)
+        disconnected = Event()
+        worker = Thread(target=self._run, args=(build_environ(scope, b"".join(body)), loop, queue, disconnected), daemon=True)
+        worker.start()
+
+        async def watch_disconnect():
+            while (await receive())["type"] != "http.disconnect":
+                pass
+            disconnected.set()
+
+        watcher = loop.create_task(watch_disconnect())
+        try:
+            while True:
+                kind, payload = await queue.get()
+                if kind == "start":
+                    status, headers = payload
+                    await send({"type": "http.response.start", "status": status, "headers": headers})
+                elif kind == "body":
+                    await send({"type": "http.response.body", "body": payload, "more_body": True})
+                else:
+                    await send({"type": "http.response.body", "body": b"", "more_body": False})
+                    return
+        except OSError:
+            # client went away while sending
+            pass
+        finally:
+            disconnected.set()
+            watcher.cancel()
+
+    def _run(self, environ: Dict[str, Any], loop: asyncio.AbstractEventLoop, queue: asyncio.Queue, disconnected: Event):
+        def put(kind: str, payload: Any):
+            if disconnected.is_set():
+                raise _Disconnected()
+            try:
+                future = asyncio.run_coroutine_threadsafe(queue.put((kind, payload)), loop)
+                while True:
+                    try:
+                        return future.result(timeout=1)
+                    except FutureTimeoutError:
+                        if disconnected.is_set():
+                            future.cancel()
+                            raise _Disconnected()
+            except (CancelledError, RuntimeError):
+                # the event loop is gone
+                raise _Disconnected()
+
+        started: List[Tuple[int, List[Tuple[bytes, bytes]]]] = []
+        sent_start = False
+
+        def send_start():
+            nonlocal sent_start
+            if started and not sent_start:
+                put("start", started.pop())
+                sent_start = True
+
+        def start_response(status: str, headers: List[Tuple[str, str]], exc_info=None):
+            started.append((int(status.split(" ", 1)[0]), [(k.lower().encode("latin1"), v.encode("latin1")) for k, v in headers]))
+
+        try:
+            result: Iterable[bytes] = self.wsgi_app(environ, start_response)
+            try:
+                for chunk in result:
+                    send_start()
+                    if chunk:
+                        put("body", chunk)
+                    if disconnected.is_set():
+                        break
+                send_start()
+            finally:
+                getattr(result, "close", lambda: None)()
+            put("end", None)
+        except _Disconnected:
+            pass
+        except Exception:
+            app.logger.exception("error while serving the request")
+            try:
+                if not sent_start:
+                    put("start", (500, [(b"content-type", b"text/plain")]))
+                    put("body", b"internal server error")
+                put("end", None)
+            except _Disconnected:
+                pass
+
+
+application = WSGIAdapter(app.wsgi_app)
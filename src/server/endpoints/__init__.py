@@ -1,75 +1,48 @@
-from . import (
-    afhsb,
-    cdc,
-    covid_hosp_facility_lookup,
-    covid_hosp_facility,
-    covid_hosp_state_timeseries,
-    covidcast_nowcast,
-    covidcast_meta,
-    covidcast,
-    delphi,
-    dengue_nowcast,
-    dengue_sensors,
-    ecdc_ili,
-    flusurv,
-    fluview_clinicial,
-    fluview_meta,
-    fluview,
-    gft,
-    ght,
-    ilinet,
-    kcdc_ili,
-    meta_afhsb,
-    meta_norostat,
-    meta,
-    nidss_dengue,
-    nidss_flu,
-    norostat,
-    nowcast,
-    paho_dengue,
-    quidel,
-    sensors,
-    twitter,
-    wiki,
-    signal_dashboard_status,
-    signal_dashboard_coverage,
-)
+"""
+the endpoint modules are listed in the manifest and imported on their first request,
+such that a worker only loads the modules (and their dependencies) it actually serves
+"""
+from importlib import import_module
+from types import ModuleType
+from typing import Callable, Iterable, List, Optional
 
-endpoints = [
-    afhsb,
-    cdc,
-    covid_hosp_facility_lookup,
-    covid_hosp_facility,
-    covid_hosp_state_timeseries,
-    covidcast_nowcast,
-    covidcast_meta,
-    covidcast,
-    delphi,
-    dengue_nowcast,
-    dengue_sensors,
-    ecdc_ili,
-    flusurv,
-    fluview_clinicial,
-    fluview_meta,
-    fluview,
-    gft,
-    ght,
-    ilinet,
-    kcdc_ili,
-    meta_afhsb,
-    meta_norostat,
-    meta,
-    nidss_dengue,
-    nidss_flu,
-    norostat,
-    nowcast,
-    paho_dengue,
-    quidel,
-    sensors,
-    twitter,
-    wiki,
-    signal_dashboard_status,
-    signal_dashboard_coverage,
-]
+from flask import Response
 
-__all__ = ["endpoints"]
+from .manifest import MANIFEST, EndpointEntry, Route
+
+
+def load(entry: EndpointEntry) -> ModuleType:
+    """
+    imports the module of the given endpoint
+    """
+    return import_module(f"{__name__}.{entry.module}")
+
+
+def load_all(modules: Iterable[str]) -> List[ModuleType]:
+    """
+    imports the given endpoint modules, "*" = all of them
+    """
+    modules = set(modules)
+    return [load(entry) for entry in MANIFEST if "*" in modules or entry.module in modules or entry.name in modules]
+
+
+class LazyView:
+    """
+    a view function that imports its endpoint module on the first call
+    """
+
+    def __init__(self, entry: EndpointEntry, function: str):
+        self.entry = entry
+        self.function = function
+        self.__name__ = function
+        self._view: Optional[Callable[..., Response]] = None
+
+    def __call__(self, *args, **kwargs) -> Response:
+        if self._view is None:
+            self._view = getattr(load(self.entry), self.function)
+        return self._view(*args, **kwargs)
+
+
+endpoints = MANIFEST
+
+__all__ = ["endpoints", "EndpointEntry", "Route", "LazyView", "load", "load_all"]
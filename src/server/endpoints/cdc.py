@@ -2,7 +2,7 @@ from flask import Blueprint
 
 from .._config import AUTH, NATION_REGION, REGION_TO_STATE
 from .._validate import require_all, extract_strings, extract_integers, check_auth_token
-from .._query import filter_strings, execute_queries, filter_integers
+from .._query import filter_strings, execute_queries, filter_integers, select_expressions
 
 # first argument is the endpoint name
 bp = Blueprint("cdc", __name__)
@@ -42,6 +42,7 @@ def handle():
         assert region == NATION_REGION or region in REGION_TO_STATE
         # escape region not needed since only certain valid strings
         fields = f"'{region}' `location`, c.`epiweek`, sum(c.`num1`) `num1`, sum(c.`num2`) `num2`, sum(c.`num3`) `num3`, sum(c.`num4`) `num4`, sum(c.`num5`) `num5`, sum(c.`num6`) `num6`, sum(c.`num7`) `num7`, sum(c.`num8`) `num8`, sum(c.`total`) `total`"
+        fields = select_expressions(fields)
         region_params = params.copy()
         if region == NATION_REGION:
             # final query for U.S. National
@@ -58,6 +59,7 @@ def handle():
     # query all states together
     if states:
         fields = "c.`state` `location`, c.`epiweek`, c.`num1`, c.`num2`, c.`num3`, c.`num4`, c.`num5`, c.`num6`, c.`num7`, c.`num8`, c.`total`"
+        fields = select_expressions(fields)
         # build the location filter
         state_params = params.copy()
         condition_location = filter_strings("c.`state`", states, "state", state_params)
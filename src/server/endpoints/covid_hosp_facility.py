@@ -1,6 +1,6 @@
 from flask import Blueprint
 
-from .._query import execute_query, QueryBuilder
+from .._query import execute_query, select_fields, QueryBuilder
 from .._validate import extract_integers, extract_strings, require_all
 
 # first argument is the endpoint name
@@ -117,7 +117,7 @@ def handle():
         "icu_patients_confirmed_influenza_7_day_avg",
         "total_patients_hosp_confirmed_influenza_and_covid_7d_avg",
     ]
-    q.set_fields(fields_string, fields_int, fields_float)
+    q.set_fields(*select_fields(fields_string, fields_int, fields_float))
 
     # basic query info
     q.set_order("collection_week", "hospital_pk", "publication_date")
@@ -1,6 +1,6 @@
 from flask import Blueprint
 
-from .._query import execute_query, QueryBuilder
+from .._query import execute_query, select_expressions, QueryBuilder
 from .._validate import extract_strings, require_any
 
 # first argument is the endpoint name
@@ -18,19 +18,21 @@ def handle():
 
     # build query
     q = QueryBuilder("covid_hosp_facility", "c")
-    q.fields = ", ".join(
-        [
-            f"{q.alias}.hospital_pk",
-            f"MAX({q.alias}.state) state",
-            f"MAX({q.alias}.ccn) ccn",
-            f"MAX({q.alias}.hospital_name) hospital_name",
-            f"MAX({q.alias}.address) address",
-            f"MAX({q.alias}.city) city",
-            f"MAX({q.alias}.zip) zip",
-            f"MAX({q.alias}.hospital_subtype) hospital_subtype",
-            f"MAX({q.alias}.fips_code) fips_code",
-            f"MAX({q.alias}.is_metro_micro) is_metro_micro",
-        ]
+    q.fields = select_expressions(
+        ", ".join(
+            [
+                f"{q.alias}.hospital_pk",
+                f"MAX({q.alias}.state) state",
+                f"MAX({q.alias}.ccn) ccn",
+                f"MAX({q.alias}.hospital_name) hospital_name",
+                f"MAX({q.alias}.address) address",
+                f"MAX({q.alias}.city) city",
+                f"MAX({q.alias}.zip) zip",
+                f"MAX({q.alias}.hospital_subtype) hospital_subtype",
+                f"MAX({q.alias}.fips_code) fips_code",
+                f"MAX({q.alias}.is_metro_micro) is_metro_micro",
+            ]
+        )
     )
     # basic query info
     q.group_by = f"{q.alias}.hospital_pk"
@@ -1,6 +1,6 @@
 from flask import Blueprint
 
-from .._query import execute_query, QueryBuilder
+from .._query import execute_query, select_fields, QueryBuilder
 from .._validate import extract_integers, extract_strings, extract_date, require_all
 
 # first argument is the endpoint name
@@ -85,7 +85,8 @@ def handle():
         "adult_icu_bed_utilization",
     ]
 
-    q.set_fields(fields_string, fields_int, fields_float)
+    # the outer query orders by these columns of the common table expression
+    q.set_fields(*select_fields(fields_string, fields_int, fields_float, required=["date", "state", "issue"]))
     q.set_order("date", "state", "issue")
 
     # build the filter
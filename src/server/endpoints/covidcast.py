@@ -1,13 +1,14 @@
 from typing import List, Optional, Union, Tuple, Dict, Any, Set
-from itertools import groupby
+from itertools import chain, groupby
 from datetime import date, datetime, timedelta
 from flask import Blueprint, request
-from flask.json import loads, jsonify
+from flask.json import jsonify
 from bisect import bisect_right
-from sqlalchemy import text
-from pandas import read_csv
 
-from .._common import is_compatibility_mode, db
+from .._admission import run_admitted
+from .._cache import cached, covidcast_version
+from .._common import app, is_compatibility_mode
+from .._config import COVIDCAST_AS_OF_NEXT_ISSUE, COVIDCAST_LATEST_TABLE, REVISION_PROFILE_LAGS
 from .._exceptions import ValidationFailedException, DatabaseErrorException
 from .._params import (
     GeoPair,
@@ -22,7 +23,7 @@ from .._params import (
     parse_single_time_arg,
     parse_single_geo_arg,
 )
-from .._query import QueryBuilder, execute_query, run_query, parse_row, filter_fields
+from .._query import QueryBuilder, execute_query, run_query, parse_rows, compile_row_decoder, filter_fields, decode_cursor, requested_fields, select_fields
 from .._printer import create_printer, CSVPrinter
 from .._validate import (
     extract_date,
@@ -32,8 +33,8 @@ from .._validate import (
     require_all,
     require_any,
 )
-from .._pandas import as_pandas, print_pandas
-from .covidcast_utils import compute_trend, compute_trends, compute_correlations, compute_trend_value, CovidcastMetaEntry, AllSignalsMap
+from .covidcast_utils import compute_trend_value, get_covidcast_meta, CovidcastMeta
+from .covidcast_utils.planner import best_index, estimate_plans, estimate_rows
 from ..utils import shift_time_value, date_to_time_value, time_value_to_iso, time_value_to_date
 
 # first argument is the endpoint name
@@ -90,6 +91,10 @@ def _handle_lag_issues_as_of(q: QueryBuilder, issues: Optional[List[Union[Tuple[
         q.where_integers("issue", issues)
     elif lag is not None:
         q.where(lag=lag)
+    elif as_of is not None and COVIDCAST_AS_OF_NEXT_ISSUE:
+        # fetch the issue of each key that is current as of
+        q.conditions.append(f"({q.alias}.issue <= :as_of AND ({q.alias}.next_issue > :as_of OR {q.alias}.next_issue IS NULL))")
+        q.params["as_of"] = as_of
     elif as_of is not None:
         # fetch most recent issues with as of
         sub_condition_asof = "(issue <= :as_of)"
@@ -98,30 +103,62 @@ def _handle_lag_issues_as_of(q: QueryBuilder, issues: Optional[List[Union[Tuple[
         sub_group = "time_type, time_value, `source`, `signal`, geo_type, geo_value"
         sub_condition = f"x.max_issue = {q.alias}.issue AND x.time_type = {q.alias}.time_type AND x.time_value = {q.alias}.time_value AND x.source = {q.alias}.source AND x.signal = {q.alias}.signal AND x.geo_type = {q.alias}.geo_type AND x.geo_value = {q.alias}.geo_value"
         q.subquery = f"JOIN (SELECT {sub_fields} FROM {q.table} WHERE {q.conditions_clause} AND {sub_condition_asof} GROUP BY {sub_group}) x ON {sub_condition}"
+    elif COVIDCAST_LATEST_TABLE:
+        # fetch most recent issue fast from the table with just these rows
+        q.table = f"{COVIDCAST_LATEST_TABLE} {q.alias}"
     else:
         # fetch most recent issue fast
         q.conditions.append(f"({q.alias}.is_latest_issue IS TRUE)")
 
 
-def guess_index_to_use(time: List[TimePair], geo: List[GeoPair], issues: Optional[List[Union[Tuple[int, int], int]]] = None, lag: Optional[int] = None, as_of: Optional[int] = None) -> Optional[str]:
+def guess_index_to_use(
+    time: List[TimePair],
+    geo: List[GeoPair],
+    issues: Optional[List[Union[Tuple[int, int], int]]] = None,
+    lag: Optional[int] = None,
+    as_of: Optional[int] = None,
+    source_signal_pairs: Optional[List[SourceSignalPair]] = None,
+    meta: Optional[CovidcastMeta] = None,
+) -> Optional[str]:
+    if issues:
+        geo_first_index = "by_issue"
+    elif lag is not None:
+        geo_first_index = "by_lag"
+    elif as_of is None:
+        # latest
+        geo_first_index = "by_issue"
+    elif COVIDCAST_AS_OF_NEXT_ISSUE:
+        geo_first_index = "by_as_of"
+    else:
+        # no optimization known
+        return None
+
+    if meta is not None and source_signal_pairs:
+        # estimate the rows read by each index from the number of locations and the time span of the signals
+        plans = estimate_plans(meta, source_signal_pairs, geo, time, geo_first_index)
+        if plans is not None:
+            return best_index(plans)
+
     time_values_to_retrieve = sum((t.count() for t in time))
     geo_values_to_retrieve = sum((g.count() for g in geo))
 
     if geo_values_to_retrieve > 5 or time_values_to_retrieve < 30:
         # no optimization known
         return None
+    return geo_first_index
 
-    if issues:
-        return "by_issue"
-    elif lag is not None:
-        return "by_lag"
-    elif as_of is None:
-        # latest
-        return "by_issue"
-    return None
+
+def _planner_meta() -> Optional[CovidcastMeta]:
+    try:
+        meta, _ = get_covidcast_meta()
+    except Exception:
+        app.logger.warning("cannot load the covidcast meta data for choosing an index", exc_info=True)
+        return None
+    return meta
 
 
 @bp.route("/", methods=("GET", "POST"))
+@cached(covidcast_version)
 def handle():
     source_signal_pairs = parse_source_signal_pairs()
     time_pairs = parse_time_pairs()
@@ -144,7 +181,6 @@ def handle():
         # transfer also the new detail columns
         fields_string.extend(["source", "geo_type", "time_type"])
         q.set_order("source", "signal", "time_type", "time_value", "geo_type", "geo_value", "issue")
-    q.set_fields(fields_string, fields_int, fields_float)
 
     # basic query info
     # data type of each field
@@ -154,16 +190,35 @@ def handle():
     q.where_geo_pairs("geo_type", "geo_value", geo_pairs)
     q.where_time_pairs("time_type", "time_value", time_pairs)
 
-    q.index = guess_index_to_use(time_pairs, geo_pairs, issues, lag, as_of)
+    meta = _planner_meta()
+    q.index = guess_index_to_use(time_pairs, geo_pairs, issues, lag, as_of, source_signal_pairs, meta)
 
     _handle_lag_issues_as_of(q, issues, lag, as_of)
 
+    cursor_fields: Optional[List[str]] = None
+    if not is_compatibility_mode():
+        # keyset pagination along the sort order
+        cursor_fields = ["source", "signal", "time_type", "time_value", "geo_type", "geo_value", "issue"]
+        cursor = request.values.get("cursor")
+        if cursor:
+            q.where_after(cursor_fields, decode_cursor(cursor, [str, str, str, int, str, str, int]))
+
+    # fetch just the requested columns and the ones the cursor is built from
+    q.set_fields(*select_fields(fields_string, fields_int, fields_float, required=cursor_fields or []))
+
+    # large requests wait for a slot of their own pool, too large ones are rejected
+    estimated_rows = estimate_rows(meta, source_signal_pairs, geo_pairs, time_pairs, issues) if meta is not None else None
+
     # send query
-    return execute_query(str(q), q.params, fields_string, fields_int, fields_float)
+    return run_admitted(estimated_rows, lambda: execute_query(str(q), q.params, fields_string, fields_int, fields_float, cursor_fields=cursor_fields))
 
 
 @bp.route("/trend", methods=("GET", "POST"))
+@cached(covidcast_version)
 def handle_trend():
+    # numpy is just needed by the trend endpoints
+    from .covidcast_utils.trend_arrays import TREND_FIELDS, compute_trend_columns, fetch_series, trend_rows
+
     require_all("date", "window")
     source_signal_pairs = parse_source_signal_pairs()
     geo_pairs = parse_geo_pairs()
@@ -189,24 +244,25 @@ def handle_trend():
     _handle_lag_issues_as_of(q, None, None, None)
 
     p = create_printer()
-
-    def gen(rows):
-        for key, group in groupby((parse_row(row, fields_string, fields_int, fields_float) for row in rows), lambda row: (row["geo_type"], row["geo_value"], row["source"], row["signal"])):
-            trend = compute_trend(key[0], key[1], key[2], key[3], time_value, basis_time_value, ((row["time_value"], row["value"]) for row in group))
-            yield trend.asdict()
+    # build just the requested fields of the trends
+    trend_fields = requested_fields(TREND_FIELDS)
 
     # execute first query
     try:
         r = run_query(p, (str(q), q.params))
+        series = fetch_series(r)
     except Exception as e:
         raise DatabaseErrorException(str(e))
 
-    # now use a generator for sending the rows and execute all the other queries
-    return p(filter_fields(gen(r)))
+    return p(trend_rows(compute_trend_columns(series, time_value, basis_time_value), trend_fields))
 
 
 @bp.route("/trendseries", methods=("GET", "POST"))
+@cached(covidcast_version)
 def handle_trendseries():
+    # numpy is just needed by the trend endpoints
+    from .covidcast_utils.trend_arrays import TREND_FIELDS, compute_trends_columns, fetch_series, trend_rows
+
     require_all("window")
     source_signal_pairs = parse_source_signal_pairs()
     geo_pairs = parse_geo_pairs()
@@ -233,27 +289,28 @@ def handle_trendseries():
     _handle_lag_issues_as_of(q, None, None, None)
 
     p = create_printer()
-
-    shifter = lambda x: shift_time_value(x, -basis_shift)
-
-    def gen(rows):
-        for key, group in groupby((parse_row(row, fields_string, fields_int, fields_float) for row in rows), lambda row: (row["geo_type"], row["geo_value"], row["source"], row["signal"])):
-            trends = compute_trends(key[0], key[1], key[2], key[3], shifter, ((row["time_value"], row["value"]) for row in group))
-            for trend in trends:
-                yield trend.asdict()
+    # build just the requested fields of the trends
+    trend_fields = requested_fields(TREND_FIELDS)
 
     # execute first query
     try:
         r = run_query(p, (str(q), q.params))
+        series = fetch_series(r)
     except Exception as e:
         raise DatabaseErrorException(str(e))
 
-    # now use a generator for sending the rows and execute all the other queries
-    return p(filter_fields(gen(r)))
+    return p(trend_rows(compute_trends_columns(series, basis_shift), trend_fields))
 
 
 @bp.route("/correlation", methods=("GET", "POST"))
+@cached(covidcast_version)
 def handle_correlation():
+    # pandas and numpy are just needed by this and the anomalies endpoint
+    from .._pandas import as_pandas
+    import numpy as np
+    from .covidcast_utils.correlation import CORRELATION_FIELDS, compute_correlation_columns, correlation_rows
+    from .covidcast_utils.trend_arrays import KEY_FIELDS, series_arrays
+
     require_all("reference", "window", "others", "geo")
     reference = parse_single_source_signal_arg("reference")
     other_pairs = parse_source_signal_arg("others")
@@ -276,43 +333,20 @@ def handle_correlation():
     q.where_geo_pairs("geo_type", "geo_value", geo_pairs)
     q.where_time_pairs("time_type", "time_value", [TimePair("day", [time_window])])
 
-    # fetch most recent issue fast
-    q.conditions.append(f"({q.alias}.is_latest_issue IS TRUE)")
+    _handle_lag_issues_as_of(q, None, None, None)
 
-    df = as_pandas(str(q), q.params, parse_dates={"time_value": "%Y%m%d"})
+    df = as_pandas(str(q), q.params)
+    series = series_arrays([df[f].to_numpy(dtype=object) for f in KEY_FIELDS], df["time_value"].to_numpy(dtype=np.int64), df["value"].to_numpy(dtype=np.float64))
 
     p = create_printer()
+    # build just the requested fields of the correlations
+    correlation_fields = requested_fields(CORRELATION_FIELDS)
 
-    def prepare_data_frame(df):
-        return df[["time_value", "value"]].set_index("time_value")
-
-    def gen():
-        by_geo = df.groupby(["geo_type", "geo_value"])
-        for (geo_type, geo_value), group in by_geo:
-            # group by source, signal
-            by_signal = group.groupby(["source", "signal"])
-
-            # find reference group
-            # dataframe structure: index=time_value, value=value
-            reference_group = next((prepare_data_frame(group) for (source, signal), group in by_signal if source == reference.source and signal == reference.signal[0]), None)
-
-            if reference_group is None or reference_group.empty:
-                continue  # no data for reference
-
-            # dataframe structure: index=time_value, value=value
-            other_groups = [((source, signal), prepare_data_frame(group)) for (source, signal), group in by_signal if not (source == reference.source and signal == reference.signal[0])]
-            if not other_groups:
-                continue  # no other signals
-
-            for (source, signal), other_group in other_groups:
-                for cor in compute_correlations(geo_type, geo_value, source, signal, lag, reference_group, other_group):
-                    yield cor.asdict()
-
-    # now use a generator for sending the rows and execute all the other queries
-    return p(filter_fields(gen()))
+    return p(correlation_rows(compute_correlation_columns(series, reference.source, reference.signal[0], lag), correlation_fields))
 
 
 @bp.route("/csv", methods=("GET", "POST"))
+@cached(covidcast_version)
 def handle_export():
     source, signal = request.args.get("signal", "jhu-csse:confirmed_incidence_num").split(":")
     start_day = request.args.get("start_day", "2020-04-01")
@@ -388,6 +422,7 @@ def handle_export():
 
 
 @bp.route("/backfill", methods=("GET", "POST"))
+@cached(covidcast_version)
 def handle_backfill():
     """
     example query: http://localhost:5000/covidcast/backfill?signal=fb-survey:smoothed_cli&time=day:20200101-20220101&geo=state:ny&anchor_lag=60
@@ -400,22 +435,31 @@ def handle_backfill():
     if reference_anchor_lag is None:
         reference_anchor_lag = 60
 
-    # build query
-    q = QueryBuilder("covidcast", "t")
+    # compute just the requested columns, the sample size is just needed for its own ones
+    output_fields = requested_fields(
+        ["time_value", "issue", "value", "sample_size", "value_rel_change", "sample_size_rel_change", "is_anchor", "value_completeness", "sample_size_completeness"]
+    )
 
-    fields_string = []
-    fields_int = ["time_value", "issue"]
-    fields_float = ["value", "sample_size"]
-    # sort by time value and issue asc
-    q.set_order(time_value=True, issue=True)
-    q.set_fields(fields_string, fields_int, fields_float, ["is_latest_issue"])
+    def is_requested(*fields: str) -> bool:
+        return output_fields is None or any(f in output_fields for f in fields)
 
-    q.where_source_signal_pairs("source", "signal", [signal_pair])
-    q.where_geo_pairs("geo_type", "geo_value", [geo_pair])
-    q.where_time_pairs("time_type", "time_value", [time_pair])
+    with_sample_size = is_requested("sample_size", "sample_size_rel_change", "sample_size_completeness")
+    with_rel_change = is_requested("value_rel_change", "sample_size_rel_change")
+    with_completeness = is_requested("is_anchor", "value_completeness", "sample_size_completeness")
 
-    # no restriction of issues or dates since we want all issues
-    # _handle_lag_issues_as_of(q, issues, lag, as_of)
+    fields_string = []
+    fields_float = ["value", "sample_size"] if with_sample_size else ["value"]
+
+    def build_query(table: str, fields_int: List[str], order: str) -> QueryBuilder:
+        q = QueryBuilder(table, "t")
+        # sort by time value and issue / lag asc
+        q.set_order(time_value=True, **{order: True})
+        q.set_fields(fields_string, fields_int, fields_float)
+        q.where_source_signal_pairs("source", "signal", [signal_pair])
+        q.where_geo_pairs("geo_type", "geo_value", [geo_pair])
+        q.where_time_pairs("time_type", "time_value", [time_pair])
+        # no restriction of issues or dates since we want all issues
+        return q
 
     p = create_printer()
 
@@ -427,25 +471,56 @@ def handle_backfill():
             return rows[i - 1]
         return None
 
+    def compute_rows(issues: List[Dict[str, Any]], anchor_row: Optional[Dict[str, Any]]):
+        # compute data per time value
+        for i, row in enumerate(issues):
+            if i > 0 and with_rel_change:
+                prev_row = issues[i - 1]
+                row["value_rel_change"] = compute_trend_value(row["value"] or 0, prev_row["value"] or 0, 0)
+                if with_sample_size and row["sample_size"] is not None:
+                    row["sample_size_rel_change"] = compute_trend_value(row["sample_size"] or 0, prev_row["sample_size"] or 0, 0)
+            if anchor_row and anchor_row["value"] is not None:
+                row["is_anchor"] = row == anchor_row
+                row["value_completeness"] = (row["value"] or 0) / anchor_row["value"] if anchor_row["value"] else 1
+                if with_sample_size and row["sample_size"] is not None:
+                    row["sample_size_completeness"] = row["sample_size"] / anchor_row["sample_size"] if anchor_row["sample_size"] else 1
+            yield row
+
     def gen(rows):
         # stream per time_value
-        for time_value, group in groupby((parse_row(row, fields_string, fields_int, fields_float) for row in rows), lambda row: row["time_value"]):
-            # compute data per time value
+        for time_value, group in groupby(parse_rows(rows, fields_string, ["time_value", "issue"], fields_float), lambda row: row["time_value"]):
             issues: List[Dict[str, Any]] = [r for r in group]
-            anchor_row = find_anchor_row(issues, shift_time_value(time_value, reference_anchor_lag))
-
-            for i, row in enumerate(issues):
-                if i > 0:
-                    prev_row = issues[i - 1]
-                    row["value_rel_change"] = compute_trend_value(row["value"] or 0, prev_row["value"] or 0, 0)
-                    if row["sample_size"] is not None:
-                        row["sample_size_rel_change"] = compute_trend_value(row["sample_size"] or 0, prev_row["sample_size"] or 0, 0)
-                if anchor_row and anchor_row["value"] is not None:
-                    row["is_anchor"] = row == anchor_row
-                    row["value_completeness"] = (row["value"] or 0) / anchor_row["value"] if anchor_row["value"] else 1
-                    if row["sample_size"] is not None:
-                        row["sample_size_completeness"] = row["sample_size"] / anchor_row["sample_size"] if anchor_row["sample_size"] else 1
-                yield row
+            anchor_row = find_anchor_row(issues, shift_time_value(time_value, reference_anchor_lag)) if with_completeness else None
+            yield from compute_rows(issues, anchor_row)
+
+    def gen_profile(rows):
+        # the profile has a row per lag, a new issue is the first lag it is the latest issue of
+        for time_value, group in groupby(rows, lambda row: row["time_value"]):
+            issues: List[Dict[str, Any]] = []
+            anchor_row: Optional[Dict[str, Any]] = None
+            for row in group:
+                lag = row.pop("lag")
+                if issues and issues[-1]["issue"] == row["issue"]:
+                    row = issues[-1]
+                else:
+                    issues.append(row)
+                if lag == reference_anchor_lag and with_completeness:
+                    anchor_row = row
+            yield from compute_rows(issues, anchor_row)
+
+    # read the precomputed revision profile if it has the anchor lag, else the full issue history
+    if time_pair.time_type == "day" and reference_anchor_lag in REVISION_PROFILE_LAGS:
+        q = build_query("covidcast_revision_profile", ["time_value", "issue", "lag"], "lag")
+        try:
+            r = run_query(p, (q.query, q.params))
+            first_row = next(r, None)
+        except Exception as e:
+            raise DatabaseErrorException(str(e))
+        if first_row is not None:
+            decode = compile_row_decoder(r.keys(), fields_string, ["time_value", "issue", "lag"], fields_float)
+            return p(filter_fields(gen_profile(map(decode, chain([first_row], r)))))
+
+    q = build_query("covidcast", ["time_value", "issue"], "issue")
 
     # execute first query
     try:
@@ -458,6 +533,7 @@ def handle_backfill():
 
 
 @bp.route("/meta", methods=("GET", "POST"))
+@cached(covidcast_version)
 def handle_meta():
     """
     similar to /covidcast_meta but in a structured optimized JSON form for the app
@@ -465,32 +541,15 @@ def handle_meta():
 
     signal = parse_source_signal_arg("signal")
 
-    row = db.execute(text("SELECT epidata FROM covidcast_meta_cache LIMIT 1")).fetchone()
-
-    data = loads(row["epidata"]) if row and row["epidata"] else []
-
-    all_signals: AllSignalsMap = {}
-    for row in data:
-        if row["time_type"] != "day":
-            continue
-        entry: Set[str] = all_signals.setdefault(row["data_source"], set())
-        entry.add(row["signal"])
-
-    out: Dict[str, CovidcastMetaEntry] = {}
-    for row in data:
-        if row["time_type"] != "day":
-            continue
-        if signal and all((not s.matches(row["data_source"], row["signal"]) for s in signal)):
-            continue
-        entry = out.setdefault(
-            f"{row['data_source']}:{row['signal']}", CovidcastMetaEntry(row["data_source"], row["signal"], row["min_time"], row["max_time"], row["max_issue"], {}, all_signals=all_signals)
-        )
-        entry.intergrate(row)
+    meta, _ = get_covidcast_meta()
+    if not meta:
+        return jsonify([])
 
-    return jsonify([r.asdict() for r in out.values()])
+    return jsonify([d for entry, d in meta.entries() if not signal or any((s.matches(entry.source, entry.signal) for s in signal))])
 
 
 @bp.route("/coverage", methods=("GET", "POST"))
+@cached(covidcast_version)
 def handle_coverage():
     """
     similar to /signal_dashboard_coverage for a specific signal returns the coverage (number of locations for a given geo_type)
@@ -541,6 +600,11 @@ def handle_anomalies():
 
     signal = parse_source_signal_arg("signal")
 
+    # pandas is just needed by this and the correlation endpoint
+    from pandas import read_csv
+
+    from .._pandas import print_pandas
+
     df = read_csv(
         "https://docs.google.com/spreadsheets/d/e/2PACX-1vToGcf9x5PNJg-eSrxadoR5b-LM2Cqs9UML97587OGrIX0LiQDcU1HL-L2AA8o5avbU7yod106ih0_n/pub?gid=0&single=true&output=csv", skip_blank_lines=True
     )
@@ -1,14 +1,14 @@
 import sys
-from typing import Dict, List, Optional
+from typing import List, Optional
 
 from flask import Blueprint
-from flask.json import loads
-from sqlalchemy import text
 
-from .._common import db, app
+from .._cache import cached, covidcast_version
+from .._common import app
 from .._printer import create_printer
 from .._query import filter_fields
 from .._validate import extract_strings
+from .covidcast_utils import get_covidcast_meta
 
 bp = Blueprint("covidcast_meta", __name__)
 
@@ -34,46 +34,20 @@ def fetch_data(
     # complain if the cache is more than 75 minutes old
     max_age = 75 * 60
 
-    row = db.execute(
-        text(
-            "SELECT UNIX_TIMESTAMP(NOW()) - timestamp AS age, epidata FROM covidcast_meta_cache LIMIT 1"
-        )
-    ).fetchone()
+    meta, age = get_covidcast_meta()
 
-    if not row or not row["epidata"]:
+    if not meta or not meta.rows:
         return
 
-    age = row["age"]
-    if age > max_age and row["epidata"]:
+    if age is not None and age > max_age:
         app.logger.warning("covidcast_meta cache is stale: %d", age)
         pass
 
-    epidata = loads(row["epidata"])
-
-    if not epidata:
-        return
-
-    def filter_row(row: Dict):
-        if time_types and row.get("time_type") not in time_types:
-            return False
-        if geo_types and row.get("geo_type") not in geo_types:
-            return False
-        if not signals:
-            return True
-        for signal in signals:
-            # match source and (signal or no signal or signal = *)
-            if row.get("data_source") == signal.source and (
-                signal.signal == "*" or signal.signal == row.get("signal")
-            ):
-                return True
-        return False
-
-    for row in epidata:
-        if filter_row(row):
-            yield row
+    yield from meta.filter(time_types, geo_types, [(s.source, s.signal) for s in signals] if signals else None)
 
 
 @bp.route("/", methods=("GET", "POST"))
+@cached(covidcast_version)
 def handle():
     time_types = extract_strings("time_types")
     signals = [SourceSignal(v) for v in (extract_strings("signals") or [])]
@@ -1,6 +1,6 @@
 from flask import Blueprint, request
 
-from .._query import execute_query, filter_integers, filter_strings
+from .._query import execute_query, filter_integers, filter_strings, select_expressions
 from .._validate import (
     extract_date,
     extract_dates,
@@ -36,7 +36,8 @@ def handle():
 
     # build query
     table = "`covidcast_nowcast` t"
-    fields = "t.`signal`, t.`time_value`, t.`geo_value`, t.`value`, t.`issue`, t.`lag`"
+    # the latest issue query orders by the columns of its common table expression
+    fields = select_expressions("t.`signal`, t.`time_value`, t.`geo_value`, t.`value`, t.`issue`, t.`lag`", required=["signal", "time_value", "geo_value", "issue"])
     order = "t.`signal` ASC, t.`time_value` ASC, t.`geo_value` ASC, t.`issue` ASC"
 
     params = dict()
@@ -1,3 +1,4 @@
-from .trend import compute_trend, compute_trend_value, compute_trends
-from .correlation import compute_correlations
-from .meta import CovidcastMetaEntry, AllSignalsMap
\ No newline at end of file
+from .trend import compute_trend_value
+from .meta import CovidcastMetaEntry, AllSignalsMap
+from .meta_cache import CovidcastMeta, get_covidcast_meta
+
@@ -1,7 +1,9 @@
-from dataclasses import dataclass, asdict
-from typing import Iterable
-from scipy.stats import linregress
-import pandas as pd
+from dataclasses import dataclass, asdict, fields
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple
+import numpy as np
+
+from ...utils import calendar
+from .trend_arrays import SeriesArrays
 
 
 @dataclass
@@ -27,67 +29,112 @@ class CorrelationResult:
     number of dates used for the regression line
     """
 
-    def asdict(self):
-        return asdict(self)
+    def asdict(self, fields: Optional[Sequence[str]] = None):
+        """
+        returns the given fields (default = all) as a dict
+        """
+        if fields is None:
+            return asdict(self)
+        return {f: getattr(self, f) for f in fields}
 
 
-@dataclass
-class Correlation:
-    r2: float
+CORRELATION_FIELDS = [f.name for f in fields(CorrelationResult)]
 
-    slope: float
+# variances below this fraction of the mean squared (centered) value are rounding errors of a constant series
+_CONSTANT_TOLERANCE = 1e-10
+
+
+def align_series(series: SeriesArrays) -> np.ndarray:
     """
-    y = slope * x + intercept
+    the values of each series on the common day grid from the first to the last day, NaN for the missing days
     """
-    intercept: float
+    ordinals = calendar.day_to_ordinal(series.time_value)
+    first = int(ordinals.min()) if len(ordinals) else 0
+    grid = np.full((len(series.starts), int(ordinals.max()) - first + 1 if len(ordinals) else 0), np.nan)
+    grid[series.segment, ordinals - first] = series.value
+    return grid
+
+
+def compute_lagged_regressions(x: np.ndarray, y: np.ndarray, lag: int) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
     """
-    y = slope * x + intercept
+    the regressions y = slope * x + intercept of the rows of the day grids x and y for each lag from -lag to +lag,
+    pairing x_t_i with y_t_(i-lag) on the days both values are present. Returns r2, slope, intercept, and samples, each
+    of shape (rows, 2 * lag + 1). Constant x values give r2 = slope = 0 instead of an error.
     """
-    samples: int
+    num_pairs, num_days = x.shape
+    x_valid = ~np.isnan(x)
+    y_valid = ~np.isnan(y)
+    # center each series for numerical stability, this changes just the intercept
+    x_mean = np.where(x_valid, x, 0).sum(axis=1) / np.maximum(x_valid.sum(axis=1), 1)
+    y_mean = np.where(y_valid, y, 0).sum(axis=1) / np.maximum(y_valid.sum(axis=1), 1)
+    xv = np.where(x_valid, x - x_mean[:, None], 0)
+    yv = np.where(y_valid, y - y_mean[:, None], 0)
+    xm = x_valid.astype(np.float64)
+    ym = y_valid.astype(np.float64)
+    xx = xv * xv
+    yy = yv * yv
+
+    lags = range(-lag, lag + 1)
+    sums = np.zeros((6, num_pairs, len(lags)))
+    for i, current_lag in enumerate(lags):
+        # x_t_i ~ y_t_(i-lag)
+        shift = min(abs(current_lag), num_days)
+        xs = slice(shift, num_days) if current_lag >= 0 else slice(0, num_days - shift)
+        ys = slice(0, num_days - shift) if current_lag >= 0 else slice(shift, num_days)
+        for j, (a, b) in enumerate(((xm, ym), (xv, ym), (xm, yv), (xx, ym), (xm, yy), (xv, yv))):
+            sums[j, :, i] = np.einsum("ij,ij->i", a[:, xs], b[:, ys])
+    n, sx, sy, sxx, syy, sxy = sums
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        mx = sx / n
+        my = sy / n
+        # biased (co)variances like linregress
+        ssxm = sxx / n - mx * mx
+        ssym = syy / n - my * my
+        ssxym = sxy / n - mx * my
+        x_varies = ssxm > _CONSTANT_TOLERANCE * (sxx / n)
+        y_varies = ssym > _CONSTANT_TOLERANCE * (syy / n)
+        r = np.where(x_varies & y_varies, ssxym / np.sqrt(ssxm * ssym), 0.0)
+        slope = np.where(x_varies & y_varies, ssxym / ssxm, 0.0)
+    r = np.clip(r, -1.0, 1.0)
+    intercept = (my + y_mean[:, None]) - slope * (mx + x_mean[:, None])
+
+    # won't be a useful one
+    useful = n >= 2
+    return np.where(useful, r * r, 0.0), np.where(useful, slope, 0.0), np.where(useful, intercept, 0.0), n.astype(np.int64)
+
+
+def compute_correlation_columns(series: SeriesArrays, reference_source: str, reference_signal: str, lag: int) -> Dict[str, np.ndarray]:
     """
-    number of dates used for the regression line
+    the columns of the correlations of each (geo_type, geo_value, source, signal) series with the reference signal of
+    the same geo for each lag, ordered by geo and other signal and then by lag
     """
-
-
-def lag_join(lag: int, x: pd.DataFrame, y: pd.DataFrame) -> pd.DataFrame:
-    # x_t_i ~ y_t_(i-lag)
-    # aka x_t_(i+lag) ~ y_t_i
-
-    if lag == 0:
-        x_shifted = x
-        y_shifted = y
-    elif lag > 0:
-        # x_t_i ~ y_shifted_t_i
-        # shift y such that y_t(i - lag) -> y_shifted_t_i
-        x_shifted = x
-        y_shifted = y.shift(lag, freq="D")
-    else:  # lag < 0
-        # x_shifted_t_i ~ y_t_i
-        # shift x such that x_t(i+lag) -> x_shifted_t_i
-        # lag < 0 -> - - lag = + lag
-        x_shifted = x.shift(-lag, freq="D")
-        y_shifted = y
-    # inner join to remove invalid pairs
-    r = x_shifted.join(y_shifted, how="inner", lsuffix="_x", rsuffix="_y")
-    return r.rename(columns=dict(value_x="x", value_y="y"))
-
-
-def compute_correlations(geo_type: str, geo_value: str, signal_source: str, signal_signal: str, lag: int, x: pd.DataFrame, y: pd.DataFrame) -> Iterable[CorrelationResult]:
+    num_series = len(series.starts)
+    keys = [tuple(key) for key in zip(*[k[series.starts].tolist() for k in series.keys])]
+    references = {key[:2]: i for i, key in enumerate(keys) if key[2] == reference_source and key[3] == reference_signal}
+    pairs = [(references[keys[i][:2]], i) for i in sorted(range(num_series), key=keys.__getitem__) if keys[i][:2] in references and references[keys[i][:2]] != i]
+
+    num_lags = 2 * lag + 1
+    if not pairs:
+        return {f: np.array([], dtype=object) for f in CORRELATION_FIELDS}
+    x_series, y_series = (np.array(s, dtype=np.int64) for s in zip(*pairs))
+    grid = align_series(series)
+    r2, slope, intercept, samples = compute_lagged_regressions(grid[x_series], grid[y_series], lag)
+
+    columns: Dict[str, np.ndarray] = {f: np.repeat(key[series.starts][y_series], num_lags) for f, key in zip(("geo_type", "geo_value", "signal_source", "signal_signal"), series.keys)}
+    columns["lag"] = np.tile(np.arange(-lag, lag + 1), len(pairs))
+    columns["r2"] = r2.ravel()
+    columns["slope"] = slope.ravel()
+    columns["intercept"] = intercept.ravel()
+    columns["samples"] = samples.ravel()
+    return columns
+
+
+def correlation_rows(columns: Dict[str, np.ndarray], fields: Optional[Sequence[str]] = None) -> Iterator[Dict[str, Any]]:
     """
-    x,y ... DataFrame with "time_value" (Date) index and "value" (float) column
+    the rows of the given (default = all) fields of the correlation columns
     """
-    for current_lag in range(-lag, lag + 1):
-        xy = lag_join(current_lag, x, y)
-        c = compute_correlation(xy)
-
-        yield CorrelationResult(geo_type, geo_value, signal_source, signal_signal, current_lag, r2=c.r2, intercept=c.intercept, slope=c.slope, samples=c.samples)
-
-
-def compute_correlation(xy: pd.DataFrame) -> Correlation:
-    if len(xy) < 2:
-        # won't be a useful one
-        return Correlation(0, 0, 0, len(xy))
-
-    model = linregress(xy.to_numpy())
-    r2 = float(model.rvalue) ** 2
-    return Correlation(r2, float(model.slope), float(model.intercept), len(xy))
+    names = list(fields) if fields is not None else CORRELATION_FIELDS
+    values: List[List[Any]] = [columns[f].tolist() for f in names]
+    for row in zip(*values):
+        yield dict(zip(names, row))
@@ -0,0 +1,121 @@
+from threading import Lock
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Sequence, Set, Tuple
+
+from orjson import loads
+from sqlalchemy import text
+
+from ..._common import db
+from .meta import AllSignalsMap, CovidcastMetaEntry
+
+
+class CovidcastMeta:
+    """
+    the parsed content of the `covidcast_meta_cache` table, indexed by (source, signal), source, time_type, and geo_type
+    """
+
+    def __init__(self, version: Optional[Tuple[int, int]], rows: List[Dict[str, Any]]):
+        self.version = version
+        self.rows = rows
+        self.by_source_signal: Dict[Tuple[str, str], List[int]] = {}
+        self.by_source: Dict[str, List[int]] = {}
+        self.by_time_type: Dict[str, List[int]] = {}
+        self.by_geo_type: Dict[str, List[int]] = {}
+        for i, row in enumerate(rows):
+            self.by_source_signal.setdefault((row["data_source"], row["signal"]), []).append(i)
+            self.by_source.setdefault(row["data_source"], []).append(i)
+            self.by_time_type.setdefault(row["time_type"], []).append(i)
+            self.by_geo_type.setdefault(row["geo_type"], []).append(i)
+        self._entries: Optional[List[CovidcastMetaEntry]] = None
+        self._entry_dicts: Optional[List[Dict[str, Any]]] = None
+        self._lock = Lock()
+
+    def filter(
+        self,
+        time_types: Optional[Sequence[str]] = None,
+        geo_types: Optional[Sequence[str]] = None,
+        source_signals: Optional[Iterable[Tuple[str, Optional[str]]]] = None,
+    ) -> Iterator[Dict[str, Any]]:
+        """
+        yields the rows matching the given filters in their original order, a signal of None or '*' matches any signal of the source
+        """
+        selected: Optional[Set[int]] = None
+
+        def restrict(index: Dict[Any, List[int]], keys: Iterable[Any]):
+            nonlocal selected
+            matches: Set[int] = set()
+            for key in keys:
+                matches.update(index.get(key, ()))
+            selected = matches if selected is None else selected & matches
+
+        if time_types:
+            restrict(self.by_time_type, time_types)
+        if geo_types:
+            restrict(self.by_geo_type, geo_types)
+        if source_signals:
+            matches: Set[int] = set()
+            for source, signal in source_signals:
+                if signal is None or signal == "*":
+                    matches.update(self.by_source.get(source, ()))
+                else:
+                    matches.update(self.by_source_signal.get((source, signal), ()))
+            selected = matches if selected is None else selected & matches
+
+        if selected is None:
+            yield from self.rows
+        else:
+            for i in sorted(selected):
+                yield self.rows[i]
+
+    def _compute_entries(self):
+        rows = list(self.filter(time_types=["day"]))
+        all_signals: AllSignalsMap = {}
+        for row in rows:
+            all_signals.setdefault(row["data_source"], set()).add(row["signal"])
+
+        out: Dict[str, CovidcastMetaEntry] = {}
+        for row in rows:
+            entry = out.setdefault(
+                f"{row['data_source']}:{row['signal']}", CovidcastMetaEntry(row["data_source"], row["signal"], row["min_time"], row["max_time"], row["max_issue"], {}, all_signals=all_signals)
+            )
+            entry.intergrate(row)
+        self._entries = list(out.values())
+        self._entry_dicts = [e.asdict() for e in self._entries]
+
+    def entries(self) -> List[Tuple[CovidcastMetaEntry, Dict[str, Any]]]:
+        """
+        the derived meta entries of the daily signals along with their dict representation, both have to be treated as read-only
+        """
+        if self._entries is None:
+            with self._lock:
+                if self._entries is None:
+                    self._compute_entries()
+        return list(zip(self._entries or [], self._entry_dicts or []))
+
+
+_cached_meta: Optional[CovidcastMeta] = None
+_load_lock = Lock()
+
+
+def get_covidcast_meta() -> Tuple[Optional[CovidcastMeta], Optional[int]]:
+    """
+    returns the parsed covidcast meta data along with its age in seconds,
+    the blob is only fetched and parsed again when the timestamp or the size of the `covidcast_meta_cache` entry changed
+    """
+    global _cached_meta
+
+    row = db.execute(text("SELECT `timestamp`, LENGTH(`epidata`) AS `size`, UNIX_TIMESTAMP(NOW()) - `timestamp` AS `age` FROM `covidcast_meta_cache` LIMIT 1")).fetchone()
+    if not row:
+        return None, None
+    version = (row["timestamp"], row["size"])
+    current = _cached_meta
+    if current is not None and current.version == version:
+        return current, row["age"]
+
+    with _load_lock:
+        current = _cached_meta
+        if current is None or current.version != version:
+            blob = db.execute(text("SELECT `timestamp`, LENGTH(`epidata`) AS `size`, `epidata` FROM `covidcast_meta_cache` LIMIT 1")).fetchone()
+            rows = loads(blob["epidata"]) if blob and blob["epidata"] else []
+            current = CovidcastMeta((blob["timestamp"], blob["size"]) if blob else None, rows or [])
+            _cached_meta = current
+    return current, row["age"]
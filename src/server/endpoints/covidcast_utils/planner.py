@@ -0,0 +1,170 @@
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Sequence, Tuple, Union
+
+from ..._params import GeoPair, SourceSignalPair, TimePair
+from ...utils import days_in_range
+from ...utils.calendar import count_weeks
+from .meta_cache import CovidcastMeta
+
+# relative cost of descending the B-tree for a new range compared to reading one more index entry of the current range
+SEEK_COST = 10.0
+
+
+@dataclass
+class PlanEstimate:
+    """
+    estimated number of index entries read and of ranges looked up when the query uses the given index (None = the
+    unique key with the time_value before the geo_value, which MySQL picks without a hint)
+    """
+
+    index: Optional[str]
+    rows: float = 0.0
+    seeks: float = 0.0
+
+    @property
+    def cost(self) -> float:
+        return self.rows + self.seeks * SEEK_COST
+
+
+def _count_time_values(time_type: str, start: int, end: int) -> int:
+    if end < start:
+        return 0
+    if time_type == "day":
+        return days_in_range((start, end))
+    try:
+        return count_weeks(start, end)
+    except ValueError:
+        # no valid epiweeks, an estimate is good enough
+        return (end // 100 - start // 100) * 52 + (end % 100 - start % 100) + 1
+
+
+def _requested_time(time_type: str, time_values: Union[bool, Sequence[Union[int, Tuple[int, int]]]], min_time: int, max_time: int) -> Tuple[int, int, int]:
+    """
+    the number of requested time values within the stored ones, the number of single values and the number of ranges
+    """
+    if isinstance(time_values, bool):
+        return (_count_time_values(time_type, min_time, max_time), 0, 1) if time_values else (0, 0, 0)
+    count, singles, ranges = 0, 0, 0
+    for v in time_values:
+        if isinstance(v, tuple):
+            n = _count_time_values(time_type, max(v[0], min_time), min(v[1], max_time))
+            if n > 0:
+                count += n
+                ranges += 1
+        elif min_time <= v <= max_time:
+            count += 1
+            singles += 1
+    return count, singles, ranges
+
+
+def _source_signals(source_signal_pairs: Sequence[SourceSignalPair]) -> List[Tuple[str, Optional[str]]]:
+    # None = any signal of the source
+    source_signals: List[Tuple[str, Optional[str]]] = []
+    for pair in source_signal_pairs:
+        if pair.signal is True:
+            source_signals.append((pair.source, None))
+        elif pair.signal:
+            source_signals.extend((pair.source, signal) for signal in pair.signal)
+    return source_signals
+
+
+def _signal_stats(
+    meta: CovidcastMeta, source_signals: List[Tuple[str, Optional[str]]], geo_pairs: Sequence[GeoPair], time_pairs: Sequence[TimePair]
+) -> Dict[Tuple[str, str, str, str], Dict[str, Any]]:
+    # the meta data of each requested (source, signal, time_type, geo_type)
+    geo_types = list({pair.geo_type for pair in geo_pairs})
+    time_types = list({pair.time_type for pair in time_pairs})
+    return {(row["data_source"], row["signal"], row["time_type"], row["geo_type"]): row for row in meta.filter(time_types, geo_types, source_signals)}
+
+
+def estimate_rows(
+    meta: CovidcastMeta,
+    source_signal_pairs: Sequence[SourceSignalPair],
+    geo_pairs: Sequence[GeoPair],
+    time_pairs: Sequence[TimePair],
+    issues: Optional[Sequence[Union[Tuple[int, int], int]]] = None,
+) -> float:
+    """
+    estimates the number of rows a request matches as signals x locations x time values (x issues), wildcards are
+    resolved by the signals of the source, the number of locations and the time span of each signal.
+    Combinations without meta data are expected to have no rows
+    """
+    versions = sum(1 if isinstance(issue, int) else days_in_range(issue) for issue in issues) if issues else 1
+    rows = 0.0
+    for (_, _, time_type, geo_type), row in _signal_stats(meta, _source_signals(source_signal_pairs), geo_pairs, time_pairs).items():
+        min_time, max_time = row.get("min_time"), row.get("max_time")
+        if min_time is None or max_time is None:
+            continue
+        times = sum(_requested_time(time_type, pair.time_values, min_time, max_time)[0] for pair in time_pairs if pair.time_type == time_type)
+        num_locations = float(row.get("num_locations") or 0)
+        geos = sum(num_locations if pair.geo_values is True else min(float(len(pair.geo_values or ())), num_locations) for pair in geo_pairs if pair.geo_type == geo_type)
+        rows += times * geos * versions
+    return rows
+
+
+def estimate_plans(
+    meta: CovidcastMeta,
+    source_signal_pairs: Sequence[SourceSignalPair],
+    geo_pairs: Sequence[GeoPair],
+    time_pairs: Sequence[TimePair],
+    geo_first_index: str = "by_issue",
+) -> Optional[List[PlanEstimate]]:
+    """
+    estimates the cost of the unique key and of the given geo first index from the number of locations and the time
+    span of each requested (source, signal, time_type, geo_type), or None if there are no statistics for one of them
+    """
+    time_first = PlanEstimate(None)
+    geo_first = PlanEstimate(geo_first_index)
+
+    geo_types = {pair.geo_type for pair in geo_pairs}
+    time_types = {pair.time_type for pair in time_pairs}
+    source_signals = _source_signals(source_signal_pairs)
+    stats = _signal_stats(meta, source_signals, geo_pairs, time_pairs)
+    # every requested signal needs statistics
+    for source, signal in source_signals:
+        if signal is None:
+            if source not in meta.by_source:
+                return None
+            continue
+        for time_type in time_types:
+            for geo_type in geo_types:
+                if (source, signal, time_type, geo_type) not in stats:
+                    return None
+
+    for (_, _, time_type, geo_type), row in stats.items():
+        num_locations = float(row.get("num_locations") or 0)
+        min_time, max_time = row.get("min_time"), row.get("max_time")
+        if num_locations <= 0 or min_time is None or max_time is None:
+            return None
+        all_times = _count_time_values(time_type, min_time, max_time)
+        for time_pair in time_pairs:
+            if time_pair.time_type != time_type:
+                continue
+            times, singles, ranges = _requested_time(time_type, time_pair.time_values, min_time, max_time)
+            if times == 0:
+                continue
+            for geo_pair in geo_pairs:
+                if geo_pair.geo_type != geo_type or not geo_pair.geo_values:
+                    continue
+                if geo_pair.geo_values is True:
+                    # any location: the time filter only narrows the unique key
+                    time_first.rows += times * num_locations
+                    time_first.seeks += singles + ranges
+                    geo_first.rows += all_times * num_locations
+                    geo_first.seeks += 1
+                    continue
+                geos = min(float(len(geo_pair.geo_values)), num_locations)
+                # single days are combined with each location to a point lookup, a range reads all locations
+                time_first.rows += singles * geos + (times - singles) * num_locations
+                time_first.seeks += singles * geos + ranges
+                geo_first.rows += geos * times
+                geo_first.seeks += geos * (singles + ranges)
+    return [time_first, geo_first]
+
+
+def best_index(plans: Sequence[PlanEstimate]) -> Optional[str]:
+    """
+    the index hint of the cheapest plan, no hint on a tie with the unique key
+    """
+    best = min(plans, key=lambda plan: (plan.cost, plan.index is not None))
+    return best.index
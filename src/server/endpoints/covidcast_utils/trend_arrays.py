@@ -0,0 +1,203 @@
+"""
+columnar computation of the trends of many time series at once, e.g. of all counties of a signal.
+
+The rows of all series are loaded into typed arrays and the series are the segments of rows sharing the same key. The
+trends are computed for all segments in bulk and give the same results as computing them series by series, except that
+missing values are skipped when looking for the min and max value.
+"""
+from dataclasses import fields
+from itertools import islice
+from typing import Any, Dict, Iterable, Iterator, List, NamedTuple, Optional, Sequence
+
+import numpy as np
+
+from ...utils import calendar, shift_time_value
+from .trend import Trend, TrendEnum
+
+TREND_FIELDS = [f.name for f in fields(Trend)]
+KEY_FIELDS = ("geo_type", "geo_value", "source", "signal")
+# the trend fields of the key fields
+_TREND_KEY_FIELDS = ("geo_type", "geo_value", "signal_source", "signal_signal")
+
+_FETCH_BATCH_SIZE = 10_000
+
+# codes of the trend classes
+_UNKNOWN, _INCREASING, _DECREASING, _STEADY = range(4)
+_CLASSES = np.array([TrendEnum.unknown, TrendEnum.increasing, TrendEnum.decreasing, TrendEnum.steady], dtype=object)
+
+# the time values are below this factor, such that segment * factor + time is a sorted key of all rows
+_TIME_FACTOR = 100_000_000
+
+
+class SeriesArrays(NamedTuple):
+    """
+    the rows of multiple time series, ordered by their key and time value
+    """
+
+    keys: Sequence[np.ndarray]
+    time_value: np.ndarray
+    value: np.ndarray
+    # the first row of each series
+    starts: np.ndarray
+
+    @property
+    def segment(self) -> np.ndarray:
+        """
+        the index of the series of each row
+        """
+        return np.repeat(np.arange(len(self.starts)), np.diff(np.append(self.starts, len(self.time_value))))
+
+
+def fetch_series(rows: Any, key_fields: Sequence[str] = KEY_FIELDS, time_field: str = "time_value", value_field: str = "value") -> SeriesArrays:
+    """
+    loads the query result, which has to be ordered by the key fields and time value, into arrays
+    """
+    names = list(rows.keys())
+    indices = [names.index(f) for f in key_fields] + [names.index(time_field), names.index(value_field)]
+    columns: List[List[Any]] = [[] for _ in indices]
+    it = iter(rows)
+    while True:
+        batch = list(islice(it, _FETCH_BATCH_SIZE))
+        if not batch:
+            break
+        batch_columns = list(zip(*batch))
+        for column, i in zip(columns, indices):
+            column.extend(batch_columns[i])
+    # None values become NaN
+    return series_arrays([np.array(column, dtype=object) for column in columns[: len(key_fields)]], np.array(columns[-2], dtype=np.int64), np.array(columns[-1], dtype=np.float64))
+
+
+def series_arrays(keys: Sequence[np.ndarray], time_value: np.ndarray, value: np.ndarray) -> SeriesArrays:
+    """
+    the series of the given rows, which have to be ordered by their keys and time value
+    """
+    # a new series starts whenever any key field changes
+    changed = np.zeros(len(time_value), dtype=bool)
+    changed[:1] = True
+    for key in keys:
+        changed[1:] |= key[1:] != key[:-1]
+    return SeriesArrays(keys, time_value, value, np.flatnonzero(changed))
+
+
+def _shift_days(time_value: np.ndarray, days: int) -> np.ndarray:
+    try:
+        return calendar.shift_days(time_value, days)
+    except ValueError:
+        # outside of the precomputed calendar
+        return np.array([shift_time_value(t, days) for t in time_value.tolist()], dtype=np.int64)
+
+
+def trend_class_codes(current: np.ndarray, basis: np.ndarray, min_value: np.ndarray) -> np.ndarray:
+    """
+    the vectorized `compute_trend_class(compute_trend_value(current, basis, min_value))` as class codes
+    """
+    normalized_basis = basis - min_value
+    normalized_current = current - min_value
+    with np.errstate(divide="ignore", invalid="ignore"):
+        trend_value = np.where(normalized_basis == normalized_current, 0.0, np.where(normalized_basis == 0, 1.0, normalized_current / normalized_basis - 1))
+    return np.where(trend_value >= 0.1, _INCREASING, np.where(trend_value <= -0.1, _DECREASING, _STEADY))
+
+
+def _segment_extremes(series: SeriesArrays, segment: np.ndarray, reduce: np.ufunc) -> np.ndarray:
+    # the first row of each series holding its min / max value, len(rows) if all values are missing
+    extremes = reduce.reduceat(series.value, series.starts)
+    rows = np.arange(len(series.value))
+    return np.minimum.reduceat(np.where(series.value == extremes[segment], rows, len(rows)), series.starts)
+
+
+def _take(values: np.ndarray, rows: np.ndarray) -> np.ndarray:
+    # the values of the given rows, NaN for the rows that are out of bounds
+    found = (rows >= 0) & (rows < len(values))
+    return np.where(found, values[np.where(found, rows, 0)], np.nan)
+
+
+def _classes(codes: np.ndarray, mask: np.ndarray) -> np.ndarray:
+    return _CLASSES[np.where(mask, codes, _UNKNOWN)]
+
+
+def _with_trends(columns: Dict[str, Any]) -> Dict[str, Any]:
+    value, basis_value, min_value, max_value = columns["value"], columns["basis_value"], columns["min_value"], columns["max_value"]
+    valid = ~np.isnan(value) & ~np.isnan(min_value)
+    columns["basis_trend"] = _classes(trend_class_codes(value, basis_value, min_value), valid & (basis_value != 0) & ~np.isnan(basis_value))
+    columns["min_trend"] = _classes(trend_class_codes(value, min_value, min_value), valid)
+    columns["max_trend"] = _classes(trend_class_codes(value, max_value, min_value), valid & (max_value != 0))
+    return columns
+
+
+def _empty_columns() -> Dict[str, Any]:
+    return {f: np.array([], dtype=object) for f in TREND_FIELDS}
+
+
+def compute_trend_columns(series: SeriesArrays, current_time: int, basis_time: int) -> Dict[str, Any]:
+    """
+    the columns of the trend of each series at the current time
+    """
+    if len(series.starts) == 0:
+        return _empty_columns()
+    segment = series.segment
+    rows = np.arange(len(series.time_value))
+    num_series = len(series.starts)
+    min_rows = _segment_extremes(series, segment, np.fmin)
+    max_rows = _segment_extremes(series, segment, np.fmax)
+    # the last row of each series at the current and basis time, -1 if there is none
+    current_rows = np.maximum.reduceat(np.where(series.time_value == current_time, rows, -1), series.starts)
+    basis_rows = np.maximum.reduceat(np.where(series.time_value == basis_time, rows, -1), series.starts)
+
+    columns: Dict[str, Any] = {f: key[series.starts] for f, key in zip(_TREND_KEY_FIELDS, series.keys)}
+    columns["date"] = np.full(num_series, current_time, dtype=np.int64)
+    columns["value"] = _take(series.value, current_rows)
+    columns["basis_date"] = np.full(num_series, basis_time, dtype=np.int64)
+    columns["basis_value"] = _take(series.value, basis_rows)
+    columns["min_date"] = _take(series.time_value, min_rows)
+    columns["min_value"] = _take(series.value, min_rows)
+    columns["max_date"] = _take(series.time_value, max_rows)
+    columns["max_value"] = _take(series.value, max_rows)
+    return _with_trends(columns)
+
+
+def compute_trends_columns(series: SeriesArrays, basis_shift: int) -> Dict[str, Any]:
+    """
+    the columns of the trend of each series at each of its time values compared to `basis_shift` days before
+    """
+    if len(series.starts) == 0:
+        return _empty_columns()
+    segment = series.segment
+    min_rows = _segment_extremes(series, segment, np.fmin)[segment]
+    max_rows = _segment_extremes(series, segment, np.fmax)[segment]
+    # look up the basis time of each row within its series
+    row_keys = segment * _TIME_FACTOR + series.time_value
+    basis_time = _shift_days(series.time_value, -basis_shift)
+    basis_keys = segment * _TIME_FACTOR + basis_time
+    basis_rows = np.searchsorted(row_keys, basis_keys)
+    basis_rows[row_keys[np.minimum(basis_rows, len(row_keys) - 1)] != basis_keys] = -1
+
+    columns: Dict[str, Any] = dict(zip(_TREND_KEY_FIELDS, series.keys))
+    columns["date"] = series.time_value
+    columns["value"] = series.value
+    columns["basis_value"] = _take(series.value, basis_rows)
+    columns["basis_date"] = np.where(np.isnan(columns["basis_value"]), np.nan, basis_time)
+    columns["min_date"] = _take(series.time_value, min_rows)
+    columns["min_value"] = _take(series.value, min_rows)
+    columns["max_date"] = _take(series.time_value, max_rows)
+    columns["max_value"] = _take(series.value, max_rows)
+    return _with_trends(columns)
+
+
+def _to_list(column: np.ndarray, is_date: bool) -> List[Any]:
+    # the Python values of the column, None for the missing ones
+    if column.dtype.kind != "f":
+        return column.tolist()
+    missing = np.isnan(column)
+    values = (np.where(missing, 0, column).astype(np.int64) if is_date else column).astype(object)
+    values[missing] = None
+    return values.tolist()
+
+
+def trend_rows(columns: Dict[str, Any], fields: Optional[Sequence[str]] = None) -> Iterator[Dict[str, Any]]:
+    """
+    the rows of the given (default = all) fields of the trend columns
+    """
+    names = list(fields) if fields is not None else TREND_FIELDS
+    values: Iterable[List[Any]] = [_to_list(columns[f], f.endswith("date")) for f in names]
+    for row in zip(*values):
+        yield dict(zip(names, row))
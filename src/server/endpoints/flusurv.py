@@ -1,6 +1,6 @@
 from flask import Blueprint
 
-from .._query import execute_query, QueryBuilder
+from .._query import execute_query, select_fields, QueryBuilder
 from .._validate import extract_integer, extract_integers, extract_strings, require_all
 
 bp = Blueprint("flusurv", __name__)
@@ -28,7 +28,7 @@ def handle():
         "rate_age_4",
         "rate_overall",
     ]
-    q.set_fields(fields_string, fields_int, fields_float)
+    q.set_fields(*select_fields(fields_string, fields_int, fields_float))
     q.set_order("epiweek", "location", "issue")
 
     q.where_integers("epiweek", epiweeks)
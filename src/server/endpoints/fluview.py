@@ -2,8 +2,9 @@ from typing import Any, Dict, List
 
 from flask import Blueprint
 
+from .._cache import cached, max_issue_version
 from .._config import AUTH
-from .._query import execute_queries, filter_integers, filter_strings
+from .._query import execute_queries, filter_integers, filter_strings, select_expressions
 from .._validate import (
     check_auth_token,
     extract_integer,
@@ -16,8 +17,11 @@ from .._validate import (
 bp = Blueprint("fluview", __name__)
 alias = None
 
+fluview_version = max_issue_version("fluview", "fluview_imputed")
+
 
 @bp.route("/", methods=("GET", "POST"))
+@cached(fluview_version)
 def handle():
     authorized = check_auth_token(AUTH["fluview"], optional=True)
 
@@ -63,7 +67,7 @@ def handle():
 
         return query, params
 
-    queries.append(get_fluview_by_table(table, fields, regions))
+    queries.append(get_fluview_by_table(table, select_expressions(fields), regions))
     if not authorized:
         # Make a special exception for New York. It is a (weighted) sum of two
         # constituent locations -- "ny_minus_jfk" and "jfk" -- both of which are
@@ -76,7 +80,7 @@ def handle():
         # private data (no release date, no age groups, and wili is equal to ili)
         table = "`fluview_imputed` fv"
         fields = "NULL `release_date`, fv.`issue`, fv.`epiweek`, fv.`region`, fv.`lag`, fv.`num_ili`, fv.`num_patients`, fv.`num_providers`, fv.`ili` `wili`, fv.`ili`, NULL `num_age_0`, NULL `num_age_1`, NULL `num_age_2`, NULL `num_age_3`, NULL `num_age_4`, NULL `num_age_5`"
-        queries.append(get_fluview_by_table(table, fields, regions))
+        queries.append(get_fluview_by_table(table, select_expressions(fields), regions))
 
     fields_string = ["release_date", "region"]
     fields_int = [
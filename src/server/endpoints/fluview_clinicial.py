@@ -1,6 +1,6 @@
 from flask import Blueprint
 
-from .._query import execute_query, QueryBuilder
+from .._query import execute_query, select_fields, QueryBuilder
 from .._validate import extract_integer, extract_integers, extract_strings, require_all
 
 bp = Blueprint("fluview_clinical", __name__)
@@ -21,7 +21,7 @@ def handle():
     fields_string = ["release_date", "region"]
     fields_int = ["issue", "epiweek", "lag", "total_specimens", "total_a", "total_b"]
     fields_float = ["percent_positive", "percent_a", "percent_b"]
-    q.set_fields(fields_string, fields_int, fields_float)
+    q.set_fields(*select_fields(fields_string, fields_int, fields_float))
     q.set_order("epiweek", "region", "issue")
 
     q.where_integers("epiweek", epiweeks)
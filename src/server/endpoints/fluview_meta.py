@@ -1,7 +1,9 @@
 from flask import Blueprint
 
+from .._cache import cached
 from .._printer import create_printer
 from .._query import filter_fields, parse_result
+from .fluview import fluview_version
 
 # first argument is the endpoint name
 bp = Blueprint("fluview_meta", __name__)
@@ -16,6 +18,7 @@ def meta_fluview():
 
 
 @bp.route("/", methods=("GET", "POST"))
+@cached(fluview_version)
 def handle():
     # query and return metadata
 
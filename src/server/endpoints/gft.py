@@ -1,6 +1,6 @@
 from flask import Blueprint
 
-from .._query import execute_query, QueryBuilder
+from .._query import execute_query, select_fields, QueryBuilder
 from .._validate import extract_integers, extract_strings, require_all
 
 # first argument is the endpoint name
@@ -21,7 +21,7 @@ def handle():
     fields_string = ["location"]
     fields_int = ["epiweek", "num"]
     fields_float = []
-    q.set_fields(fields_string, fields_int, fields_float)
+    q.set_fields(*select_fields(fields_string, fields_int, fields_float))
     q.set_order("epiweek", "location")
 
     # build the filter
@@ -1,6 +1,6 @@
 from flask import Blueprint
 
-from .._query import execute_query, QueryBuilder
+from .._query import execute_query, select_fields, QueryBuilder
 from .._validate import extract_integer, extract_integers, extract_strings, require_all
 
 # first argument is the endpoint name
@@ -22,7 +22,7 @@ def handle():
     fields_string = ["release_date", "region"]
     fields_int = ["issue", "epiweek", "lag"]
     fields_float = ["ili"]
-    q.set_fields(fields_string, fields_int, fields_float)
+    q.set_fields(*select_fields(fields_string, fields_int, fields_float))
 
     q.set_order("epiweek", "region", "issue")
     # build the filter
@@ -0,0 +1,173 @@
+"""
+the routes of all endpoint modules, such that they can be registered without importing the modules.
+The MANIFEST is generated by running this module and verified by the tests
+"""
+from importlib import import_module
+from typing import List, NamedTuple, Optional, Tuple
+
+
+class Route(NamedTuple):
+    rule: str
+    methods: Tuple[str, ...]
+    function: str
+
+
+class EndpointEntry(NamedTuple):
+    module: str
+    name: str
+    alias: Optional[str]
+    routes: Tuple[Route, ...]
+
+
+# fmt: off
+MANIFEST: Tuple[EndpointEntry, ...] = (
+    EndpointEntry('afhsb', 'afhsb', None, (
+        Route('/', ('GET', 'POST'), 'handle'),
+    )),
+    EndpointEntry('cdc', 'cdc', None, (
+        Route('/', ('GET', 'POST'), 'handle'),
+    )),
+    EndpointEntry('covid_hosp_facility_lookup', 'covid_hosp_facility_lookup', None, (
+        Route('/', ('GET', 'POST'), 'handle'),
+    )),
+    EndpointEntry('covid_hosp_facility', 'covid_hosp_facility', None, (
+        Route('/', ('GET', 'POST'), 'handle'),
+    )),
+    EndpointEntry('covid_hosp_state_timeseries', 'covid_hosp_state_timeseries', 'covid_hosp', (
+        Route('/', ('GET', 'POST'), 'handle'),
+    )),
+    EndpointEntry('covidcast_nowcast', 'covidcast_nowcast', None, (
+        Route('/', ('GET', 'POST'), 'handle'),
+    )),
+    EndpointEntry('covidcast_meta', 'covidcast_meta', None, (
+        Route('/', ('GET', 'POST'), 'handle'),
+    )),
+    EndpointEntry('covidcast', 'covidcast', None, (
+        Route('/trendseries', ('GET', 'POST'), 'handle_trendseries'),
+        Route('/correlation', ('GET', 'POST'), 'handle_correlation'),
+        Route('/anomalies', ('GET', 'POST'), 'handle_anomalies'),
+        Route('/backfill', ('GET', 'POST'), 'handle_backfill'),
+        Route('/coverage', ('GET', 'POST'), 'handle_coverage'),
+        Route('/trend', ('GET', 'POST'), 'handle_trend'),
+        Route('/meta', ('GET', 'POST'), 'handle_meta'),
+        Route('/csv', ('GET', 'POST'), 'handle_export'),
+        Route('/', ('GET', 'POST'), 'handle'),
+    )),
+    EndpointEntry('delphi', 'delphi', None, (
+        Route('/', ('GET', 'POST'), 'handle'),
+    )),
+    EndpointEntry('dengue_nowcast', 'dengue_nowcast', None, (
+        Route('/', ('GET', 'POST'), 'handle'),
+    )),
+    EndpointEntry('dengue_sensors', 'dengue_sensors', None, (
+        Route('/', ('GET', 'POST'), 'handle'),
+    )),
+    EndpointEntry('ecdc_ili', 'ecdc_ili', None, (
+        Route('/', ('GET', 'POST'), 'handle'),
+    )),
+    EndpointEntry('flusurv', 'flusurv', None, (
+        Route('/', ('GET', 'POST'), 'handle'),
+    )),
+    EndpointEntry('fluview_clinicial', 'fluview_clinical', None, (
+        Route('/', ('GET', 'POST'), 'handle'),
+    )),
+    EndpointEntry('fluview_meta', 'fluview_meta', None, (
+        Route('/', ('GET', 'POST'), 'handle'),
+    )),
+    EndpointEntry('fluview', 'fluview', None, (
+        Route('/', ('GET', 'POST'), 'handle'),
+    )),
+    EndpointEntry('gft', 'gft', None, (
+        Route('/', ('GET', 'POST'), 'handle'),
+    )),
+    EndpointEntry('ght', 'ght', None, (
+        Route('/', ('GET', 'POST'), 'handle'),
+    )),
+    EndpointEntry('ilinet', 'ilinet', 'stateili', (
+        Route('/', ('GET', 'POST'), 'handle'),
+    )),
+    EndpointEntry('kcdc_ili', 'kcdc_ili', None, (
+        Route('/', ('GET', 'POST'), 'handle'),
+    )),
+    EndpointEntry('meta_afhsb', 'meta_afhsb', None, (
+        Route('/', ('GET', 'POST'), 'handle'),
+    )),
+    EndpointEntry('meta_norostat', 'meta_norostat', None, (
+        Route('/', ('GET', 'POST'), 'handle'),
+    )),
+    EndpointEntry('meta', 'meta', None, (
+        Route('/', ('GET', 'POST'), 'handle'),
+    )),
+    EndpointEntry('nidss_dengue', 'nidss_dengue', None, (
+        Route('/', ('GET', 'POST'), 'handle'),
+    )),
+    EndpointEntry('nidss_flu', 'nidss_flu', None, (
+        Route('/', ('GET', 'POST'), 'handle'),
+    )),
+    EndpointEntry('norostat', 'norostat', None, (
+        Route('/', ('GET', 'POST'), 'handle'),
+    )),
+    EndpointEntry('nowcast', 'nowcast', None, (
+        Route('/', ('GET', 'POST'), 'handle'),
+    )),
+    EndpointEntry('paho_dengue', 'paho_dengue', None, (
+        Route('/', ('GET', 'POST'), 'handle'),
+    )),
+    EndpointEntry('quidel', 'quidel', None, (
+        Route('/', ('GET', 'POST'), 'handle'),
+    )),
+    EndpointEntry('sensors', 'sensors', 'signals', (
+        Route('/', ('GET', 'POST'), 'handle'),
+    )),
+    EndpointEntry('twitter', 'twitter', None, (
+        Route('/', ('GET', 'POST'), 'handle'),
+    )),
+    EndpointEntry('wiki', 'wiki', None, (
+        Route('/', ('GET', 'POST'), 'handle'),
+    )),
+    EndpointEntry('signal_dashboard_status', 'signal_dashboard_status', None, (
+        Route('/', ('GET', 'POST'), 'handle'),
+    )),
+    EndpointEntry('signal_dashboard_coverage', 'signal_dashboard_coverage', None, (
+        Route('/', ('GET', 'POST'), 'handle'),
+    )),
+)
+# fmt: on
+
+
+def build_manifest(modules: List[str]) -> Tuple[EndpointEntry, ...]:
+    """
+    imports the given endpoint modules and extracts the routes of their blueprints
+    """
+    from flask import Flask
+
+    entries: List[EndpointEntry] = []
+    for module_name in modules:
+        module = import_module(f"{__package__}.{module_name}")
+        app = Flask(module_name)
+        app.register_blueprint(module.bp, url_prefix="")
+        routes: List[Route] = []
+        for rule in app.url_map.iter_rules():
+            if not rule.endpoint.startswith(f"{module.bp.name}."):
+                continue
+            function = rule.endpoint[len(module.bp.name) + 1 :]
+            assert getattr(module, function) is app.view_functions[rule.endpoint], f"{module_name}.{function} is not the view function"
+            methods = tuple(sorted(m for m in rule.methods if m not in ("HEAD", "OPTIONS")))
+            routes.append(Route(rule.rule, methods, function))
+        entries.append(EndpointEntry(module_name, module.bp.name, getattr(module, "alias", None), tuple(routes)))
+    return tuple(entries)
+
+
+def render_manifest(entries: Tuple[EndpointEntry, ...]) -> str:
+    lines = ["MANIFEST: Tuple[EndpointEntry, ...] = ("]
+    for entry in entries:
+        lines.append(f"    EndpointEntry({entry.module!r}, {entry.name!r}, {entry.alias!r}, (")
+        for route in entry.routes:
+            lines.append(f"        Route({route.rule!r}, {route.methods!r}, {route.function!r}),")
+        lines.append("    )),")
+    lines.append(")")
+    return "\n".join(lines)
+
+
+if __name__ == "__main__":
+    print(render_manifest(build_manifest([entry.module for entry in MANIFEST])))
@@ -1,7 +1,7 @@
 from flask import Blueprint
 
 from .._config import AUTH
-from .._query import execute_query, QueryBuilder
+from .._query import execute_query, select_fields, QueryBuilder
 from .._validate import check_auth_token, extract_integers, extract_strings, require_all
 
 # first argument is the endpoint name
@@ -23,7 +23,7 @@ def handle():
     fields_string = ["location"]
     fields_int = ["epiweek"]
     fields_float = ["value"]
-    q.set_fields(fields_string, fields_int, fields_float)
+    q.set_fields(*select_fields(fields_string, fields_int, fields_float))
 
     q.set_order(epiweek=True, location=True)
 
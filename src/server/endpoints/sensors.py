@@ -7,7 +7,7 @@ from .._validate import (
     extract_integers,
     resolve_auth_token,
 )
-from .._query import filter_strings, execute_query, filter_integers
+from .._query import filter_strings, execute_query, filter_integers, select_expressions
 from .._exceptions import EpiDataException
 from typing import List
 
@@ -112,7 +112,7 @@ def handle():
 
     # build query
     table = "`sensors` s"
-    fields = "s.`name`, s.`location`, s.`epiweek`, s.`value`"
+    fields = select_expressions("s.`name`, s.`location`, s.`epiweek`, s.`value`")
     # basic query info
     order = "s.`epiweek` ASC, s.`name` ASC, s.`location` ASC"
     # build the filter
@@ -1,7 +1,7 @@
 from flask import Blueprint, request
 
 from .._config import AUTH, NATION_REGION, REGION_TO_STATE
-from .._query import execute_queries, filter_dates, filter_integers, filter_strings
+from .._query import execute_queries, filter_dates, filter_integers, filter_strings, select_expressions
 from .._validate import (
     check_auth_token,
     extract_integers,
@@ -48,7 +48,7 @@ def handle():
         condition_date = filter_integers(date_field, dates, "epiweek", params)
         fields_int.append(date_name)
 
-    fields = f"{date_field} `{date_name}`, sum(t.`num`) `num`, sum(t.`total`) `total`, round(100 * sum(t.`num`) / sum(t.`total`), 8) `percent`"
+    fields = select_expressions(f"{date_field} `{date_name}`, sum(t.`num`) `num`, sum(t.`total`) `total`, round(100 * sum(t.`num`) / sum(t.`total`), 8) `percent`")
 
     # for consistency (some rows have low `total`, or `num` > `total`), filter out 2% of rows with highest `percent`
     condition_filter = "t.`num` / t.`total` <= 0.019"
@@ -1,6 +1,6 @@
 from flask import Blueprint, request
 
-from .._query import execute_query, filter_dates, filter_integers, filter_strings
+from .._query import execute_query, filter_dates, filter_integers, filter_strings, select_expressions
 from .._validate import extract_integers, extract_strings, require_all, require_any
 
 # first argument is the endpoint name
@@ -46,7 +46,7 @@ def handle():
         condition_date = filter_integers(date_field, dates, "date", params)
         fields_int.append(date_name)
 
-    fields = f"{date_field} `{date_name}`, w.`article`, sum(w.`count`) `count`, sum(m.`total`) `total`, round(sum(w.`count`) / (sum(m.`total`) * 1e-6), 8) `value`"
+    fields = select_expressions(f"{date_field} `{date_name}`, w.`article`, sum(w.`count`) `count`, sum(m.`total`) `total`, round(sum(w.`count`) / (sum(m.`total`) * 1e-6), 8) `value`")
     # build the article filter
     condition_article = filter_strings("w.`article`", articles, "article", params)
     if hours:
@@ -4,22 +4,33 @@ from typing import Dict, Callable
 
 from flask import request, send_file, Response, send_from_directory, jsonify
 
-from ._config import URL_PREFIX, VERSION
+from ._admission import heavy_requests
+from ._config import AUTH, ENDPOINT_WARMUP, URL_PREFIX, VERSION
 from ._common import app, set_compatibility_mode
+from ._db import pool_stats
 from ._exceptions import MissingOrWrongSourceException
-from .endpoints import endpoints
+from ._slow_query import slow_queries
+from ._telemetry import metrics, set_endpoint_label
+from ._validate import check_auth_token
+from .endpoints import LazyView, endpoints, load_all
 
 __all__ = ["app"]
 
 endpoint_map: Dict[str, Callable[[], Response]] = {}
 
 for endpoint in endpoints:
-    endpoint_map[endpoint.bp.name] = endpoint.handle
-    app.register_blueprint(endpoint.bp, url_prefix=f"{URL_PREFIX}/{endpoint.bp.name}")
+    # register the routes of the blueprint like `app.register_blueprint` does, but import the module on first use
+    prefix = f"{URL_PREFIX}/{endpoint.name}"
+    for route in endpoint.routes:
+        rule = "/".join((prefix.rstrip("/"), route.rule.lstrip("/")))
+        app.add_url_rule(rule, f"{endpoint.name}.{route.function}", LazyView(endpoint, route.function), methods=list(route.methods))
 
-    alias = getattr(endpoint, "alias", None)
-    if alias:
-        endpoint_map[alias] = endpoint.handle
+    handle = LazyView(endpoint, "handle")
+    endpoint_map[endpoint.name] = handle
+    if endpoint.alias:
+        endpoint_map[endpoint.alias] = handle
+
+load_all(ENDPOINT_WARMUP)
 
 
 @app.route(f"{URL_PREFIX}/api.php", methods=["GET", "POST"])
@@ -29,6 +40,7 @@ def handle_generic():
     endpoint = request.values.get("endpoint", request.values.get("source"))
     if not endpoint or endpoint not in endpoint_map:
         raise MissingOrWrongSourceException(endpoint_map.keys())
+    set_endpoint_label(endpoint)
     return endpoint_map[endpoint]()
 
 
@@ -44,6 +56,26 @@ def send_version():
     return jsonify(dict(version=VERSION))
 
 
+@app.route(f"{URL_PREFIX}/pool_stats")
+def send_pool_stats():
+    check_auth_token(AUTH["admin"])
+    return jsonify(pool_stats.as_dict())
+
+
+@app.route(f"{URL_PREFIX}/metrics")
+def send_metrics():
+    check_auth_token(AUTH["admin"])
+    gauges = {f"epidata_db_pool_{k}": v for k, v in pool_stats.as_dict().items()}
+    gauges.update({f"epidata_heavy_requests_{k}": v for k, v in heavy_requests.as_dict().items()})
+    return Response(metrics.render(gauges), mimetype="text/plain; version=0.0.4")
+
+
+@app.route(f"{URL_PREFIX}/slow_queries")
+def send_slow_queries():
+    check_auth_token(AUTH["admin"])
+    return jsonify(slow_queries.as_dict())
+
+
 @app.route(f"{URL_PREFIX}/lib/<path:path>")
 def send_lib_file(path: str):
     return send_from_directory(pathlib.Path(__file__).parent / "lib", path)
@@ -59,3 +91,7 @@ else:
     sqlalchemy_logger = logging.getLogger("sqlalchemy")
     sqlalchemy_logger.handlers = gunicorn_logger.handlers
     sqlalchemy_logger.setLevel(gunicorn_logger.level)
+    if not slow_queries.logger.handlers:
+        # no dedicated slow query log file
+        slow_queries.logger.handlers = gunicorn_logger.handlers
+        slow_queries.logger.setLevel(gunicorn_logger.level)
@@ -0,0 +1,224 @@
+"""
+precomputed lookup tables for day (YYYYMMDD) and epiweek (YYYYWW) arithmetic.
+
+Days are mapped to their proleptic Gregorian ordinal (`date.toordinal`) and epiweeks to a running week index, such
+that shifting and differences are plain integer arithmetic. Every function accepts a single int or a NumPy array of
+them; single values use list lookups, which are faster than NumPy for scalars.
+"""
+from datetime import date, timedelta
+from typing import List, Tuple, TypeVar, Union, cast, overload
+
+import numpy as np
+
+FIRST_YEAR = 1900
+LAST_YEAR = 2100
+
+# slots per year of the day and week keys, large enough for any month / day / week number
+_DAY_SLOTS_PER_YEAR = 12 * 31
+_WEEK_SLOTS_PER_YEAR = 54
+
+IntOrArray = TypeVar("IntOrArray", int, np.ndarray)
+
+
+def epiweek_year_start(year: int) -> date:
+    """
+    the Sunday starting the first epiweek of the given year, i.e. the week containing January 4
+    """
+    jan4 = date(year, 1, 4)
+    return jan4 - timedelta(days=(jan4.weekday() + 1) % 7)
+
+
+def _build_days() -> Tuple[List[int], List[int], int]:
+    days = np.arange(f"{FIRST_YEAR}-01-01", f"{LAST_YEAR + 1}-01-01", dtype="datetime64[D]")
+    months = days.astype("datetime64[M]")
+    year = days.astype("datetime64[Y]").astype(np.int64) + 1970
+    month = months.astype(np.int64) % 12 + 1
+    day = (days - months).astype(np.int64) + 1
+    first_ordinal = date(FIRST_YEAR, 1, 1).toordinal()
+    slot_to_ordinal = np.full((LAST_YEAR - FIRST_YEAR + 1) * _DAY_SLOTS_PER_YEAR, -1, dtype=np.int64)
+    slot_to_ordinal[(year - FIRST_YEAR) * _DAY_SLOTS_PER_YEAR + (month - 1) * 31 + day - 1] = np.arange(len(days)) + first_ordinal
+    return slot_to_ordinal.tolist(), (year * 10000 + month * 100 + day).tolist(), first_ordinal
+
+
+def _build_weeks() -> Tuple[List[int], List[int], int]:
+    slot_to_index = [-1] * ((LAST_YEAR - FIRST_YEAR + 1) * _WEEK_SLOTS_PER_YEAR)
+    weeks: List[int] = []
+    for year in range(FIRST_YEAR, LAST_YEAR + 1):
+        num_weeks = (epiweek_year_start(year + 1) - epiweek_year_start(year)).days // 7
+        for week in range(1, num_weeks + 1):
+            slot_to_index[(year - FIRST_YEAR) * _WEEK_SLOTS_PER_YEAR + week] = len(weeks)
+            weeks.append(year * 100 + week)
+    return slot_to_index, weeks, epiweek_year_start(FIRST_YEAR).toordinal()
+
+
+_DAY_SLOT_TO_ORDINAL, _DAYS, _FIRST_ORDINAL = _build_days()
+_WEEK_SLOT_TO_INDEX, _WEEKS, _FIRST_WEEK_ORDINAL = _build_weeks()
+
+_DAY_SLOT_TO_ORDINAL_ARRAY = np.array(_DAY_SLOT_TO_ORDINAL, dtype=np.int64)
+_DAYS_ARRAY = np.array(_DAYS, dtype=np.int64)
+_WEEK_SLOT_TO_INDEX_ARRAY = np.array(_WEEK_SLOT_TO_INDEX, dtype=np.int64)
+_WEEKS_ARRAY = np.array(_WEEKS, dtype=np.int64)
+
+
+def _invalid(kind: str, value) -> ValueError:
+    return ValueError(f"invalid {kind} or outside of {FIRST_YEAR}-{LAST_YEAR}: {value}")
+
+
+@overload
+def day_to_ordinal(value: int) -> int:
+    ...
+
+
+@overload
+def day_to_ordinal(value: np.ndarray) -> np.ndarray:
+    ...
+
+
+def day_to_ordinal(value: Union[int, np.ndarray]) -> Union[int, np.ndarray]:
+    """
+    converts YYYYMMDD day(s) to their ordinal, i.e. `date.toordinal()`
+    """
+    if isinstance(value, np.ndarray):
+        months, days = (value // 100) % 100, value % 100
+        slots = (value // 10000 - FIRST_YEAR) * _DAY_SLOTS_PER_YEAR + (months - 1) * 31 + days - 1
+        valid = (slots >= 0) & (slots < len(_DAY_SLOT_TO_ORDINAL)) & (months >= 1) & (months <= 12) & (days >= 1) & (days <= 31)
+        if not valid.all():
+            raise _invalid("day", value[~valid][0])
+        ordinals = _DAY_SLOT_TO_ORDINAL_ARRAY[slots]
+        if (ordinals < 0).any():
+            raise _invalid("day", value[ordinals < 0][0])
+        return ordinals
+    month, day = (value // 100) % 100, value % 100
+    slot = (value // 10000 - FIRST_YEAR) * _DAY_SLOTS_PER_YEAR + (month - 1) * 31 + day - 1
+    if not 1 <= month <= 12 or not 1 <= day <= 31 or slot < 0 or slot >= len(_DAY_SLOT_TO_ORDINAL) or _DAY_SLOT_TO_ORDINAL[slot] < 0:
+        raise _invalid("day", value)
+    return _DAY_SLOT_TO_ORDINAL[slot]
+
+
+@overload
+def ordinal_to_day(ordinal: int) -> int:
+    ...
+
+
+@overload
+def ordinal_to_day(ordinal: np.ndarray) -> np.ndarray:
+    ...
+
+
+def ordinal_to_day(ordinal: Union[int, np.ndarray]) -> Union[int, np.ndarray]:
+    """
+    converts ordinal(s) back to YYYYMMDD day(s)
+    """
+    if isinstance(ordinal, np.ndarray):
+        indices = ordinal - _FIRST_ORDINAL
+        if ((indices < 0) | (indices >= len(_DAYS))).any():
+            raise _invalid("day ordinal", ordinal[(indices < 0) | (indices >= len(_DAYS))][0])
+        return _DAYS_ARRAY[indices]
+    i = ordinal - _FIRST_ORDINAL
+    if i < 0 or i >= len(_DAYS):
+        raise _invalid("day ordinal", ordinal)
+    return _DAYS[i]
+
+
+def shift_days(value: IntOrArray, days: Union[int, np.ndarray]) -> IntOrArray:
+    """
+    shifts the YYYYMMDD day(s) by the given number of days
+    """
+    # an array of days shifts a single day to an array, which the type variable cannot express
+    return cast(IntOrArray, ordinal_to_day(day_to_ordinal(value) + days))
+
+
+def delta_days(start: IntOrArray, end: IntOrArray) -> IntOrArray:
+    """
+    the number of days from start to end, negative if end is before start
+    """
+    return day_to_ordinal(end) - day_to_ordinal(start)
+
+
+def count_days(start: IntOrArray, end: IntOrArray) -> IntOrArray:
+    """
+    the number of days in the inclusive range start to end
+    """
+    return delta_days(start, end) + 1
+
+
+@overload
+def week_to_index(value: int) -> int:
+    ...
+
+
+@overload
+def week_to_index(value: np.ndarray) -> np.ndarray:
+    ...
+
+
+def week_to_index(value: Union[int, np.ndarray]) -> Union[int, np.ndarray]:
+    """
+    converts YYYYWW epiweek(s) to a running week index
+    """
+    if isinstance(value, np.ndarray):
+        weeks = value % 100
+        slots = (value // 100 - FIRST_YEAR) * _WEEK_SLOTS_PER_YEAR + weeks
+        valid = (slots >= 0) & (slots < len(_WEEK_SLOT_TO_INDEX)) & (weeks >= 1) & (weeks <= 53)
+        if not valid.all():
+            raise _invalid("epiweek", value[~valid][0])
+        indices = _WEEK_SLOT_TO_INDEX_ARRAY[slots]
+        if (indices < 0).any():
+            raise _invalid("epiweek", value[indices < 0][0])
+        return indices
+    week = value % 100
+    slot = (value // 100 - FIRST_YEAR) * _WEEK_SLOTS_PER_YEAR + week
+    if not 1 <= week <= 53 or slot < 0 or slot >= len(_WEEK_SLOT_TO_INDEX) or _WEEK_SLOT_TO_INDEX[slot] < 0:
+        raise _invalid("epiweek", value)
+    return _WEEK_SLOT_TO_INDEX[slot]
+
+
+@overload
+def index_to_week(index: int) -> int:
+    ...
+
+
+@overload
+def index_to_week(index: np.ndarray) -> np.ndarray:
+    ...
+
+
+def index_to_week(index: Union[int, np.ndarray]) -> Union[int, np.ndarray]:
+    """
+    converts running week index(es) back to YYYYWW epiweek(s)
+    """
+    if isinstance(index, np.ndarray):
+        if ((index < 0) | (index >= len(_WEEKS))).any():
+            raise _invalid("week index", index[(index < 0) | (index >= len(_WEEKS))][0])
+        return _WEEKS_ARRAY[index]
+    if index < 0 or index >= len(_WEEKS):
+        raise _invalid("week index", index)
+    return _WEEKS[index]
+
+
+def shift_weeks(value: IntOrArray, weeks: Union[int, np.ndarray]) -> IntOrArray:
+    """
+    shifts the YYYYWW epiweek(s) by the given number of weeks
+    """
+    return cast(IntOrArray, index_to_week(week_to_index(value) + weeks))
+
+
+def delta_weeks(start: IntOrArray, end: IntOrArray) -> IntOrArray:
+    """
+    the number of weeks from start to end, negative if end is before start
+    """
+    return week_to_index(end) - week_to_index(start)
+
+
+def count_weeks(start: IntOrArray, end: IntOrArray) -> IntOrArray:
+    """
+    the number of epiweeks in the inclusive range start to end
+    """
+    return delta_weeks(start, end) + 1
+
+
+def day_to_week(value: IntOrArray) -> IntOrArray:
+    """
+    the YYYYWW epiweek(s) containing the YYYYMMDD day(s)
+    """
+    return index_to_week((day_to_ordinal(value) - _FIRST_WEEK_ORDINAL) // 7)
@@ -22,6 +22,14 @@ def time_value_to_iso(value: int) -> str:
 def shift_time_value(time_value: int, days: int) -> int:
     if days == 0:
         return time_value
+    # the calendar is imported on first use, since it depends on numpy
+    from . import calendar
+
+    try:
+        return calendar.shift_days(time_value, days)
+    except ValueError:
+        # outside of the precomputed calendar
+        pass
     d = time_value_to_date(time_value)
     shifted = d + timedelta(days=days)
     return date_to_time_value(shifted)
@@ -31,6 +39,13 @@ def days_in_range(range: Tuple[int, int]) -> int:
     """
     returns the days within this time range
     """
+    from . import calendar
+
+    try:
+        return calendar.count_days(range[0], range[1])
+    except ValueError:
+        # outside of the precomputed calendar
+        pass
 
     start = time_value_to_date(range[0])
     end = time_value_to_date(range[1])
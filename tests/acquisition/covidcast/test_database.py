@@ -2,9 +2,9 @@
 
 # standard library
 import unittest
-from unittest.mock import MagicMock
+from unittest.mock import MagicMock, patch
 
-from delphi.epidata.acquisition.covidcast.database import Database
+from delphi.epidata.acquisition.covidcast.database import Database, REVISION_PROFILE_LAGS
 
 # py3tester coverage target
 __test_target__ = 'delphi.epidata.acquisition.covidcast.database'
@@ -137,3 +137,198 @@ class UnitTests(unittest.TestCase):
     cc_rows = [MagicMock(geo_id='CA', val=1, se=0, sample_size=0)]
     result = database.insert_or_update_batch(cc_rows)
     self.assertIsNone(result)
+
+  def test_insert_or_update_batch_updates_revision_profile(self):
+    """Test that the revision profile of the inserted time units is updated for all profile lags at once."""
+
+    mock_connector = MagicMock()
+    database = Database()
+    database.connect(connector_impl=mock_connector)
+    connection = mock_connector.connect()
+    cursor = connection.cursor()
+
+    cc_rows = [MagicMock(geo_id='CA', val=1, se=0, sample_size=0)]
+    with patch('delphi.epidata.acquisition.covidcast.database.MAINTAIN_REVISION_PROFILE', True):
+      database.insert_or_update_batch(cc_rows)
+
+    profile_calls = [args for args, _ in cursor.execute.call_args_list if 'covidcast_revision_profile' in args[0]]
+    self.assertEqual(len(profile_calls), 1)
+    sql = profile_calls[0][0]
+    self.assertIn('tmp_insert_update_table', sql)
+    self.assertEqual(profile_calls[0][1], ())
+    for lag in REVISION_PROFILE_LAGS:
+      self.assertIn(f'SELECT {lag} AS `profile_lag`', sql)
+
+  def test_insert_or_update_batch_revision_profile_disabled(self):
+    """Test that the revision profile is not updated while it is not maintained."""
+
+    mock_connector = MagicMock()
+    database = Database()
+    database.connect(connector_impl=mock_connector)
+    cursor = mock_connector.connect().cursor()
+
+    cc_rows = [MagicMock(geo_id='CA', val=1, se=0, sample_size=0)]
+    with patch('delphi.epidata.acquisition.covidcast.database.MAINTAIN_REVISION_PROFILE', False):
+      database.insert_or_update_batch(cc_rows)
+
+    self.assertFalse(any('covidcast_revision_profile' in args[0] for args, _ in cursor.execute.call_args_list))
+
+  def test_insert_or_update_batch_updates_latest(self):
+    """Test that the latest issues are upserted and the flags are set from them after the history insert."""
+
+    mock_connector = MagicMock()
+    database = Database()
+    database.connect(connector_impl=mock_connector)
+    connection = mock_connector.connect()
+    cursor = connection.cursor()
+
+    cc_rows = [MagicMock(geo_id='CA', val=1, se=0, sample_size=0)]
+    with patch('delphi.epidata.acquisition.covidcast.database.MAINTAIN_LATEST', True):
+      database.insert_or_update_batch(cc_rows)
+
+    sqls = [' '.join(args[0].lower().split()) for args, _ in cursor.execute.call_args_list]
+    history = next(i for i, sql in enumerate(sqls) if sql.startswith('insert into `covidcast` '))
+    latest = next(i for i, sql in enumerate(sqls) if sql.startswith('insert into `covidcast_latest`'))
+    flags = next(i for i, sql in enumerate(sqls) if 'set c.`is_latest_issue`' in sql)
+    self.assertLess(history, latest)
+    self.assertLess(latest, flags)
+    self.assertIn('on duplicate key update', sqls[latest])
+    # the issue is updated after the columns comparing to it
+    self.assertTrue(sqls[latest].rstrip().endswith('`issue` = if(values(`issue`) >= `covidcast_latest`.`issue`, values(`issue`), `covidcast_latest`.`issue`)'))
+    # the flags replace the ones of the baseline statements
+    self.assertFalse(any('set `is_latest_issue`=' in sql for sql in sqls))
+
+  def test_insert_or_update_batch_older_issue_into_empty_latest(self):
+    """Test that an older issue inserted into a key missing from `covidcast_latest` does not become the latest one."""
+
+    mock_connector = MagicMock()
+    database = Database()
+    database.connect(connector_impl=mock_connector)
+    cursor = mock_connector.connect().cursor()
+
+    # the newer issue 20200102 of the key is only in `covidcast`, e.g. before fill_latest.py has run for the signal
+    cc_rows = [MagicMock(source='src', signal='sig', time_type='day', geo_type='state', time_value=20200101,
+                         geo_value='ca', issue=20200101, lag=0)]
+    with patch('delphi.epidata.acquisition.covidcast.database.MAINTAIN_LATEST', True):
+      database.insert_or_update_batch(cc_rows)
+
+    sqls = [' '.join(args[0].lower().split()) for args, _ in cursor.execute.call_args_list]
+    latest = next(sql for sql in sqls if sql.startswith('insert into `covidcast_latest`'))
+    # the upserted rows are the latest issues of the inserted keys in `covidcast`, not the inserted rows themselves
+    self.assertIn('max(`issue`) as `issue`', latest)
+    self.assertIn('join `covidcast` using (`source`, `signal`, `time_type`, `geo_type`, `time_value`, `geo_value`, `issue`)', latest)
+    self.assertNotIn('select `source`, `signal`, `time_type`, `geo_type`, `time_value`, `geo_value`, `value_updated_timestamp`, `value`, `stderr`, `sample_size`, `direction_updated_timestamp`, `direction`, `issue`, `lag`, `is_wip`, `missing_value`, `missing_stderr`, `missing_sample_size` from `tmp_insert_update_table`', latest)
+
+  def test_insert_or_update_batch_latest_disabled(self):
+    """Test that the flags are set from `covidcast` alone while `covidcast_latest` is not maintained."""
+
+    mock_connector = MagicMock()
+    database = Database()
+    database.connect(connector_impl=mock_connector)
+    cursor = mock_connector.connect().cursor()
+
+    cc_rows = [MagicMock(geo_id='CA', val=1, se=0, sample_size=0)]
+    with patch('delphi.epidata.acquisition.covidcast.database.MAINTAIN_LATEST', False):
+      database.insert_or_update_batch(cc_rows)
+
+    sqls = [' '.join(args[0].lower().split()) for args, _ in cursor.execute.call_args_list]
+    self.assertFalse(any('`covidcast_latest`' in sql for sql in sqls))
+    zero = next(i for i, sql in enumerate(sqls) if sql.endswith('set `is_latest_issue`=0'))
+    latest = next(i for i, sql in enumerate(sqls) if sql.endswith('set `is_latest_issue`=1'))
+    self.assertLess(zero, latest)
+    self.assertIn('max(`issue`) as `issue`', sqls[latest])
+
+  def test_fill_latest_query(self):
+    """Query to copy the latest issues of a signal looks sensible."""
+
+    mock_connector = MagicMock()
+    database = Database()
+    database.connect(connector_impl=mock_connector)
+    cursor = mock_connector.connect().cursor()
+
+    database.fill_latest('src', 'sig')
+
+    self.assertEqual(cursor.execute.call_count, 1)
+    sql, args = cursor.execute.call_args[0]
+    self.assertEqual(args, ('src', 'sig'))
+    sql = ' '.join(sql.lower().split())
+    self.assertIn('insert into `covidcast_latest`', sql)
+    self.assertIn('from `covidcast` where `source` = %s and `signal` = %s and `is_latest_issue` = 1', sql)
+    self.assertIn('on duplicate key update', sql)
+
+  def test_insert_or_update_batch_updates_next_issue(self):
+    """Test that the next issue of the inserted rows and of the rows before them is updated after the history insert."""
+
+    mock_connector = MagicMock()
+    database = Database()
+    database.connect(connector_impl=mock_connector)
+    connection = mock_connector.connect()
+    cursor = connection.cursor()
+
+    cc_rows = [MagicMock(geo_id='CA', val=1, se=0, sample_size=0)]
+    with patch('delphi.epidata.acquisition.covidcast.database.MAINTAIN_NEXT_ISSUE', True):
+      database.insert_or_update_batch(cc_rows)
+
+    sqls = [' '.join(args[0].lower().split()) for args, _ in cursor.execute.call_args_list]
+    history = next(i for i, sql in enumerate(sqls) if sql.startswith('insert into `covidcast` '))
+    next_issue = [i for i, sql in enumerate(sqls) if 'set `covidcast`.`next_issue`' in sql]
+    self.assertEqual(len(next_issue), 2)
+    self.assertLess(history, next_issue[0])
+    # the inserted rows get the first later issue, the previous rows end at the first inserted issue
+    self.assertIn('min(n.`issue`)', sqls[next_issue[0]])
+    self.assertIn('min(tmp.`issue`)', sqls[next_issue[1]])
+
+  def test_insert_or_update_batch_next_issue_disabled(self):
+    """Test that the next issues are not updated while they are not maintained."""
+
+    mock_connector = MagicMock()
+    database = Database()
+    database.connect(connector_impl=mock_connector)
+    cursor = mock_connector.connect().cursor()
+
+    cc_rows = [MagicMock(geo_id='CA', val=1, se=0, sample_size=0)]
+    with patch('delphi.epidata.acquisition.covidcast.database.MAINTAIN_NEXT_ISSUE', False):
+      database.insert_or_update_batch(cc_rows)
+
+    sqls = [' '.join(args[0].lower().split()) for args, _ in cursor.execute.call_args_list]
+    self.assertFalse(any('`next_issue`' in sql for sql in sqls))
+
+  def test_fill_next_issue(self):
+    """Fill the next issue of each time series of a signal."""
+
+    mock_connector = MagicMock()
+    database = Database()
+    database.connect(connector_impl=mock_connector)
+    cursor = mock_connector.connect().cursor()
+    cursor.__iter__.return_value = [('day', 'state', 'ca'), ('day', 'state', 'pa')]
+    cursor.fetchall.side_effect = [
+      # id, time_value, issue, next_issue
+      [(1, 20200101, 20200101, None), (2, 20200101, 20200102, None), (3, 20200102, 20200102, None)],
+      [(4, 20200101, 20200101, 20200103), (5, 20200101, 20200103, None)],
+    ]
+
+    self.assertEqual(database.fill_next_issue('src', 'sig'), 1)
+
+    self.assertEqual(cursor.executemany.call_count, 1)
+    sql, args = cursor.executemany.call_args[0]
+    self.assertIn('SET `next_issue` = %s WHERE `id` = %s', sql)
+    self.assertEqual(args, [(20200102, 1)])
+    self.assertEqual(cursor.execute.call_args[0][1], ('src', 'sig', 'day', 'state', 'pa'))
+
+  def test_fill_revision_profile_query(self):
+    """Query to fill the revision profile of a signal looks sensible."""
+
+    mock_connector = MagicMock()
+    database = Database()
+    database.connect(connector_impl=mock_connector)
+    cursor = mock_connector.connect().cursor()
+
+    database.fill_revision_profile('src', 'sig')
+
+    self.assertEqual(cursor.execute.call_count, 1)
+    sql, args = cursor.execute.call_args[0]
+    self.assertEqual(args, ('src', 'sig'))
+    sql = sql.lower()
+    self.assertIn('insert into `covidcast_revision_profile`', sql)
+    self.assertIn('`lag` <= lags.`profile_lag`', sql)
+    self.assertIn('on duplicate key update', sql)
@@ -1,8 +1,81 @@
-from typing import Tuple
+import random
+from dataclasses import dataclass
+from typing import Iterable, Tuple
 import unittest
+import numpy as np
 import pandas as pd
+from scipy.stats import linregress
 
-from delphi.epidata.server.endpoints.covidcast_utils.correlation import CorrelationResult, lag_join, compute_correlations, compute_correlation, Correlation
+from delphi.epidata.server.endpoints.covidcast_utils.correlation import (
+    CorrelationResult,
+    compute_correlation_columns,
+    compute_lagged_regressions,
+    correlation_rows,
+)
+from delphi.epidata.server.endpoints.covidcast_utils.trend_arrays import series_arrays
+
+
+@dataclass
+class Correlation:
+    r2: float
+
+    slope: float
+    """
+    y = slope * x + intercept
+    """
+    intercept: float
+    """
+    y = slope * x + intercept
+    """
+    samples: int
+    """
+    number of dates used for the regression line
+    """
+
+
+def lag_join(lag: int, x: pd.DataFrame, y: pd.DataFrame) -> pd.DataFrame:
+    # x_t_i ~ y_t_(i-lag)
+    # aka x_t_(i+lag) ~ y_t_i
+
+    if lag == 0:
+        x_shifted = x
+        y_shifted = y
+    elif lag > 0:
+        # x_t_i ~ y_shifted_t_i
+        # shift y such that y_t(i - lag) -> y_shifted_t_i
+        x_shifted = x
+        y_shifted = y.shift(lag, freq="D")
+    else:  # lag < 0
+        # x_shifted_t_i ~ y_t_i
+        # shift x such that x_t(i+lag) -> x_shifted_t_i
+        # lag < 0 -> - - lag = + lag
+        x_shifted = x.shift(-lag, freq="D")
+        y_shifted = y
+    # inner join to remove invalid pairs
+    r = x_shifted.join(y_shifted, how="inner", lsuffix="_x", rsuffix="_y")
+    return r.rename(columns=dict(value_x="x", value_y="y"))
+
+
+def compute_correlations(geo_type: str, geo_value: str, signal_source: str, signal_signal: str, lag: int, x: pd.DataFrame, y: pd.DataFrame) -> Iterable[CorrelationResult]:
+    """
+    x,y ... DataFrame with "time_value" (Date) index and "value" (float) column
+    """
+    for current_lag in range(-lag, lag + 1):
+        xy = lag_join(current_lag, x, y)
+        c = compute_correlation(xy)
+
+        yield CorrelationResult(geo_type, geo_value, signal_source, signal_signal, current_lag, r2=c.r2, intercept=c.intercept, slope=c.slope, samples=c.samples)
+
+
+def compute_correlation(xy: pd.DataFrame) -> Correlation:
+    if len(xy) < 2:
+        # won't be a useful one
+        return Correlation(0, 0, 0, len(xy))
+
+    # a single (2, 2) array would be read row-wise as x and y
+    model = linregress(xy["x"], xy["y"])
+    r2 = float(model.rvalue) ** 2
+    return Correlation(r2, float(model.slope), float(model.intercept), len(xy))
 
 
 def as_df(*tuples: Tuple[int, float]) -> pd.DataFrame:
@@ -58,6 +131,9 @@ class UnitTests(unittest.TestCase):
         with self.subTest("none"):
             xy = as_xy_df((1, 0), (2, 0), (3, 0))
             self.assertEqual(compute_correlation(xy), Correlation(r2=0, intercept=0, slope=0, samples=3))
+        with self.subTest("two samples"):
+            xy = as_xy_df((1, 12), (2, 13))
+            self.assertEqual(compute_correlation(xy), Correlation(r2=1, intercept=11, slope=1, samples=2))
 
     def test_compute_correlations(self):
         x = as_df((20201010, 1), (20201011, 2), (20201012, 3))
@@ -66,4 +142,52 @@ class UnitTests(unittest.TestCase):
         r = list(compute_correlations("gt", "gv", "so", "si", 2, x, y))
         self.assertEqual(len(r), 5)
         # lag 0
-        self.assertEqual(r[2], CorrelationResult("gt", "gv", "so", "si", 0, r2=1, intercept=10, slope=1, samples=3))
\ No newline at end of file
+        self.assertEqual(r[2], CorrelationResult("gt", "gv", "so", "si", 0, r2=1, intercept=10, slope=1, samples=3))
+
+    def test_compute_correlation_columns(self):
+        rng = random.Random(1)
+        days = [20201225 + d for d in range(7)] + [20210101 + d for d in range(20)]
+        rows = []
+        for geo in ["01000", "02000", "03000"]:
+            for source, signal in [("a", "x"), ("b", "ref"), ("c", "y")]:
+                # gaps, constant and linear parts
+                for i, day in enumerate(days):
+                    if rng.random() < 0.2:
+                        continue
+                    value = float(i) if signal == "y" and geo == "01000" else float(rng.randint(0, 50))
+                    rows.append(("county", geo, source, signal, day, value))
+        # a geo without reference and one with just the reference
+        rows.append(("county", "04000", "a", "x", 20210101, 1.0))
+        rows.append(("county", "05000", "b", "ref", 20210101, 1.0))
+        series = series_arrays(*[[np.array(c, dtype=object) for c in list(zip(*rows))[:4]], np.array([r[4] for r in rows]), np.array([r[5] for r in rows])])
+
+        expected = []
+        for geo in ["01000", "02000", "03000"]:
+            x = as_df(*[(r[4], r[5]) for r in rows if r[1] == geo and r[3] == "ref"])
+            for source, signal in [("a", "x"), ("c", "y")]:
+                y = as_df(*[(r[4], r[5]) for r in rows if r[1] == geo and r[3] == signal])
+                expected.extend(compute_correlations("county", geo, source, signal, 5, x, y))
+
+        actual = list(correlation_rows(compute_correlation_columns(series, "b", "ref", 5)))
+        self.assertEqual(len(actual), len(expected))
+        for a, e in zip(actual, expected):
+            e = e.asdict()
+            self.assertEqual({k: a[k] for k in ["geo_type", "geo_value", "signal_source", "signal_signal", "lag", "samples"]}, {k: e[k] for k in ["geo_type", "geo_value", "signal_source", "signal_signal", "lag", "samples"]})
+            for k in ["r2", "slope", "intercept"]:
+                self.assertAlmostEqual(a[k], e[k], places=8)
+
+        with self.subTest("fields"):
+            self.assertEqual(list(correlation_rows(compute_correlation_columns(series, "b", "ref", 0), ["lag", "geo_value"]))[0], dict(lag=0, geo_value="01000"))
+        with self.subTest("no reference"):
+            self.assertEqual(list(correlation_rows(compute_correlation_columns(series, "b", "none", 1))), [])
+
+    def test_compute_lagged_regressions(self):
+        nan = float("nan")
+        x = np.array([[1.0, 2.0, 3.0, 4.0], [1.0, 1.0, 1.0, 1.0]])
+        y = np.array([[11.0, 12.0, 13.0, nan], [1.0, 2.0, 3.0, 4.0]])
+        r2, slope, intercept, samples = compute_lagged_regressions(x, y, 1)
+        # lag 0 and 1 are perfect lines, constant x values don't give a regression
+        self.assertEqual(samples.tolist(), [[2, 3, 3], [3, 4, 3]])
+        self.assertEqual(r2.round(8).tolist(), [[1.0, 1.0, 1.0], [0.0, 0.0, 0.0]])
+        self.assertEqual(slope.round(8).tolist(), [[1.0, 1.0, 1.0], [0.0, 0.0, 0.0]])
+        self.assertEqual(intercept.round(8).tolist(), [[11.0, 10.0, 9.0], [3.0, 2.5, 2.0]])
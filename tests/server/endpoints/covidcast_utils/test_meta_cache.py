@@ -0,0 +1,56 @@
+import unittest
+
+from delphi.epidata.server.endpoints.covidcast_utils.meta_cache import CovidcastMeta
+
+
+def _row(source: str, signal: str, time_type: str, geo_type: str):
+    return dict(
+        data_source=source,
+        signal=signal,
+        time_type=time_type,
+        geo_type=geo_type,
+        min_time=20200101,
+        max_time=20200110,
+        max_issue=20200111,
+        min_value=0,
+        mean_value=1,
+        stdev_value=0.5,
+        max_value=2,
+    )
+
+
+ROWS = [
+    _row("src1", "smoothed_a", "day", "county"),
+    _row("src1", "smoothed_a", "day", "state"),
+    _row("src1", "raw_a", "day", "state"),
+    _row("src2", "b", "week", "state"),
+    _row("src2", "b", "day", "nation"),
+]
+
+
+class UnitTests(unittest.TestCase):
+    def test_filter(self):
+        meta = CovidcastMeta(1, ROWS)
+        with self.subTest("all"):
+            self.assertEqual(list(meta.filter()), ROWS)
+        with self.subTest("time_type"):
+            self.assertEqual(list(meta.filter(time_types=["week"])), [ROWS[3]])
+        with self.subTest("geo_type"):
+            self.assertEqual(list(meta.filter(geo_types=["state", "nation"])), ROWS[1:])
+        with self.subTest("source signal"):
+            self.assertEqual(list(meta.filter(source_signals=[("src2", "b"), ("src1", "raw_a")])), ROWS[2:])
+            self.assertEqual(list(meta.filter(source_signals=[("src1", "*")])), ROWS[:3])
+            self.assertEqual(list(meta.filter(source_signals=[("src3", "*")])), [])
+        with self.subTest("combined"):
+            self.assertEqual(list(meta.filter(time_types=["day"], geo_types=["state"], source_signals=[("src1", "*"), ("src2", "*")])), ROWS[1:3])
+
+    def test_entries(self):
+        meta = CovidcastMeta(1, ROWS)
+        entries = meta.entries()
+        self.assertEqual([e.signal for e, _ in entries], ["smoothed_a", "raw_a", "b"])
+        smoothed, smoothed_dict = entries[0]
+        self.assertEqual(set(smoothed.geo_types.keys()), {"county", "state"})
+        self.assertEqual(smoothed.related_signals, ["raw_a"])
+        self.assertEqual(smoothed_dict, smoothed.asdict())
+        # computed once
+        self.assertIs(meta.entries()[0][1], smoothed_dict)
@@ -0,0 +1,71 @@
+import unittest
+
+from delphi.epidata.server._params import GeoPair, SourceSignalPair, TimePair
+from delphi.epidata.server.endpoints.covidcast_utils.meta_cache import CovidcastMeta
+from delphi.epidata.server.endpoints.covidcast_utils.planner import PlanEstimate, best_index, estimate_plans, estimate_rows
+
+
+def _row(source: str, signal: str, time_type: str, geo_type: str, num_locations: int, min_time: int, max_time: int):
+    return dict(data_source=source, signal=signal, time_type=time_type, geo_type=geo_type, num_locations=num_locations, min_time=min_time, max_time=max_time)
+
+
+META = CovidcastMeta(
+    (1, 1),
+    [
+        # 100 days
+        _row("src", "sig", "day", "county", 3000, 20200101, 20200409),
+        _row("src", "sig", "day", "state", 50, 20200101, 20200409),
+        _row("src", "other", "day", "state", 50, 20200101, 20200409),
+        _row("src", "sig", "week", "state", 50, 202001, 202052),
+    ],
+)
+
+
+def choose(geo, time, signal=["sig"]):
+    plans = estimate_plans(META, [SourceSignalPair("src", signal)], geo, time)
+    return None if plans is None else best_index(plans)
+
+
+class UnitTests(unittest.TestCase):
+    def test_estimate_plans(self):
+        time_first, geo_first = estimate_plans(META, [SourceSignalPair("src", ["sig"])], [GeoPair("county", ["01000", "02000"])], [TimePair("day", True)])
+        self.assertEqual(time_first, PlanEstimate(None, rows=100 * 3000, seeks=1))
+        self.assertEqual(geo_first, PlanEstimate("by_issue", rows=2 * 100, seeks=2))
+
+        # requested days outside of the stored ones don't count
+        time_first, geo_first = estimate_plans(META, [SourceSignalPair("src", ["sig"])], [GeoPair("state", ["pa"])], [TimePair("day", [20191201, (20200405, 20200501)])], "by_lag")
+        self.assertEqual(time_first, PlanEstimate(None, rows=5 * 50, seeks=1))
+        self.assertEqual(geo_first, PlanEstimate("by_lag", rows=5, seeks=1))
+
+        # all signals of the source
+        time_first, _ = estimate_plans(META, [SourceSignalPair("src", True)], [GeoPair("state", True)], [TimePair("day", [20200101])])
+        self.assertEqual(time_first, PlanEstimate(None, rows=2 * 50, seeks=2))
+
+    def test_missing_statistics(self):
+        self.assertIsNone(choose([GeoPair("county", ["01000"])], [TimePair("day", True)], ["unknown"]))
+        self.assertIsNone(choose([GeoPair("hrr", ["1"])], [TimePair("day", True)]))
+        self.assertIsNone(estimate_plans(META, [SourceSignalPair("unknown", True)], [GeoPair("state", True)], [TimePair("day", True)]))
+
+    def test_best_index(self):
+        # a time series of a few locations
+        self.assertEqual(choose([GeoPair("county", ["01000", "02000"])], [TimePair("day", True)]), "by_issue")
+        # many locations of a time series, still just a fraction of all
+        self.assertEqual(choose([GeoPair("county", [f"{i:05}" for i in range(100)])], [TimePair("day", [(20200101, 20200331)])]), "by_issue")
+        # all locations
+        self.assertIsNone(choose([GeoPair("county", True)], [TimePair("day", [(20200101, 20200131)])]))
+        # a single day
+        self.assertIsNone(choose([GeoPair("state", ["pa", "ny"])], [TimePair("day", [20200101])]))
+        # almost all locations of a few days
+        self.assertIsNone(choose([GeoPair("state", [f"s{i}" for i in range(45)])], [TimePair("day", [(20200101, 20200103)])]))
+        # tie
+        self.assertIsNone(best_index([PlanEstimate(None, 10, 1), PlanEstimate("by_issue", 10, 1)]))
+
+    def test_estimate_rows(self):
+        signals = [SourceSignalPair("src", ["sig"])]
+        self.assertEqual(estimate_rows(META, signals, [GeoPair("county", True)], [TimePair("day", True)]), 3000 * 100)
+        self.assertEqual(estimate_rows(META, signals, [GeoPair("county", ["a", "b"]), GeoPair("state", True)], [TimePair("day", [(20200101, 20200110)])]), (2 + 50) * 10)
+        # all signals of the source, unknown combinations have no rows
+        self.assertEqual(estimate_rows(META, [SourceSignalPair("src", True)], [GeoPair("state", True)], [TimePair("day", [20200101]), TimePair("week", True)]), 2 * 50 + 52 * 50)
+        self.assertEqual(estimate_rows(META, [SourceSignalPair("src", ["unknown"])], [GeoPair("state", True)], [TimePair("day", True)]), 0)
+        # multiple issues
+        self.assertEqual(estimate_rows(META, signals, [GeoPair("state", ["pa"])], [TimePair("day", True)], [20200105, (20200110, 20200112)]), 100 * 4)
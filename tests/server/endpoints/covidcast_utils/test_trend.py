@@ -1,7 +1,21 @@
-from typing import Tuple
+from typing import List, Tuple
 import unittest
 
-from delphi.epidata.server.endpoints.covidcast_utils.trend import compute_trend_value, compute_trend_class, TrendEnum, compute_trend, Trend, compute_trends
+from delphi.epidata.server.endpoints.covidcast_utils.trend import compute_trend_value, compute_trend_class, TrendEnum, Trend
+from delphi.epidata.server.endpoints.covidcast_utils.trend_arrays import compute_trend_columns, compute_trends_columns, fetch_series, trend_rows
+
+
+class _Rows(list):
+    """
+    query result like rows
+    """
+
+    def keys(self):
+        return ["geo_type", "geo_value", "source", "signal", "time_value", "value"]
+
+
+def _series(rows: List[Tuple[int, float]]):
+    return fetch_series(_Rows(("gt", "gv", "so", "si", time, float(value)) for time, value in rows))
 
 
 class UnitTests(unittest.TestCase):
@@ -45,8 +59,8 @@ class UnitTests(unittest.TestCase):
 
     def test_compute_trend(self):
         self.assertEqual(
-            compute_trend("gt", "gv", "so", "si", 10, 8, [(10, 12), (8, 10), (0, 0)]),
-            Trend(
+            list(trend_rows(compute_trend_columns(_series([(0, 0), (8, 10), (10, 12)]), 10, 8))),
+            [Trend(
                 "gt",
                 "gv",
                 "so",
@@ -62,11 +76,11 @@ class UnitTests(unittest.TestCase):
                 max_date=10,
                 max_value=12,
                 max_trend=TrendEnum.steady,
-            ),
+            ).asdict()],
         )
 
     def test_compute_trends(self):
-        trends = compute_trends("gt", "gv", "so", "si", lambda x: x - 1, [(1, 12), (2, 10), (3, 0)])
+        trends = list(trend_rows(compute_trends_columns(_series([(20200101, 12), (20200102, 10), (20200103, 0)]), 1)))
         self.assertEqual(len(trends), 3)
 
         self.assertEqual(
@@ -76,18 +90,18 @@ class UnitTests(unittest.TestCase):
                 "gv",
                 "so",
                 "si",
-                date=1,
+                date=20200101,
                 value=12,
                 basis_date=None,
                 basis_value=None,
                 basis_trend=TrendEnum.unknown,
-                min_date=3,
+                min_date=20200103,
                 min_value=0,
                 min_trend=TrendEnum.increasing,
-                max_date=1,
+                max_date=20200101,
                 max_value=12,
                 max_trend=TrendEnum.steady,
-            ),
+            ).asdict(),
         )
 
         self.assertEqual(
@@ -97,18 +111,18 @@ class UnitTests(unittest.TestCase):
                 "gv",
                 "so",
                 "si",
-                date=2,
+                date=20200102,
                 value=10,
-                basis_date=1,
+                basis_date=20200101,
                 basis_value=12,
                 basis_trend=TrendEnum.decreasing,
-                min_date=3,
+                min_date=20200103,
                 min_value=0,
                 min_trend=TrendEnum.increasing,
-                max_date=1,
+                max_date=20200101,
                 max_value=12,
                 max_trend=TrendEnum.decreasing,
-            ),
+            ).asdict(),
         )
 
         self.assertEqual(
@@ -118,16 +132,16 @@ class UnitTests(unittest.TestCase):
                 "gv",
                 "so",
                 "si",
-                date=3,
+                date=20200103,
                 value=0,
-                basis_date=2,
+                basis_date=20200102,
                 basis_value=10,
                 basis_trend=TrendEnum.decreasing,
-                min_date=3,
+                min_date=20200103,
                 min_value=0,
                 min_trend=TrendEnum.steady,
-                max_date=1,
+                max_date=20200101,
                 max_value=12,
                 max_trend=TrendEnum.decreasing,
-            ),
+            ).asdict(),
         )
@@ -0,0 +1,148 @@
+import random
+import unittest
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+from delphi.epidata.server.endpoints.covidcast_utils.trend import Trend, TrendEnum, compute_trend_class, compute_trend_value
+from delphi.epidata.server.endpoints.covidcast_utils.trend_arrays import compute_trend_columns, compute_trends_columns, fetch_series, trend_rows
+from delphi.epidata.server.utils import shift_time_value
+
+
+def compute_trend(geo_type: str, geo_value: str, signal_source: str, signal_signal: str, current_time: int, basis_time: int, rows: Iterable[Tuple[int, float]]) -> Trend:
+    """
+    the trend of a single series at the current time, the reference for `compute_trend_columns`
+    """
+    t = Trend(geo_type, geo_value, signal_source, signal_signal, date=current_time, basis_date=basis_time)
+
+    # find all needed rows
+    for time, value in rows:
+        if time == current_time:
+            t.value = value
+        if time == basis_time:
+            t.basis_value = value
+        if t.min_value is None or t.min_value > value:
+            t.min_date = time
+            t.min_value = value
+        if t.max_value is None or t.max_value < value:
+            t.max_date = time
+            t.max_value = value
+
+    if t.value is None or t.min_value is None:
+        # cannot compute trend if current time is not found
+        return t
+
+    t.basis_trend = compute_trend_class(compute_trend_value(t.value, t.basis_value, t.min_value)) if t.basis_value else TrendEnum.unknown
+    t.min_trend = compute_trend_class(compute_trend_value(t.value, t.min_value, t.min_value))
+    t.max_trend = compute_trend_class(compute_trend_value(t.value, t.max_value, t.min_value)) if t.max_value else TrendEnum.unknown
+
+    return t
+
+
+def compute_trends(geo_type: str, geo_value: str, signal_source: str, signal_signal: str, shifter: Callable[[int], int], rows: Iterable[Tuple[int, float]]) -> List[Trend]:
+    """
+    the trend of a single series at each of its time values, the reference for `compute_trends_columns`
+    """
+    min_value: Optional[float] = None
+    min_date: Optional[int] = None
+    max_value: Optional[float] = None
+    max_date: Optional[int] = None
+
+    lookup: Dict[int, float] = OrderedDict()
+    # find all needed rows
+    for time, value in rows:
+        lookup[time] = value
+        if min_value is None or min_value > value:
+            min_date = time
+            min_value = value
+        if max_value is None or max_value < value:
+            max_date = time
+            max_value = value
+
+    trends: List[Trend] = []
+    for current_time, value in lookup.items():
+        basis_time = shifter(current_time)
+        basis_value = lookup.get(basis_time, None)
+        t = Trend(
+            geo_type,
+            geo_value,
+            signal_source,
+            signal_signal,
+            date=current_time,
+            value=value,
+            basis_date=basis_time if basis_value is not None else None,
+            basis_value=basis_value,
+            min_date=min_date,
+            min_value=min_value,
+            max_date=max_date,
+            max_value=max_value,
+        )
+
+        trends.append(t)
+
+        if t.value is None or t.min_value is None:
+            continue
+
+        t.basis_trend = compute_trend_class(compute_trend_value(t.value, t.basis_value, t.min_value)) if t.basis_value else TrendEnum.unknown
+        t.min_trend = compute_trend_class(compute_trend_value(t.value, t.min_value, t.min_value))
+        t.max_trend = compute_trend_class(compute_trend_value(t.value, t.max_value, t.min_value)) if t.max_value else TrendEnum.unknown
+
+    return trends
+
+
+class _Rows(list):
+    """
+    query result like rows
+    """
+
+    def keys(self):
+        return ["geo_type", "geo_value", "source", "signal", "time_value", "value"]
+
+
+def _rows(num_series: int, days: List[int], seed: int = 1) -> _Rows:
+    rng = random.Random(seed)
+    rows: List[Tuple[Any, ...]] = []
+    for i in range(num_series):
+        for day in days:
+            if rng.random() < 0.2:
+                # gaps
+                continue
+            # few distinct values for ties and zeros
+            rows.append(("county", f"{i:05}", "src", "sig", day, float(rng.randint(0, 5))))
+    return _Rows(rows)
+
+
+def _groups(rows: _Rows):
+    groups = {}
+    for row in rows:
+        groups.setdefault(row[:4], []).append((row[4], row[5]))
+    return groups.items()
+
+
+DAYS = [20201225 + d for d in range(7)] + [20210101 + d for d in range(10)]
+
+
+class UnitTests(unittest.TestCase):
+    def test_fetch_series(self):
+        series = fetch_series(_Rows([("a", "1", "s", "t", 1, 1.0), ("a", "1", "s", "t", 2, None), ("a", "2", "s", "t", 1, 3.0), ("b", "2", "s", "t", 1, 4.0)]))
+        self.assertEqual(series.starts.tolist(), [0, 2, 3])
+        self.assertEqual(series.segment.tolist(), [0, 0, 1, 2])
+        self.assertEqual(series.time_value.tolist(), [1, 2, 1, 1])
+        self.assertEqual(str(series.value.tolist()), "[1.0, nan, 3.0, 4.0]")
+        self.assertEqual(len(fetch_series(_Rows()).starts), 0)
+
+    def test_compute_trend_columns(self):
+        rows = _rows(50, DAYS)
+        expected = [compute_trend(*key, 20210105, 20201229, group).asdict() for key, group in _groups(rows)]
+        self.assertEqual(list(trend_rows(compute_trend_columns(fetch_series(rows), 20210105, 20201229))), expected)
+
+    def test_compute_trends_columns(self):
+        rows = _rows(50, DAYS)
+        expected = [t.asdict() for key, group in _groups(rows) for t in compute_trends(*key, lambda x: shift_time_value(x, -7), group)]
+        self.assertEqual(list(trend_rows(compute_trends_columns(fetch_series(rows), 7))), expected)
+
+    def test_trend_rows(self):
+        columns = compute_trend_columns(fetch_series(_rows(3, DAYS)), 20210105, 20201229)
+        rows = list(trend_rows(columns, ["value", "geo_value"]))
+        self.assertEqual([list(row) for row in rows], [["value", "geo_value"]] * 3)
+        self.assertEqual([row["geo_value"] for row in rows], ["00000", "00001", "00002"])
+        self.assertEqual(list(trend_rows(compute_trends_columns(fetch_series(_Rows()), 7))), [])
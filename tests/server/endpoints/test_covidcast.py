@@ -1,13 +1,18 @@
 # standard library
 import unittest
+from unittest.mock import patch
 
 from flask.testing import FlaskClient
+from sqlalchemy import create_engine
 from flask import Response
 from delphi.epidata.server.main import app
 
 from delphi.epidata.server.endpoints.covidcast import guess_index_to_use
+from delphi.epidata.server._query import encode_cursor
+from delphi.epidata.server.endpoints.covidcast_utils import CovidcastMeta
 from delphi.epidata.server._params import (
     GeoPair,
+    SourceSignalPair,
     TimePair,
 )
 
@@ -55,3 +60,106 @@ class UnitTests(unittest.TestCase):
         self.assertEqual(guess_index_to_use([TimePair("day", True)], [GeoPair("county", ["a"])], issues=[20200202], lag=3, as_of=None), "by_issue")
         self.assertIsNone(guess_index_to_use([TimePair("day", [20200201])], [GeoPair("county", ["a"])], issues=[20200202], lag=3, as_of=None))
         self.assertIsNone(guess_index_to_use([TimePair("day", True)], [GeoPair("county", True)], issues=None, lag=3, as_of=None))
+
+    def test_guess_index_to_use_with_meta(self):
+        meta = CovidcastMeta((1, 1), [dict(data_source="src", signal="sig", time_type="day", geo_type="county", num_locations=3000, min_time=20200101, max_time=20201231)])
+        signals = [SourceSignalPair("src", ["sig"])]
+        counties = [GeoPair("county", [f"{i:05}" for i in range(20)])]
+        # too many geo for the heuristic, yet a small fraction of the stored ones
+        self.assertIsNone(guess_index_to_use([TimePair("day", True)], counties, lag=3))
+        self.assertEqual(guess_index_to_use([TimePair("day", True)], counties, lag=3, source_signal_pairs=signals, meta=meta), "by_lag")
+        self.assertEqual(guess_index_to_use([TimePair("day", True)], counties, source_signal_pairs=signals, meta=meta), "by_issue")
+        self.assertIsNone(guess_index_to_use([TimePair("day", True)], counties, as_of=20200301, source_signal_pairs=signals, meta=meta))
+        with patch("delphi.epidata.server.endpoints.covidcast.COVIDCAST_AS_OF_NEXT_ISSUE", True):
+            self.assertEqual(guess_index_to_use([TimePair("day", True)], counties, as_of=20200301, source_signal_pairs=signals, meta=meta), "by_as_of")
+        self.assertIsNone(guess_index_to_use([TimePair("day", [20200301])], [GeoPair("county", True)], source_signal_pairs=signals, meta=meta))
+        # unknown signal: heuristic
+        self.assertEqual(guess_index_to_use([TimePair("day", True)], [GeoPair("county", ["a"])], source_signal_pairs=[SourceSignalPair("src", ["x"])], meta=meta), "by_issue")
+
+    def test_cursor_order(self):
+        order = ["source", "signal", "time_type", "time_value", "geo_type", "geo_value", "issue"]
+        cursor = ["src", "sig", "day", 20200101, "county", "01000", 20200102]
+        # the same documented order and cursor whatever index is hinted
+        for index in [None, "by_issue", "by_lag", "by_as_of"]:
+            with self.subTest(index=index), patch("delphi.epidata.server.endpoints.covidcast.guess_index_to_use", return_value=index), patch(
+                "delphi.epidata.server.endpoints.covidcast.execute_query", return_value=Response("")
+            ) as execute_query:
+                self.client.get("/covidcast/", query_string=dict(signal="src:sig", time="day:*", geo="county:*", cursor=encode_cursor(cursor)))
+                query, params = execute_query.call_args[0][:2]
+                self.assertIn("ORDER BY " + ", ".join(f"t.{f} ASC" for f in order), query)
+                self.assertEqual([params[f"cursor_{i}"] for i in range(len(order))], cursor)
+                self.assertEqual(execute_query.call_args[1]["cursor_fields"], order)
+
+    def test_backfill_profile(self):
+        conn = create_engine("sqlite://").connect()
+        columns = "source TEXT, signal TEXT, time_type TEXT, geo_type TEXT, geo_value TEXT, time_value INTEGER, issue INTEGER, lag INTEGER, value REAL, sample_size REAL"
+        conn.execute(f"CREATE TABLE covidcast ({columns})")
+        conn.execute(f"CREATE TABLE covidcast_revision_profile ({columns})")
+        key = ("src", "sig", "day", "state", "ny", 20200401)
+        # issues at lag 0, 1, and 9 (= the value of the profile lags 9 to 14)
+        conn.execute("INSERT INTO covidcast VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", [(*key, 20200401 + lag, lag, value, 10) for lag, value in [(0, 1.0), (1, 2.0), (9, 4.0)]])
+
+        def fetch(anchor_lag):
+            with patch("delphi.epidata.server._query.db", conn):
+                rv = self.client.get("/covidcast/backfill", query_string=dict(signal="src:sig", geo="state:ny", time="day:20200401", anchor_lag=anchor_lag, fields="issue,value,is_anchor,value_completeness"))
+            return rv.get_json()["epidata"]
+
+        expected = [
+            dict(issue=20200401, value=1.0, is_anchor=False, value_completeness=0.25),
+            dict(issue=20200402, value=2.0, is_anchor=False, value_completeness=0.5),
+            dict(issue=20200410, value=4.0, is_anchor=True, value_completeness=1.0),
+        ]
+        with self.subTest("full history"):
+            self.assertEqual(fetch(14), expected)
+        # profile without the issue at lag 1
+        conn.execute("INSERT INTO covidcast_revision_profile VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", [(*key, 20200401, lag, 1.0, 10) for lag in [0, 1, 2, 3, 4, 5, 6, 7]])
+        conn.execute("INSERT INTO covidcast_revision_profile VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", [(*key, 20200410, lag, 4.0, 10) for lag in [14, 21]])
+        with self.subTest("profile not enabled (default)"):
+            self.assertEqual(fetch(14), expected)
+        with patch("delphi.epidata.server.endpoints.covidcast.REVISION_PROFILE_LAGS", [0, 1, 2, 3, 4, 5, 6, 7, 14, 21]):
+            with self.subTest("profile"):
+                self.assertEqual(fetch(14), [expected[0], expected[2]])
+            with self.subTest("anchor lag outside of the profile"):
+                self.assertEqual(fetch(9), expected)
+
+    def test_latest_table(self):
+        conn = create_engine("sqlite://").connect()
+        columns = "source TEXT, signal TEXT, time_type TEXT, geo_type TEXT, geo_value TEXT, time_value INTEGER, issue INTEGER, lag INTEGER, value REAL"
+        conn.execute(f"CREATE TABLE covidcast ({columns}, is_latest_issue INTEGER)")
+        conn.execute(f"CREATE TABLE covidcast_latest ({columns})")
+        key = ("src", "sig", "day", "state", "ny", 20200401)
+        conn.execute("INSERT INTO covidcast VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", [(*key, 20200401, 0, 1.0, 0), (*key, 20200402, 1, 2.0, 1)])
+        # differs from the history to tell where the rows come from
+        conn.execute("INSERT INTO covidcast_latest VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)", [(*key, 20200402, 1, 3.0)])
+
+        def fetch(**params):
+            with patch("delphi.epidata.server._query.db", conn):
+                rv = self.client.get("/covidcast/", query_string=dict(signal="src:sig", geo="state:ny", time="day:20200401", fields="issue,value", **params))
+            return rv.get_json()["epidata"]
+
+        with patch("delphi.epidata.server.endpoints.covidcast.COVIDCAST_LATEST_TABLE", "covidcast_latest"):
+            with self.subTest("latest"):
+                self.assertEqual(fetch(), [dict(issue=20200402, value=3.0)])
+            with self.subTest("issues"):
+                self.assertEqual(fetch(issues="20200401-20200402"), [dict(issue=20200401, value=1.0), dict(issue=20200402, value=2.0)])
+        with self.subTest("without the latest table (default)"):
+            self.assertEqual(fetch(), [dict(issue=20200402, value=2.0)])
+
+    def test_as_of(self):
+        conn = create_engine("sqlite://").connect()
+        conn.execute("CREATE TABLE covidcast (source TEXT, signal TEXT, time_type TEXT, geo_type TEXT, geo_value TEXT, time_value INTEGER, issue INTEGER, next_issue INTEGER, lag INTEGER, value REAL)")
+        key = ("src", "sig", "day", "state", "ny", 20200401)
+        conn.execute("INSERT INTO covidcast VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", [(*key, 20200401, 20200403, 0, 1.0), (*key, 20200403, 20200410, 2, 2.0), (*key, 20200410, None, 9, 3.0)])
+
+        def fetch(as_of):
+            with patch("delphi.epidata.server._query.db", conn):
+                rv = self.client.get("/covidcast/", query_string=dict(signal="src:sig", geo="state:ny", time="day:20200401", as_of=as_of, fields="issue,value"))
+            return rv.get_json()["epidata"]
+
+        with patch("delphi.epidata.server.endpoints.covidcast.COVIDCAST_AS_OF_NEXT_ISSUE", True):
+            for as_of, expected in [(20200331, []), (20200401, [(20200401, 1.0)]), (20200409, [(20200403, 2.0)]), (20200410, [(20200410, 3.0)]), (20210101, [(20200410, 3.0)])]:
+                with self.subTest(as_of=as_of):
+                    self.assertEqual(fetch(as_of), [dict(issue=issue, value=value) for issue, value in expected])
+        with self.subTest("next_issue not filled yet (default)"):
+            conn.execute("UPDATE covidcast SET next_issue = NULL")
+            self.assertEqual(fetch(20200409), [dict(issue=20200403, value=2.0)])
@@ -0,0 +1,37 @@
+# standard library
+import unittest
+from unittest.mock import patch
+
+from flask.testing import FlaskClient
+from delphi.epidata.server.main import app
+
+from delphi.epidata.server.endpoints.covidcast_utils import CovidcastMeta
+
+# py3tester coverage target
+__test_target__ = "delphi.epidata.server.endpoints.covidcast_meta"
+
+
+class UnitTests(unittest.TestCase):
+    """Basic unit tests."""
+
+    client: FlaskClient
+
+    def setUp(self):
+        app.config["TESTING"] = True
+        app.config["WTF_CSRF_ENABLED"] = False
+        app.config["DEBUG"] = False
+        self.client = app.test_client()
+
+    def test_tree_keeps_cached_rows(self):
+        rows = [
+            dict(data_source="src1", signal="sig", time_type="day", geo_type="state", min_time=20200101, max_time=20200110),
+            dict(data_source="src2", signal="sig", time_type="day", geo_type="state", min_time=20200101, max_time=20200110),
+        ]
+        meta = CovidcastMeta((1, 1), [dict(row) for row in rows])
+
+        with patch("delphi.epidata.server.endpoints.covidcast_meta.get_covidcast_meta", return_value=(meta, 0)):
+            tree = self.client.get("/covidcast_meta/", query_string=dict(format="tree-data_source")).get_json()
+            self.assertEqual(tree["epidata"], [{"src1": [{k: v for k, v in rows[0].items() if k != "data_source"}], "src2": [{k: v for k, v in rows[1].items() if k != "data_source"}]}])
+            # the tree printer must not have changed the cached rows
+            self.assertEqual(meta.rows, rows)
+            self.assertEqual(self.client.get("/covidcast_meta/").get_json()["epidata"], rows)
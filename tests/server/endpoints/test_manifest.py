@@ -0,0 +1,39 @@
+"""Unit tests for the manifest of the lazily loaded endpoints."""
+
+# standard library
+import unittest
+
+from flask import request
+
+from delphi.epidata.server.endpoints import LazyView, load_all
+from delphi.epidata.server.endpoints.manifest import MANIFEST, build_manifest
+from delphi.epidata.server.main import app, endpoint_map
+
+# py3tester coverage target
+__test_target__ = "delphi.epidata.server.endpoints.manifest"
+
+
+class UnitTests(unittest.TestCase):
+    """Basic unit tests."""
+
+    def test_manifest_up_to_date(self):
+        # regenerate with `python -m delphi.epidata.server.endpoints.manifest`
+        self.assertEqual(build_manifest([entry.module for entry in MANIFEST]), MANIFEST)
+
+    def test_registered_routes(self):
+        urls = app.url_map.bind("")
+        self.assertEqual(urls.match("/covidcast/")[0], "covidcast.handle")
+        self.assertEqual(urls.match("/covidcast/trend", "POST")[0], "covidcast.handle_trend")
+        self.assertEqual(urls.match("/fluview_clinical/")[0], "fluview_clinical.handle")
+        self.assertIs(endpoint_map["covid_hosp"], endpoint_map["covid_hosp_state_timeseries"])
+        self.assertIsInstance(endpoint_map["signals"], LazyView)
+
+    def test_lazy_view(self):
+        with app.test_request_context("/covidcast/meta"):
+            self.assertEqual(request.blueprint, "covidcast")
+            self.assertIsInstance(app.view_functions[request.url_rule.endpoint], LazyView)
+
+    def test_load_all(self):
+        self.assertEqual([m.__name__ for m in load_all(["cdc", "fluview_clinical"])], ["delphi.epidata.server.endpoints.cdc", "delphi.epidata.server.endpoints.fluview_clinicial"])
+        self.assertEqual(len(load_all(["*"])), len(MANIFEST))
+        self.assertEqual(load_all([]), [])
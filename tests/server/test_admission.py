@@ -0,0 +1,61 @@
+"""Unit tests for the admission control of large requests."""
+
+# standard library
+import unittest
+from unittest.mock import patch
+
+from flask import Response
+
+from delphi.epidata.server._admission import AdmissionPool, admit, run_admitted
+from delphi.epidata.server._exceptions import RequestTooLargeException, ServiceBusyException
+from delphi.epidata.server.main import app
+
+# py3tester coverage target
+__test_target__ = "delphi.epidata.server._admission"
+
+
+class UnitTests(unittest.TestCase):
+    """Basic unit tests."""
+
+    def test_pool(self):
+        pool = AdmissionPool(1, 0.01)
+        release = pool.acquire()
+        self.assertEqual(pool.as_dict(), dict(max_concurrent=1, active=1, admitted=1, rejected=0))
+        with app.test_request_context():
+            with self.assertRaises(ServiceBusyException):
+                pool.acquire()
+        self.assertEqual(pool.rejected, 1)
+        release()
+        # multiple releases free a single slot
+        release()
+        self.assertEqual(pool.active, 0)
+        pool.acquire()()
+        self.assertEqual(pool.admitted, 2)
+
+    def test_admit(self):
+        pool = AdmissionPool(1, 0.01)
+        with app.test_request_context("/?format=json"), patch("delphi.epidata.server._admission.heavy_requests", pool), patch("delphi.epidata.server._admission.ADMISSION_HEAVY_ROWS", 100), patch(
+            "delphi.epidata.server._admission.ADMISSION_MAX_ROWS", 1000
+        ):
+            self.assertIsNone(admit(None))
+            self.assertIsNone(admit(99))
+            with self.assertRaises(RequestTooLargeException) as e:
+                admit(1001)
+            self.assertEqual(e.exception.code, 413)
+            self.assertIn("split", e.exception.description)
+
+            # the slot is held till the response is closed
+            r = run_admitted(500, lambda: Response(iter([b"a"])))
+            self.assertEqual(pool.active, 1)
+            with self.assertRaises(ServiceBusyException):
+                run_admitted(500, lambda: Response("b"))
+            r.close()
+            self.assertEqual(pool.active, 0)
+
+            # and freed on errors
+            def fail():
+                raise ValueError()
+
+            with self.assertRaises(ValueError):
+                run_admitted(500, fail)
+            self.assertEqual(pool.active, 0)
@@ -0,0 +1,103 @@
+"""Unit tests for the ASGI adapter."""
+
+# standard library
+import asyncio
+import unittest
+from typing import Any, Dict, List
+
+from flask import Flask, Response, request, stream_with_context
+
+from delphi.epidata.server.asgi import WSGIAdapter, build_environ
+
+# py3tester coverage target
+__test_target__ = "delphi.epidata.server.asgi"
+
+
+def _scope(path: str, query_string: bytes = b"", method: str = "GET") -> Dict[str, Any]:
+    return dict(
+        type="http",
+        method=method,
+        path=path,
+        query_string=query_string,
+        headers=[(b"host", b"localhost"), (b"content-type", b"application/x-www-form-urlencoded")],
+        server=("localhost", 8000),
+        client=("127.0.0.1", 1234),
+    )
+
+
+def _request(adapter: WSGIAdapter, scope: Dict[str, Any], body: bytes = b"", disconnect_after: int = -1) -> List[Dict[str, Any]]:
+    sent: List[Dict[str, Any]] = []
+
+    async def run():
+        requested = asyncio.Event()
+        messages = [dict(type="http.request", body=body, more_body=False)]
+
+        async def receive():
+            if messages:
+                return messages.pop(0)
+            await requested.wait()
+            return dict(type="http.disconnect")
+
+        async def send(message):
+            sent.append(message)
+            if len(sent) == disconnect_after:
+                requested.set()
+                raise OSError("disconnected")
+
+        await adapter(scope, receive, send)
+
+    asyncio.run(run())
+    return sent
+
+
+class UnitTests(unittest.TestCase):
+    """Basic unit tests."""
+
+    def setUp(self):
+        self.app = Flask("test")
+        self.produced: List[int] = []
+
+        @self.app.route("/stream", methods=["GET", "POST"])
+        def stream():
+            n = int(request.values["n"])
+
+            def gen():
+                for i in range(n):
+                    self.produced.append(i)
+                    yield f"{i},"
+
+            return Response(stream_with_context(gen()), mimetype="text/plain")
+
+        @self.app.route("/fail")
+        def fail():
+            raise ValueError("broken")
+
+    def test_environ(self):
+        environ = build_environ(_scope("/a b", b"x=1"), b"data")
+        self.assertEqual(environ["PATH_INFO"], "/a b")
+        self.assertEqual(environ["QUERY_STRING"], "x=1")
+        self.assertEqual(environ["HTTP_HOST"], "localhost")
+        self.assertEqual(environ["CONTENT_TYPE"], "application/x-www-form-urlencoded")
+        self.assertEqual(environ["CONTENT_LENGTH"], "4")
+        self.assertEqual(environ["wsgi.input"].read(), b"data")
+
+    def test_stream(self):
+        sent = _request(WSGIAdapter(self.app.wsgi_app, buffer_chunks=2), _scope("/stream", b"n=100"))
+        self.assertEqual(sent[0]["type"], "http.response.start")
+        self.assertEqual(sent[0]["status"], 200)
+        self.assertIn((b"content-type", b"text/plain; charset=utf-8"), sent[0]["headers"])
+        self.assertEqual(b"".join(m.get("body", b"") for m in sent[1:]), "".join(f"{i}," for i in range(100)).encode())
+        self.assertFalse(sent[-1]["more_body"])
+
+    def test_post(self):
+        sent = _request(WSGIAdapter(self.app.wsgi_app), _scope("/stream", method="POST"), b"n=3")
+        self.assertEqual(b"".join(m.get("body", b"") for m in sent[1:]), b"0,1,2,")
+
+    def test_error(self):
+        sent = _request(WSGIAdapter(self.app.wsgi_app), _scope("/fail"))
+        self.assertEqual(sent[0]["status"], 500)
+
+    def test_disconnect(self):
+        _request(WSGIAdapter(self.app.wsgi_app, buffer_chunks=2), _scope("/stream", b"n=100000"), disconnect_after=3)
+        # the producer stopped early instead of generating everything into the void
+        self.assertLess(len(self.produced), 1000)
@@ -0,0 +1,122 @@
+"""Unit tests for the response cache."""
+
+# standard library
+import unittest
+from unittest.mock import patch
+
+from sqlalchemy import create_engine
+
+from delphi.epidata.server._common import app
+from delphi.epidata.server._cache import CachedResponse, ResponseCache, cached, covidcast_version, response_cache, _probed_versions
+from delphi.epidata.server._printer import create_printer
+
+# py3tester coverage target
+__test_target__ = "delphi.epidata.server._cache"
+
+
+def _entry(version, body: bytes) -> CachedResponse:
+    return CachedResponse(version, 0, 200, [], body)
+
+
+class UnitTests(unittest.TestCase):
+    """Basic unit tests."""
+
+    def setUp(self):
+        app.config["TESTING"] = True
+        app.config["WTF_CSRF_ENABLED"] = False
+        app.config["DEBUG"] = False
+        response_cache.clear()
+        _probed_versions.clear()
+
+    def test_response_cache(self):
+        with self.subTest("lru"):
+            c = ResponseCache(10, 10, 1e9)
+            c.put("a", _entry(1, b"aaaa"))
+            c.put("b", _entry(1, b"bbbb"))
+            self.assertIsNotNone(c.get("a", 1))
+            c.put("c", _entry(1, b"cccc"))
+            self.assertEqual(len(c), 2)
+            self.assertEqual(c.size, 8)
+            self.assertIsNone(c.get("b", 1))
+            self.assertEqual(c.get("a", 1).body, b"aaaa")
+        with self.subTest("version"):
+            c = ResponseCache(10, 10, 1e9)
+            c.put("a", _entry(1, b"aaaa"))
+            self.assertIsNone(c.get("a", 2))
+            self.assertEqual(len(c), 0)
+            self.assertEqual(c.size, 0)
+        with self.subTest("max age"):
+            c = ResponseCache(10, 10, -1)
+            c.put("a", _entry(1, b"aaaa"))
+            self.assertIsNone(c.get("a", 1))
+        with self.subTest("too big"):
+            c = ResponseCache(10, 2, 1e9)
+            self.assertFalse(c.put("a", _entry(1, b"aaaa")))
+            self.assertEqual(len(c), 0)
+
+    def test_cached(self):
+        calls = []
+        version = [1]
+
+        @cached(lambda: version[0])
+        def handler():
+            calls.append(1)
+            return create_printer()(iter([dict(a=len(calls))]))
+
+        def fetch(query_string: str) -> bytes:
+            _probed_versions.clear()
+            with app.test_request_context(query_string=query_string):
+                return b"".join(handler().response)
+
+        first = fetch("format=json&a=1")
+        self.assertEqual(fetch("format=json&a=1"), first)
+        self.assertEqual(len(calls), 1)
+
+        with self.subTest("different parameters"):
+            self.assertNotEqual(fetch("format=csv&a=1"), first)
+            self.assertEqual(len(calls), 2)
+
+        with self.subTest("new data version"):
+            version[0] = 2
+            self.assertNotEqual(fetch("format=json&a=1"), first)
+            self.assertEqual(len(calls), 3)
+
+        with self.subTest("unknown data version"):
+            version[0] = None
+            fetch("format=json&a=1")
+            fetch("format=json&a=1")
+            self.assertEqual(len(calls), 5)
+
+    def test_cached_error(self):
+        calls = []
+
+        def rows():
+            calls.append(1)
+            yield dict(a=1)
+            raise ValueError("broken")
+
+        @cached(lambda: 1)
+        def handler():
+            return create_printer()(rows())
+
+        for _ in range(2):
+            with app.test_request_context(query_string="format=json"):
+                b"".join(handler().response)
+        self.assertEqual(len(calls), 2)
+        self.assertEqual(len(response_cache), 0)
+
+    def test_covidcast_version(self):
+        conn = create_engine("sqlite://").connect()
+        conn.execute("CREATE TABLE covidcast (id INTEGER PRIMARY KEY, value REAL)")
+        conn.execute("CREATE TABLE covidcast_meta_cache (timestamp INTEGER, epidata TEXT)")
+        conn.execute("INSERT INTO covidcast_meta_cache VALUES (1, '[]')")
+
+        with patch("delphi.epidata.server._cache.db", conn):
+            before = covidcast_version()
+            # an import adds rows without updating the metadata cache yet
+            conn.execute("INSERT INTO covidcast (value) VALUES (1)")
+            imported = covidcast_version()
+            self.assertNotEqual(imported, before)
+            # ... which is updated later
+            conn.execute("UPDATE covidcast_meta_cache SET timestamp = 2")
+            self.assertNotEqual(covidcast_version(), imported)
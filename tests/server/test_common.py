@@ -0,0 +1,55 @@
+"""Unit tests for the request scoped database connection."""
+
+# standard library
+import unittest
+
+from flask import g
+from flask.testing import FlaskClient
+
+from delphi.epidata.server._common import db
+from delphi.epidata.server._db import pool_stats
+from delphi.epidata.server._printer import create_printer
+from delphi.epidata.server.main import app
+
+# py3tester coverage target
+__test_target__ = "delphi.epidata.server._common"
+
+
+class UnitTests(unittest.TestCase):
+    """Basic unit tests."""
+
+    client: FlaskClient
+
+    def setUp(self):
+        app.config["TESTING"] = True
+        app.config["WTF_CSRF_ENABLED"] = False
+        app.config["DEBUG"] = False
+        self.client = app.test_client()
+
+    def test_lazy_connection(self):
+        checkouts = pool_stats.checkouts
+        self.assertEqual(self.client.get("/version").status_code, 200)
+        self.client.get("/nidss_flu/")
+        self.assertEqual(pool_stats.checkouts, checkouts)
+
+        with app.test_request_context():
+            self.assertNotIn("db", g)
+            self.assertEqual(db.execute("SELECT 1").scalar(), 1)
+            self.assertIn("db", g)
+        self.assertEqual(pool_stats.checkouts, checkouts + 1)
+        self.assertEqual(pool_stats.as_dict()["checkouts"], checkouts + 1)
+
+    def test_release_after_stream(self):
+        with app.test_request_context():
+
+            def rows():
+                for row in db.execute("SELECT 1 AS a UNION ALL SELECT 2"):
+                    yield dict(row)
+
+            r = create_printer()(rows())
+            body = b"".join(r.response)
+            self.assertIn(b'"a":2', body)
+            self.assertNotIn("db", g)
+
+    def test_pool_stats(self):
+        self.assertEqual(self.client.get("/pool_stats").get_json()["result"], -1)
@@ -0,0 +1,263 @@
+"""Unit tests for the response printers."""
+
+# standard library
+from csv import DictWriter
+import gzip
+import json
+import unittest
+from io import BytesIO, StringIO
+
+import orjson
+import pyarrow as pa
+import pyarrow.parquet as pq
+import zstandard
+
+from delphi.epidata.server._common import app, set_compatibility_mode
+from delphi.epidata.server.endpoints.covidcast_utils.trend import TrendEnum
+from delphi.epidata.server._printer import create_printer, ArrowPrinter, CSVPrinter, ParquetPrinter, ClassicPrinter, ClassicTreePrinter, _SpilledGroups
+
+# py3tester coverage target
+__test_target__ = "delphi.epidata.server._printer"
+
+
+def _rows(n: int):
+    for i in range(n):
+        yield dict(source="src", signal="sig", geo_value=f"{i % 3:02}", time_value=20200101 + i, issue=20200110, value=i / 2, stderr=None, direction=None)
+
+
+class UnitTests(unittest.TestCase):
+    """Basic unit tests."""
+
+    def setUp(self):
+        app.config["TESTING"] = True
+        app.config["WTF_CSRF_ENABLED"] = False
+        app.config["DEBUG"] = False
+
+    def _print(self, query_string: str, rows, printer=create_printer) -> bytes:
+        with app.test_request_context(query_string=query_string):
+            return b"".join(printer()(rows).response)
+
+    def test_chunks(self):
+        def chunks(chunk_size: int):
+            with app.test_request_context():
+                p = ClassicPrinter()
+                p.chunk_size = chunk_size
+                return list(p(_rows(100)).response)
+
+        per_row = chunks(0)
+        self.assertEqual(len(per_row), 100 + 2)
+        chunked = chunks(1024)
+        self.assertLess(len(chunked), len(per_row))
+        self.assertTrue(all(len(c) >= 1024 for c in chunked[:-1]))
+        self.assertEqual(b"".join(chunked), b"".join(per_row))
+        self.assertEqual(len(chunks(1024 * 1024)), 1)
+
+    def test_cursor(self):
+        def classic(next_cursor):
+            p = ClassicPrinter()
+            p._max_results = 2
+            p.next_cursor = next_cursor
+            return p
+
+        with self.subTest("truncated"):
+            data = orjson.loads(self._print("", _rows(3), lambda: classic("abc")))
+            self.assertEqual((data["result"], len(data["epidata"]), data["cursor"]), (2, 2, "abc"))
+        with self.subTest("complete"):
+            data = orjson.loads(self._print("", _rows(2), lambda: classic("abc")))
+            self.assertEqual(data["result"], 1)
+            self.assertNotIn("cursor", data)
+
+    def test_error_after_rows(self):
+        def failing(n: int):
+            yield from _rows(n)
+            raise RuntimeError("connection lost")
+
+        # the rows fetched before the error are sent ahead of it, also within a batch
+        body = self._print("format=csv", failing(3))
+        self.assertTrue(body.startswith(b"".join(self._print("format=csv", _rows(3)).splitlines(keepends=True))))
+        self.assertTrue(body.endswith(b"connection lost"))
+        with app.test_request_context():
+            p = ClassicPrinter()
+            body = b"".join(p(failing(3)).response)
+        self.assertEqual(p.result, -1)
+        self.assertEqual(body.count(b'"signal":"sig"'), 3)
+
+    def test_compression(self):
+        def get(accept_encoding: str, query_string: str = ""):
+            with app.test_request_context(query_string=query_string, headers={"Accept-Encoding": accept_encoding}):
+                p = create_printer()
+                p.chunk_size = 512
+                r = p(_rows(100))
+                return r.headers.get("Content-Encoding"), b"".join(r.response)
+
+        _, plain = get("identity")
+        with self.subTest("gzip"):
+            encoding, data = get("gzip, deflate")
+            self.assertEqual(encoding, "gzip")
+            self.assertEqual(gzip.decompress(data), plain)
+        with self.subTest("zstd"):
+            encoding, data = get("gzip;q=0.5, zstd")
+            self.assertEqual(encoding, "zstd")
+            self.assertEqual(zstandard.ZstdDecompressor().decompressobj().decompress(data), plain)
+        with self.subTest("not accepted"):
+            self.assertEqual(get("br"), (None, plain))
+            self.assertEqual(get("gzip;q=0"), (None, plain))
+        with self.subTest("parquet"):
+            encoding, _ = get("gzip", "format=parquet")
+            self.assertIsNone(encoding)
+
+    def test_arrow(self):
+        with app.test_request_context(query_string="format=arrow"):
+            self.assertIsInstance(create_printer(), ArrowPrinter)
+
+        with self.subTest("batches"):
+            data = self._print("format=arrow", _rows(5), lambda: ArrowPrinter(batch_size=2))
+            reader = pa.ipc.open_stream(data)
+            batches = list(reader)
+            self.assertEqual([b.num_rows for b in batches], [2, 2, 1])
+            table = pa.Table.from_batches(batches)
+            self.assertEqual(table.schema.field("time_value").type, pa.int32())
+            self.assertEqual(table.schema.field("issue").type, pa.int32())
+            self.assertEqual(table.schema.field("value").type, pa.float64())
+            self.assertEqual(table.schema.field("stderr").type, pa.float64())
+            self.assertEqual(table.schema.field("geo_value").type, pa.dictionary(pa.int32(), pa.string()))
+            self.assertEqual(table.to_pylist(), list(_rows(5)))
+        with self.subTest("leading NULL batch"):
+            def printer():
+                p = ArrowPrinter(batch_size=2)
+                p.declare_fields(["geo_value"], ["issue", "direction"], ["value", "stderr"])
+                return p
+
+            rows = [dict(row, direction=None if i < 2 else 1) for i, row in enumerate(_rows(5))]
+            table = pa.ipc.open_stream(self._print("format=arrow", rows, printer)).read_all()
+            self.assertEqual(table.schema.field("direction").type, pa.int64())
+            self.assertEqual(table.to_pylist(), rows)
+        with self.subTest("empty"):
+            data = self._print("format=arrow", _rows(0))
+            self.assertEqual(pa.ipc.open_stream(data).read_all().num_rows, 0)
+
+    def test_parquet(self):
+        with app.test_request_context(query_string="format=parquet"):
+            self.assertIsInstance(create_printer(), ParquetPrinter)
+
+        with self.subTest("row groups"):
+            data = self._print("format=parquet", _rows(5), lambda: ParquetPrinter(batch_size=2))
+            f = pq.ParquetFile(BytesIO(data))
+            self.assertEqual(f.metadata.num_row_groups, 3)
+            table = f.read()
+            self.assertEqual(table.schema.field("time_value").type, pa.int32())
+            self.assertEqual(table.to_pylist(), list(_rows(5)))
+        with self.subTest("empty"):
+            data = self._print("format=parquet", _rows(0))
+            self.assertEqual(pq.read_table(BytesIO(data)).num_rows, 0)
+
+    def test_csv(self):
+        def dict_writer(rows):
+            stream = StringIO()
+            w = DictWriter(stream, list(rows[0].keys()), lineterminator="\n")
+            w.writeheader()
+            w.writerows(rows)
+            return stream.getvalue().encode("utf-8")
+
+        def check(rows, batch_size=2):
+            self.assertEqual(self._print("format=csv", iter(rows), lambda: CSVPrinter(batch_size=batch_size)), dict_writer(rows))
+
+        with self.subTest("plain"):
+            check(list(_rows(5)))
+            check(list(_rows(5)), batch_size=1000)
+        with self.subTest("quoting"):
+            values = ["a,b", 'say "hi"', "line\nbreak", "cr\r", "", " spaced ", "ü", None, 1.5, -3, float("nan"), True]
+            check([dict(a=v, b=str(v), c=2) for v in values])
+            check([{"a,b": 1, 'q"': 2}])
+        with self.subTest("single column"):
+            check([dict(a=v) for v in ["", None, "x", 1]])
+        with self.subTest("str enum"):
+            check([dict(a=TrendEnum.increasing, b=1)])
+        with self.subTest("missing fields"):
+            rows = [dict(a=1, b=2), dict(a=3)]
+            self.assertEqual(self._print("format=csv", iter(rows)), b"a,b\n1,2\n3,\n")
+        with self.subTest("empty"):
+            self.assertEqual(self._print("format=csv", _rows(0)), b"")
+
+    def test_tree(self):
+        def expected(rows, group):
+            tree = {}
+            for row in rows:
+                row = dict(row)
+                tree.setdefault(str(row.pop(group)), []).append(row)
+            return tree
+
+        def tree(rows, group="signal", grouped=False, compatibility=False, max_bytes=None):
+            with app.test_request_context():
+                if compatibility:
+                    set_compatibility_mode()
+                p = ClassicTreePrinter(group, grouped)
+                if max_bytes is not None:
+                    p.spill_bytes = max_bytes
+                data = orjson.loads(b"".join(p(iter([dict(r) for r in rows])).response))
+            self.assertEqual(data["result"], 1 if rows else -2)
+            return data["epidata"][0] if rows else data.get("epidata")
+
+        rows = [dict(signal=f"s{i % 3}", time_value=20200101 + i, value=i / 2) for i in range(20)]
+        grouped_rows = sorted(rows, key=lambda r: r["signal"])
+        with self.subTest("collected"):
+            self.assertEqual(tree(rows), expected(rows, "signal"))
+            self.assertEqual(list(tree(rows).keys()), ["s0", "s1", "s2"])
+        with self.subTest("spilled"):
+            self.assertEqual(tree(rows, max_bytes=50), expected(rows, "signal"))
+            self.assertEqual(tree(rows, compatibility=True, max_bytes=0), expected(rows, "signal"))
+        with self.subTest("grouped"):
+            self.assertEqual(tree(grouped_rows, grouped=True), expected(grouped_rows, "signal"))
+            self.assertEqual(tree(grouped_rows, grouped=True, compatibility=True), expected(grouped_rows, "signal"))
+            self.assertEqual(tree(rows[:1], grouped=True), expected(rows[:1], "signal"))
+        with self.subTest("non string keys"):
+            self.assertEqual(tree(rows, "time_value"), expected(rows, "time_value"))
+        with self.subTest("empty"):
+            self.assertEqual(tree([]), [])
+            self.assertEqual(tree([], grouped=True), [])
+
+        with self.subTest("streamed"), app.test_request_context():
+            p = ClassicTreePrinter("signal", grouped=True)
+            p.chunk_size = 0
+            chunks = list(p(iter([dict(r) for r in grouped_rows])).response)
+            self.assertEqual(len(chunks), len(grouped_rows) + 2)
+
+    def test_tree_grouped_runs(self):
+        def tree_keys(rows, max_bytes=None):
+            with app.test_request_context():
+                p = ClassicTreePrinter("geo_value", grouped=True)
+                if max_bytes is not None:
+                    p.spill_bytes = max_bytes
+                body = b"".join(p(iter([dict(r) for r in rows])).response)
+            # the keys of each object as written, a duplicate one would be merged by a plain parse
+            objects: list = []
+            json.loads(body, object_pairs_hook=lambda pairs: objects.append([k for k, _ in pairs]) or dict(pairs))
+            # the tree is parsed right before the envelope
+            return p, objects[-2], orjson.loads(body)
+
+        # a case insensitive collation orders the spellings of a group as equal
+        rows = [dict(geo_value=g, value=i) for i, g in enumerate(["CA", "ca", "CA", "Ca", "ca", "ny", "NY", "ny"])]
+        for max_bytes in [None, 0]:
+            with self.subTest(max_bytes=max_bytes):
+                p, keys, data = tree_keys(rows, max_bytes)
+                self.assertEqual(p.result, 1)
+                self.assertEqual(keys, ["CA", "ca", "Ca", "ny", "NY"])
+                self.assertEqual(data["epidata"][0]["CA"], [dict(value=0), dict(value=2)])
+                self.assertEqual(data["epidata"][0]["ca"], [dict(value=1), dict(value=4)])
+                self.assertEqual(data["epidata"][0]["ny"], [dict(value=5), dict(value=7)])
+
+        with self.subTest("not contiguous"):
+            rows = [dict(geo_value=g, value=i) for i, g in enumerate(["ca", "ny", "ca"])]
+            with app.test_request_context():
+                p = ClassicTreePrinter("geo_value", grouped=True)
+                body = b"".join(p(iter(rows)).response)
+            self.assertEqual(p.result, -1)
+            self.assertLessEqual(body.count(b'"ca"'), 1)
+
+    def test_spilled_groups(self):
+        groups = _SpilledGroups(4)
+        for i in range(10):
+            groups.append(i % 3, f"{i}".encode())
+        self.assertGreater(groups.spilled_bytes, 0)
+        self.assertEqual([(g, b"".join(rows)) for g, rows in groups], [(0, b"0,3,6,9"), (1, b"1,4,7"), (2, b"2,5,8")])
+        groups.close()
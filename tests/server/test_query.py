@@ -3,9 +3,17 @@
 # standard library
 import unittest
 import base64
+from datetime import date
+from tempfile import TemporaryDirectory
+from unittest.mock import patch
+
+import orjson
+
+from sqlalchemy import create_engine, text
 
 # from flask.testing import FlaskClient
 from delphi.epidata.server._common import app
+from delphi.epidata.server._exceptions import DatabaseErrorException, ValidationFailedException
 from delphi.epidata.server._query import (
     date_string,
     to_condition,
@@ -15,6 +23,19 @@ from delphi.epidata.server._query import (
     filter_geo_pairs,
     filter_source_signal_pairs,
     filter_time_pairs,
+    parse_row,
+    parse_rows,
+    compile_row_decoder,
+    normalize_values,
+    bind_query,
+    encode_cursor,
+    decode_cursor,
+    QueryBuilder,
+    execute_queries,
+    leading_order_field,
+    requested_fields,
+    select_fields,
+    select_expressions,
 )
 from delphi.epidata.server._params import (
     GeoPair,
@@ -47,6 +68,15 @@ class UnitTests(unittest.TestCase):
         self.assertEqual(to_condition("a", (1, 4), "a", params), "a BETWEEN :a AND :a_2")
         self.assertEqual(params, {"a": 1, "a_2": 4})
 
+    def test_normalize_values(self):
+        with self.subTest("dedupe strings"):
+            self.assertEqual(normalize_values(["b", "a", "b", ("a", "c"), ("a", "c")]), (["b", "a"], [("a", "c")]))
+        with self.subTest("merge integers"):
+            self.assertEqual(normalize_values([5, 1, 3, 3, 9]), ([1, 3, 5, 9], []))
+            self.assertEqual(normalize_values([1, 2, 3, 7]), ([7], [(1, 3)]))
+            self.assertEqual(normalize_values([(1, 4), 2, (3, 6), 8, (10, 12), 13]), ([8], [(1, 6), (10, 13)]))
+            self.assertEqual(normalize_values([(4, 1)]), ([], [(1, 4)]))
+
     def test_filter_strings(self):
         params = {}
         self.assertEqual(filter_strings("a", None, "a", params), "FALSE")
@@ -55,14 +85,17 @@ class UnitTests(unittest.TestCase):
         self.assertEqual(filter_strings("a", ["1"], "a", params), "(a = :a_0)")
         self.assertEqual(params, {"a_0": "1"})
         params = {}
-        self.assertEqual(filter_strings("a", ["1", "2"], "a", params), "(a = :a_0 OR a = :a_1)")
-        self.assertEqual(params, {"a_0": "1", "a_1": "2"})
+        self.assertEqual(filter_strings("a", ["1", "1"], "a", params), "(a = :a_0)")
+        self.assertEqual(params, {"a_0": "1"})
+        params = {}
+        self.assertEqual(filter_strings("a", ["1", "2"], "a", params), "(a IN :a_0)")
+        self.assertEqual(params, {"a_0": ["1", "2"]})
         params = {}
         self.assertEqual(
             filter_strings("a", ["1", "2", ("1", "4")], "a", params),
-            "(a = :a_0 OR a = :a_1 OR a BETWEEN :a_2 AND :a_2_2)",
+            "(a IN :a_0 OR a BETWEEN :a_1 AND :a_1_2)",
         )
-        self.assertEqual(params, {"a_0": "1", "a_1": "2", "a_2": "1", "a_2_2": "4"})
+        self.assertEqual(params, {"a_0": ["1", "2"], "a_1": "1", "a_1_2": "4"})
 
     def test_filter_integers(self):
         params = {}
@@ -72,14 +105,23 @@ class UnitTests(unittest.TestCase):
         self.assertEqual(filter_integers("a", [1], "a", params), "(a = :a_0)")
         self.assertEqual(params, {"a_0": 1})
         params = {}
-        self.assertEqual(filter_integers("a", [1, 2], "a", params), "(a = :a_0 OR a = :a_1)")
-        self.assertEqual(params, {"a_0": 1, "a_1": 2})
+        self.assertEqual(filter_integers("a", [1, 3], "a", params), "(a IN :a_0)")
+        self.assertEqual(params, {"a_0": [1, 3]})
+        params = {}
+        self.assertEqual(filter_integers("a", [1, 2], "a", params), "(a BETWEEN :a_0 AND :a_0_2)")
+        self.assertEqual(params, {"a_0": 1, "a_0_2": 2})
         params = {}
         self.assertEqual(
             filter_integers("a", [1, 2, (1, 4)], "a", params),
-            "(a = :a_0 OR a = :a_1 OR a BETWEEN :a_2 AND :a_2_2)",
+            "(a BETWEEN :a_0 AND :a_0_2)",
         )
-        self.assertEqual(params, {"a_0": 1, "a_1": 2, "a_2": 1, "a_2_2": 4})
+        self.assertEqual(params, {"a_0": 1, "a_0_2": 4})
+        params = {}
+        self.assertEqual(
+            filter_integers("a", [7, 1, 9, (2, 4)], "a", params),
+            "(a IN :a_0 OR a BETWEEN :a_1 AND :a_1_2)",
+        )
+        self.assertEqual(params, {"a_0": [7, 9], "a_1": 1, "a_1_2": 4})
 
     def test_filter_dates(self):
         params = {}
@@ -90,22 +132,21 @@ class UnitTests(unittest.TestCase):
         self.assertEqual(params, {"a_0": "2020-01-01"})
         params = {}
         self.assertEqual(
-            filter_dates("a", [20200101, 20200102], "a", params),
-            "(a = :a_0 OR a = :a_1)",
+            filter_dates("a", [20200101, 20200103], "a", params),
+            "(a IN :a_0)",
         )
-        self.assertEqual(params, {"a_0": "2020-01-01", "a_1": "2020-01-02"})
+        self.assertEqual(params, {"a_0": ["2020-01-01", "2020-01-03"]})
         params = {}
         self.assertEqual(
-            filter_dates("a", [20200101, 20200102, (20200101, 20200104)], "a", params),
-            "(a = :a_0 OR a = :a_1 OR a BETWEEN :a_2 AND :a_2_2)",
+            filter_dates("a", [20200101, 20200102, (20200101, 20200104), 20200110], "a", params),
+            "(a = :a_0 OR a BETWEEN :a_1 AND :a_1_2)",
         )
         self.assertEqual(
             params,
             {
-                "a_0": "2020-01-01",
-                "a_1": "2020-01-02",
-                "a_2": "2020-01-01",
-                "a_2_2": "2020-01-04",
+                "a_0": "2020-01-10",
+                "a_1": "2020-01-01",
+                "a_1_2": "2020-01-04",
             },
         )
 
@@ -132,9 +173,9 @@ class UnitTests(unittest.TestCase):
             params = {}
             self.assertEqual(
                 filter_geo_pairs("t", "v", [GeoPair("state", ["KY", "AK"])], "p", params),
-                "((t = :p_0t AND (v = :p_0t_0 OR v = :p_0t_1)))",
+                "((t = :p_0t AND (v IN :p_0t_0)))",
             )
-            self.assertEqual(params, {"p_0t": "state", "p_0t_0": "KY", "p_0t_1": "AK"})
+            self.assertEqual(params, {"p_0t": "state", "p_0t_0": ["KY", "AK"]})
         with self.subTest("multiple pairs"):
             params = {}
             self.assertEqual(
@@ -145,9 +186,9 @@ class UnitTests(unittest.TestCase):
                     "p",
                     params,
                 ),
-                "(t = :p_0t OR t = :p_1t)",
+                "(t IN :p_0t)",
             )
-            self.assertEqual(params, {"p_0t": "state", "p_1t": "nation"})
+            self.assertEqual(params, {"p_0t": ["state", "nation"]})
         with self.subTest("multiple pairs with value"):
             params = {}
             self.assertEqual(
@@ -164,6 +205,22 @@ class UnitTests(unittest.TestCase):
                 params,
                 {"p_0t": "state", "p_0t_0": "AK", "p_1t": "nation", "p_1t_0": "US"},
             )
+        with self.subTest("merged pairs"):
+            params = {}
+            self.assertEqual(
+                filter_geo_pairs(
+                    "t",
+                    "v",
+                    [GeoPair("county", ["01000"]), GeoPair("state", True), GeoPair("county", ["01001", "01000"]), GeoPair("nation", True), GeoPair("hrr", ["1"]), GeoPair("hrr", True)],
+                    "p",
+                    params,
+                ),
+                "(t IN :p_0t OR (t = :p_1t AND (v IN :p_1t_0)))",
+            )
+            self.assertEqual(
+                params,
+                {"p_0t": ["state", "nation", "hrr"], "p_1t": "county", "p_1t_0": ["01000", "01001"]},
+            )
 
     def test_filter_source_signal_pairs(self):
         with self.subTest("empty"):
@@ -188,9 +245,9 @@ class UnitTests(unittest.TestCase):
             params = {}
             self.assertEqual(
                 filter_source_signal_pairs("t", "v", [SourceSignalPair("src1", ["sig1", "sig2"])], "p", params),
-                "((t = :p_0t AND (v = :p_0t_0 OR v = :p_0t_1)))",
+                "((t = :p_0t AND (v IN :p_0t_0)))",
             )
-            self.assertEqual(params, {"p_0t": "src1", "p_0t_0": "sig1", "p_0t_1": "sig2"})
+            self.assertEqual(params, {"p_0t": "src1", "p_0t_0": ["sig1", "sig2"]})
         with self.subTest("multiple pairs"):
             params = {}
             self.assertEqual(
@@ -201,9 +258,9 @@ class UnitTests(unittest.TestCase):
                     "p",
                     params,
                 ),
-                "(t = :p_0t OR t = :p_1t)",
+                "(t IN :p_0t)",
             )
-            self.assertEqual(params, {"p_0t": "src1", "p_1t": "src2"})
+            self.assertEqual(params, {"p_0t": ["src1", "src2"]})
         with self.subTest("multiple pairs with value"):
             params = {}
             self.assertEqual(
@@ -247,9 +304,9 @@ class UnitTests(unittest.TestCase):
             params = {}
             self.assertEqual(
                 filter_time_pairs("t", "v", [TimePair("day", [20201201, 20201203])], "p", params),
-                "((t = :p_0t AND (v = :p_0t_0 OR v = :p_0t_1)))",
+                "((t = :p_0t AND (v IN :p_0t_0)))",
             )
-            self.assertEqual(params, {"p_0t": "day", "p_0t_0": 20201201, "p_0t_1": 20201203})
+            self.assertEqual(params, {"p_0t": "day", "p_0t_0": [20201201, 20201203]})
         with self.subTest("range"):
             params = {}
             self.assertEqual(
@@ -257,3 +314,131 @@ class UnitTests(unittest.TestCase):
                 "((t = :p_0t AND (v BETWEEN :p_0t_0 AND :p_0t_0_2)))",
             )
             self.assertEqual(params, {"p_0t": "day", "p_0t_0": 20201201, "p_0t_0_2": 20201203})
+
+    def test_compile_row_decoder(self):
+        engine = create_engine("sqlite://")
+        query = "SELECT 'a' AS s, 1 AS i, '2' AS i2, NULL AS n, 1.5 AS f, 3 AS f2"
+
+        with self.subTest("same as parse_row"):
+            fields = (["s", "n", "missing"], ["i", "i2", "n", "missing"], ["f", "f2", "n", "missing"])
+            row = engine.execute(query).fetchone()
+            decode = compile_row_decoder(row.keys(), *fields)
+            self.assertEqual(decode(row), parse_row(row, *fields))
+            self.assertEqual(list(decode(row).keys()), list(parse_row(row, *fields).keys()))
+            self.assertEqual(decode(row), {"s": "a", "n": None, "missing": None, "i": 1, "i2": 2, "f": 1.5, "f2": 3.0})
+            self.assertIsInstance(decode(row)["f2"], float)
+        with self.subTest("tuple rows"):
+            decode = compile_row_decoder(["d", "x", "y"], ["d"], ["y"], ["x"])
+            self.assertEqual(decode((date(2020, 1, 2), "4", None)), {"d": "2020-01-02", "y": None, "x": 4.0})
+        with self.subTest("no fields"):
+            self.assertEqual(compile_row_decoder(["a"])(("b",)), {})
+        with self.subTest("parse_rows"):
+            rows = engine.execute(f"{query} UNION ALL SELECT 'b', 2, NULL, NULL, NULL, 4")
+            self.assertEqual(
+                list(parse_rows(rows, ["s"], ["i", "i2"], ["f2"])),
+                [dict(s="a", i=1, i2=2, f2=3.0), dict(s="b", i=2, i2=None, f2=4.0)],
+            )
+
+    def test_bind_query(self):
+        engine = create_engine("sqlite://")
+        engine.execute("CREATE TABLE t (geo_type TEXT, geo_value TEXT, time_value INTEGER)")
+        engine.execute("INSERT INTO t VALUES ('county', '01000', 1), ('county', '01001', 2), ('county', '01002', 3), ('state', 'ak', 4), ('nation', 'us', 5)")
+        params = {}
+        condition = filter_geo_pairs("geo_type", "geo_value", [GeoPair("county", ["01000", "01002"]), GeoPair("state", True), GeoPair("nation", True)], "p", params)
+        condition += " AND " + filter_integers("time_value", [1, (3, 4), 5], "t", params)
+        query = f"SELECT time_value FROM t WHERE {condition} ORDER BY time_value"
+        self.assertEqual([r[0] for r in engine.execute(bind_query(query, params), **params)], [1, 3, 4, 5])
+
+    def test_cursor(self):
+        with self.subTest("roundtrip"):
+            key = ["src", "sig", "day", 20200101, "county", "01000", 20200102]
+            cursor = encode_cursor(key)
+            self.assertNotIn("=", cursor)
+            self.assertEqual(decode_cursor(cursor, [str, str, str, int, str, str, int]), key)
+        with self.subTest("invalid"), app.test_request_context():
+            for cursor in ["", "abc", encode_cursor(["a"]), encode_cursor([1, "a"]), encode_cursor(["a", True]), "ä"]:
+                with self.assertRaises(ValidationFailedException):
+                    decode_cursor(cursor, [str, int])
+
+    def test_leading_order_field(self):
+        q = QueryBuilder("t", "t")
+        q.set_order("signal", "time_value")
+        self.assertEqual(leading_order_field(str(q)), "signal")
+        self.assertEqual(leading_order_field("SELECT * FROM t ORDER BY `epiweek` ASC, `region` ASC"), "epiweek")
+        self.assertIsNone(leading_order_field("SELECT * FROM (SELECT * FROM t ORDER BY a) x"))
+        self.assertIsNone(leading_order_field("SELECT * FROM t WHERE a IN (1, 2)"))
+
+    def test_requested_fields(self):
+        with app.test_request_context():
+            self.assertIsNone(requested_fields(["a", "b"]))
+            self.assertEqual(select_fields(["a"], ["b", "c"]), (["a"], ["b", "c"]))
+            self.assertEqual(select_expressions("t.`a`, t.b"), "t.`a`, t.b")
+        with app.test_request_context(query_string="fields=c,a,x"):
+            self.assertEqual(requested_fields(["a", "b", "c"]), ["c", "a"])
+            self.assertEqual(select_fields(["a"], ["b", "c"], required=["b"]), (["a"], ["b", "c"]))
+            self.assertEqual(select_expressions("t.`a`, sum(t.`b`, t.`c`) `b`, round(100 * t.c, 8) `c`"), "t.`a`, round(100 * t.c, 8) `c`")
+            self.assertEqual(select_expressions("t.`b`, t.`d`"), "t.`b`")
+        with app.test_request_context(query_string="fields=-a"):
+            self.assertEqual(requested_fields(["a", "b", "c"]), ["b", "c"])
+            self.assertEqual(select_fields(["a", "b"], ["c"]), (["b"], ["c"]))
+            self.assertEqual(select_expressions("t.`a`, max(t.b) b, 'x,y' `c`"), "max(t.b) b, 'x,y' `c`")
+
+    def test_where_after(self):
+        engine = create_engine("sqlite://")
+        engine.execute("CREATE TABLE t (a TEXT, b INTEGER, c TEXT)")
+        engine.execute("INSERT INTO t VALUES ('x', 1, 'a'), ('x', 1, 'b'), ('x', 2, 'a'), ('y', 0, 'a')")
+        q = QueryBuilder("t", "t")
+        q.where_after(["a", "b", "c"], ["x", 1, "b"])
+        q.set_order("a", "b", "c")
+        self.assertEqual(q.conditions, ["((t.a > :cursor_0) OR (t.a = :cursor_0 AND t.b > :cursor_1) OR (t.a = :cursor_0 AND t.b = :cursor_1 AND t.c > :cursor_2))"])
+        self.assertEqual([tuple(r) for r in engine.execute(bind_query(str(q), q.params), **q.params)], [("x", 2, "a"), ("y", 0, "a")])
+
+        # the rows after each possible cursor are the same as by comparing the sort keys
+        rows = [tuple(r) for r in engine.execute("SELECT a, b, c FROM t ORDER BY a, b, c")]
+        for key in [*rows, ("w", 9, "z"), ("x", 1, "0"), ("z", 0, "a")]:
+            with self.subTest(key=key):
+                q = QueryBuilder("t", "t")
+                q.where_after(["a", "b", "c"], key)
+                q.set_order("a", "b", "c")
+                self.assertEqual([tuple(r) for r in engine.execute(bind_query(str(q), q.params), **q.params)], [r for r in rows if r > key])
+
+    def test_execute_queries_concurrent(self):
+        with TemporaryDirectory() as tmp:
+            engine = create_engine(f"sqlite:///{tmp}/test.db")
+            engine.execute("CREATE TABLE t (a INTEGER, b TEXT)")
+            engine.execute("INSERT INTO t VALUES (?, ?)", [(i, f"v{i % 4}") for i in range(2000)])
+            queries = [(f"SELECT a, b FROM t WHERE b = :b ORDER BY a", dict(b=f"v{i}")) for i in range(4)]
+            expected = [dict(a=a, b=b) for _, params in queries for a, b in engine.execute(text(queries[0][0]), **params)]
+
+            def run(queries, max_results=100000):
+                with patch("delphi.epidata.server._query.engine", engine), patch("delphi.epidata.server._query.CONCURRENT_QUERIES", 2), patch(
+                    "delphi.epidata.server._query.CONCURRENT_QUERY_BATCH_ROWS", 7
+                ), patch("delphi.epidata.server._query.CONCURRENT_QUERY_BUFFER_ROWS", 14), patch("delphi.epidata.server._printer.MAX_RESULTS", max_results):
+                    with app.test_request_context(query_string="format=json"):
+                        return orjson.loads(b"".join(execute_queries(queries, ["b"], ["a"], []).response))
+
+            with self.subTest("in order"):
+                self.assertEqual(run(queries), expected)
+            with self.subTest("truncated"):
+                self.assertEqual(run(queries, 600), expected[:600])
+            with self.subTest("error"), app.test_request_context():
+                with self.assertRaises(DatabaseErrorException):
+                    run([("SELECT x FROM missing", {})] + queries)
+
+    def test_execute_queries_cursor(self):
+        engine = create_engine("sqlite://")
+        engine.execute("CREATE TABLE t (a INTEGER, b TEXT)")
+        engine.execute("INSERT INTO t VALUES (?, ?)", [(i, f"v{i % 4}") for i in range(250)])
+
+        def run(max_results):
+            with patch("delphi.epidata.server._query.db", engine.connect()), patch("delphi.epidata.server._printer.MAX_RESULTS", max_results):
+                with app.test_request_context():
+                    return orjson.loads(b"".join(execute_queries([("SELECT a, b FROM t ORDER BY a", {})], ["b"], ["a"], [], cursor_fields=["a"]).response))
+
+        # the rows are fetched in batches, yet the cursor points to the last sent row
+        for max_results in [99, 100, 150, 249]:
+            with self.subTest(max_results=max_results):
+                data = run(max_results)
+                self.assertEqual((data["result"], len(data["epidata"]), data["cursor"]), (2, max_results, encode_cursor([max_results - 1])))
+        with self.subTest("not truncated"):
+            self.assertNotIn("cursor", run(250))
@@ -0,0 +1,108 @@
+"""Unit tests for the slow query log."""
+
+# standard library
+import logging
+from tempfile import TemporaryDirectory
+import unittest
+
+from sqlalchemy import create_engine
+
+from delphi.epidata.server._query import QueryBuilder
+from delphi.epidata.server._params import GeoPair
+from delphi.epidata.server._slow_query import SlowQueryLog, chosen_indexes, fingerprint, fingerprint_id, index_hint
+
+# py3tester coverage target
+__test_target__ = "delphi.epidata.server._slow_query"
+
+
+def build_query(geo_pairs, index=None) -> QueryBuilder:
+    q = QueryBuilder("covidcast", "t")
+    q.set_fields(["geo_value", "value"])
+    q.where(source="src")
+    q.where_geo_pairs("geo_type", "geo_value", geo_pairs)
+    q.set_order("geo_value")
+    q.index = index
+    return q
+
+
+class UnitTests(unittest.TestCase):
+    """Basic unit tests."""
+
+    def test_fingerprint(self):
+        a = build_query([GeoPair("county", ["01000", "02000"])])
+        b = build_query([GeoPair("county", ["03000", "04000", "05000"])])
+        self.assertEqual(fingerprint(str(a)), fingerprint(str(b)))
+        self.assertNotIn("county", fingerprint(str(a)))
+        # a different shape
+        c = build_query([GeoPair("county", ["01000"]), GeoPair("state", True)])
+        self.assertNotEqual(fingerprint(str(a)), fingerprint(str(c)))
+        # literals
+        self.assertEqual(fingerprint("SELECT * FROM t WHERE a = 'x''y' AND b = 12.5 LIMIT 100"), "SELECT * FROM t WHERE a = ? AND b = ? LIMIT ?")
+        # repeated terms
+        self.assertEqual(fingerprint("SELECT * FROM t WHERE ((a = :p_0) OR (a = :p_1) OR (a = :p_2))"), "SELECT * FROM t WHERE ((a = ?) OR ...)")
+        self.assertEqual(len(fingerprint_id(fingerprint(str(a)))), 16)
+
+    def test_index_hint(self):
+        self.assertEqual(index_hint(str(build_query([GeoPair("state", True)], "by_issue"))), "by_issue")
+        self.assertIsNone(index_hint(str(build_query([GeoPair("state", True)]))))
+
+    def test_chosen_indexes(self):
+        plan = {
+            "query_block": {
+                "select_id": 1,
+                "nested_loop": [
+                    {"table": {"table_name": "t", "access_type": "range", "possible_keys": ["by_issue", "by_lag"], "key": "by_lag", "rows_examined_per_scan": 10}},
+                    {"table": {"table_name": "x", "access_type": "ALL", "key": None}},
+                ],
+            }
+        }
+        indexes = chosen_indexes(plan)
+        self.assertEqual([i["table"] for i in indexes], ["t", "x"])
+        self.assertEqual(indexes[0]["key"], "by_lag")
+        self.assertEqual(indexes[0]["possible_keys"], ["by_issue", "by_lag"])
+        self.assertIsNone(indexes[1]["key"])
+
+    def test_observe(self):
+        with TemporaryDirectory() as tmp:
+            # a file since the query is explained on another connection
+            self._test_observe(create_engine(f"sqlite:///{tmp}/test.db"))
+
+    def _test_observe(self, engine):
+        engine.execute("CREATE TABLE covidcast (source TEXT, geo_type TEXT, geo_value TEXT, value REAL)")
+        engine.execute("CREATE INDEX by_geo ON covidcast (geo_type, geo_value)")
+        log = SlowQueryLog(1.0, 60, 2, 10, logging.getLogger("test_slow_query"), engine)
+        q = build_query([GeoPair("county", ["01000", "02000"])])
+
+        with self.subTest("fast"):
+            self.assertIsNone(log.observe(str(q), q.params, 0.5, rows=3))
+            self.assertEqual(len(log.recent), 0)
+
+        with self.subTest("slow"):
+            thread = log.observe(str(q), q.params, 2.0, rows=5, path="/covidcast/")
+            self.assertIsNotNone(thread)
+            thread.join()
+            entry = log.recent[-1]
+            self.assertEqual(entry["fingerprint"], fingerprint(str(q)))
+            self.assertEqual(entry["path"], "/covidcast/")
+            self.assertNotIn("explain_error", entry)
+            self.assertTrue(entry["plan"])
+            self.assertEqual([i["key"] for i in entry["chosen_indexes"]], ["by_geo"])
+
+        with self.subTest("explained once per interval"):
+            self.assertIsNone(log.observe(str(q), q.params, 3.0))
+            self.assertEqual(len(log.recent), 2)
+            self.assertNotIn("plan", log.recent[-1])
+
+        with self.subTest("stats"):
+            stats = log.stats()
+            self.assertEqual(len(stats), 1)
+            self.assertEqual(stats[0]["count"], 3)
+            self.assertEqual(stats[0]["slow_count"], 2)
+            self.assertEqual(stats[0]["rows"], 8)
+            self.assertAlmostEqual(stats[0]["total_seconds"], 5.5)
+            self.assertAlmostEqual(stats[0]["max_seconds"], 3.0)
+
+        with self.subTest("bounded"):
+            log.observe("SELECT 1", {}, 0.1)
+            log.observe("SELECT 1 FROM covidcast", {}, 0.2)
+            self.assertEqual([s["fingerprint"] for s in log.stats()], ["SELECT ? FROM covidcast", "SELECT ?"])
@@ -0,0 +1,72 @@
+"""Unit tests for the request telemetry."""
+
+# standard library
+import unittest
+
+from flask.testing import FlaskClient
+
+from delphi.epidata.server._printer import create_printer
+from delphi.epidata.server._telemetry import Histogram, Metrics, RequestTelemetry, current_telemetry, metrics
+from delphi.epidata.server.main import app
+
+# py3tester coverage target
+__test_target__ = "delphi.epidata.server._telemetry"
+
+
+class UnitTests(unittest.TestCase):
+    """Basic unit tests."""
+
+    client: FlaskClient
+
+    def setUp(self):
+        app.config["TESTING"] = True
+        app.config["WTF_CSRF_ENABLED"] = False
+        app.config["DEBUG"] = False
+        self.client = app.test_client()
+
+    def test_server_timing(self):
+        r = self.client.get("/version")
+        timing = r.headers["Server-Timing"]
+        self.assertRegex(timing, r"total;dur=\d+\.\d")
+        self.assertIn(f'bytes;desc="{len(r.data)}"', timing)
+        self.assertGreaterEqual(metrics.requests[("send_version", "200")], 1)
+
+    def test_streamed(self):
+        with app.test_request_context():
+            body = b"".join(create_printer()(iter([dict(a=1), dict(a=2)])).response)
+            telemetry = current_telemetry()
+        self.assertEqual(telemetry.rows, 2)
+        self.assertEqual(telemetry.bytes, len(body))
+        self.assertEqual(set(telemetry.spans().keys()), {"fetch", "serialize"})
+
+    def test_spans(self):
+        t = RequestTelemetry()
+        t.add("fetch", 1.0)
+        t.add("decode", 0.25)
+        t.add("sql", 0.5)
+        t.mark("params")
+        t.mark("params")
+        self.assertEqual(list(t.spans().keys()), ["params", "sql", "fetch", "decode"])
+        self.assertEqual(t.spans()["fetch"], 0.75)
+
+    def test_render(self):
+        h = Histogram((0.1, 1.0))
+        for v in (0.05, 0.5, 0.5, 5):
+            h.observe(v)
+        self.assertEqual(h.counts, [1, 2, 1])
+
+        m = Metrics()
+        t = RequestTelemetry()
+        t.add("sql", 0.2)
+        t.rows = 3
+        m.record("covidcast", 200, t)
+        text = m.render({"epidata_db_pool_size": 5})
+        self.assertIn('epidata_request_duration_seconds_bucket{endpoint="covidcast",span="sql",le="0.25"} 1', text)
+        self.assertIn('epidata_request_duration_seconds_bucket{endpoint="covidcast",span="sql",le="0.1"} 0', text)
+        self.assertIn('epidata_request_duration_seconds_count{endpoint="covidcast",span="sql"} 1', text)
+        self.assertIn('epidata_requests_total{endpoint="covidcast",status="200"} 1', text)
+        self.assertIn('epidata_response_rows_total{endpoint="covidcast"} 3', text)
+        self.assertIn("epidata_db_pool_size 5", text)
+
+    def test_metrics_auth(self):
+        self.assertEqual(self.client.get("/metrics").get_json()["result"], -1)
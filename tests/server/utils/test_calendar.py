@@ -0,0 +1,60 @@
+import unittest
+from datetime import date, timedelta
+
+import numpy as np
+
+from delphi.epidata.server.utils.calendar import (
+    count_days,
+    count_weeks,
+    day_to_ordinal,
+    day_to_week,
+    delta_days,
+    delta_weeks,
+    epiweek_year_start,
+    ordinal_to_day,
+    shift_days,
+    shift_weeks,
+)
+
+
+class UnitTests(unittest.TestCase):
+    def test_days(self):
+        self.assertEqual(day_to_ordinal(20200229), date(2020, 2, 29).toordinal())
+        self.assertEqual(ordinal_to_day(date(2020, 2, 29).toordinal()), 20200229)
+        self.assertEqual(shift_days(20200301, -1), 20200229)
+        self.assertEqual(shift_days(20201231, 1), 20210101)
+        self.assertEqual(delta_days(20200101, 20210101), 366)
+        self.assertEqual(delta_days(20200105, 20200101), -4)
+        self.assertEqual(count_days(20200130, 20200203), 5)
+        for invalid in (20200230, 20201301, 20200100, 18991231):
+            with self.assertRaises(ValueError):
+                day_to_ordinal(invalid)
+
+    def test_days_vectorized(self):
+        start = date(2019, 12, 25)
+        days = np.array([int((start + timedelta(days=i)).strftime("%Y%m%d")) for i in range(400)])
+        np.testing.assert_array_equal(shift_days(days, 7)[:-7], days[7:])
+        np.testing.assert_array_equal(delta_days(days[0], days), np.arange(400))
+        np.testing.assert_array_equal(shift_days(days[:3], np.array([0, 1, 2])), [20191225, 20191227, 20191229])
+        with self.assertRaises(ValueError):
+            day_to_ordinal(np.array([20200101, 20200231]))
+
+    def test_weeks(self):
+        self.assertEqual(epiweek_year_start(2021), date(2021, 1, 3))
+        self.assertEqual(epiweek_year_start(2020), date(2019, 12, 29))
+        # 2020 has 53 epiweeks
+        self.assertEqual(shift_weeks(202052, 1), 202053)
+        self.assertEqual(shift_weeks(202053, 1), 202101)
+        self.assertEqual(shift_weeks(202101, -1), 202053)
+        self.assertEqual(shift_weeks(201952, 1), 202001)
+        self.assertEqual(delta_weeks(201940, 202002), 14)
+        self.assertEqual(count_weeks(202001, 202053), 53)
+        with self.assertRaises(ValueError):
+            delta_weeks(201953, 202001)
+        np.testing.assert_array_equal(delta_weeks(np.array([202051, 202052, 202053, 202101]), 202102), [4, 3, 2, 1])
+
+    def test_day_to_week(self):
+        self.assertEqual(day_to_week(20210102), 202053)
+        self.assertEqual(day_to_week(20210103), 202101)
+        self.assertEqual(day_to_week(20191229), 202001)
+        np.testing.assert_array_equal(day_to_week(np.array([20200104, 20200105])), [202001, 202002])